@@ -1,25 +1,33 @@
 import streamlit as st
 import os
-import json
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from groq import Groq
-from googleapiclient.discovery import build
 from dotenv import load_dotenv
-import random
-import datetime
 from datetime import datetime, timedelta
 import time
+import contextvars
+import uuid
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from async_io import get_io_core
+from api_client import get_api_client
+from generation import (
+    agenerate_checklist, astream_checklist_with_videos, asearch_youtube_videos, asearch_youtube_video,
+    youtube_video_url, get_youtube_rate_limiter, arequest_quiz_question, agenerate_quiz_questions,
+    sample_quiz_items, quiz_entries
+)
+from llm_cache import get_response_cache
+from youtube_cache import get_youtube_cache
+from progress_store import get_progress_store
+from quiz_history import QuizHistory
+from mastery import get_mastery_model
+from review_scheduler import get_review_scheduler
+from question_bank import get_question_bank
+from metrics import get_tracer, bind_session, connection_stats
+from assets import STYLE_HTML, HEADER_HTML, sidebar_brand_html, sidebar_stat_html, study_card_html
+from job_queue import get_job_queue, QueueFull, PRIORITY_INTERACTIVE
 
 # Load environment variables
 load_dotenv()
 
-# Initialize clients
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-
 # Page configuration
 st.set_page_config(
     page_title="StudyHub - Smart Learning Platform",
@@ -28,57 +36,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for enhanced UI
-st.markdown("""
-<style>
-    .main-header {
-        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-        padding: 2rem;
-        border-radius: 10px;
-        color: white;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    
-    .study-card {
-        background: white;
-        padding: 1.5rem;
-        border-radius: 10px;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        margin: 1rem 0;
-        border-left: 4px solid #4CAF50;
-        transition: transform 0.3s ease;
-    }
-    
-    .study-card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(0,0,0,0.15);
-    }
-    
-    .study-card.completed {
-        border-left-color: #2196F3;
-        background: #f8f9fa;
-    }
-    
-    .metric-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1.5rem;
-        border-radius: 10px;
-        color: white;
-        text-align: center;
-        margin: 0.5rem;
-    }
-    
-    .quiz-question {
-        background: white;
-        padding: 1.5rem;
-        border-radius: 10px;
-        box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        margin: 1rem 0;
-        border-left: 4px solid #007bff;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for enhanced UI (minified once per process, see assets.py)
+st.markdown(STYLE_HTML, unsafe_allow_html=True)
 
 # Initialize session state - FIXED VERSION
 def initialize_session_state():
@@ -89,134 +48,432 @@ def initialize_session_state():
         "topic": "",
         "show_quiz": False,
         "youtube_links": {},
+        "youtube_alternatives": {},
         "user_points": 0,
         "badges": [],
         "study_streak": 0,
         "last_study_date": None,
         "performance_history": [],
-        "quiz_scores": [],
+        "quiz_history": QuizHistory(QUIZ_HISTORY_SIZE),
         "study_schedule": {},
         "learning_goals": {},
         "resource_bookmarks": [],
         "study_time_log": [],
         "difficulty_level": "Medium",
         "quiz": None,
+        "quiz_id": None,
         "answers": {},
         "submitted": False,
         "show_analytics": False,
-        "current_page": "dashboard"
+        "current_page": "dashboard",
+        "fresh_generations": False,
+        "user_id": "",
+        "loaded_user": None,
+        "saved_topics": [],
+        "session_id": uuid.uuid4().hex[:8],
+        "checklist_job": None,
+        "checklist_job_error": None,
+        "due_review_count": None
     }
     
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
 
+# Persistent Progress
+# Only the active topic is held in session state; everything else stays in
+# the progress store and is loaded when the user asks for it.
+QUIZ_HISTORY_LOAD_LIMIT = int(os.getenv("QUIZ_HISTORY_LOAD_LIMIT", "50"))
+# Quiz results a session keeps in memory (see quiz_history.py)
+QUIZ_HISTORY_SIZE = max(QUIZ_HISTORY_LOAD_LIMIT, int(os.getenv("QUIZ_HISTORY_SIZE", "100")))
+
+def current_user():
+    return st.session_state.get("user_id", "").strip()
+
+def learner_id():
+    """Who mastery is tracked for: the signed-in user, or just this session"""
+    return current_user() or f"session:{st.session_state['session_id']}"
+
+def load_saved_topic(user_id, topic):
+    """Pull one topic's checklist, progress and recent quiz scores into session state"""
+    store = get_progress_store()
+    saved = store.load_topic(user_id, topic)
+    if saved is None:
+        return False
+    
+    st.session_state["checklist"] = saved["checklist"]
+    st.session_state["progress"] = saved["progress"]
+    st.session_state["youtube_links"] = saved["youtube_links"]
+    st.session_state["youtube_alternatives"] = {}
+    st.session_state["topic"] = topic
+    st.session_state["show_quiz"] = False
+    st.session_state["quiz"] = None
+    results = store.load_quiz_results(user_id, topic, limit=QUIZ_HISTORY_LOAD_LIMIT)
+    st.session_state["quiz_history"].load(results)
+    return True
+
+def sync_user_session():
+    """The first time a user is seen in this session, save any unsaved checklist
+    and lazily load their most recent topic"""
+    user_id = current_user()
+    if not user_id or st.session_state["loaded_user"] == user_id:
+        return
+    st.session_state["loaded_user"] = user_id
+    
+    store = get_progress_store()
+    if st.session_state["checklist"]:
+        store.save_checklist(
+            user_id,
+            st.session_state["topic"],
+            st.session_state["checklist"],
+            st.session_state["youtube_links"],
+            st.session_state["progress"]
+        )
+    
+    st.session_state["saved_topics"] = store.list_topics(user_id)
+    if st.session_state["saved_topics"] and not st.session_state["checklist"]:
+        load_saved_topic(user_id, st.session_state["saved_topics"][0])
+    
+    # Pick the study streak up from the stored history
+    from analytics import study_streaks
+    stamps = [row["taken_at"] for row in store.load_quiz_results(user_id)] + store.load_activity(user_id)
+    streak, _ = study_streaks(stamps)
+    if streak:
+        st.session_state["study_streak"] = streak
+        st.session_state["last_study_date"] = datetime.fromtimestamp(max(stamps)).date()
+
+def switch_saved_topic():
+    load_saved_topic(current_user(), st.session_state["saved_topic_choice"])
+
+# Generation
+# The pipelines live in generation.py and run on the shared async I/O core.
+# With QUESTIFY_API_URL set they run on the generation service instead (see
+# backend/app/main.py) and this app is only a client. The functions below add
+# the Streamlit side: progress display and error reporting.
+
 # Checklist Functions
-def generate_checklist(topic):
+def generate_checklist(topic, fresh=False):
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": f"Generate a comprehensive checklist (8-12 items) of key topics for studying {topic}. Make each item specific and actionable."}],
-            model="llama-3.3-70b-versatile",
-            max_tokens=1000,
-            stream=False,
-        )
-        
-        checklist = chat_completion.choices[0].message.content.split("\n")
-        checklist = [item.strip().lstrip("0123456789.-* ") for item in checklist if item.strip() and not item.lower().startswith("here's")]
-        return [item for item in checklist if len(item) > 10][:10]
+        client = get_api_client()
+        if client:
+            return client.checklist(topic, fresh)
+        return get_io_core().run(agenerate_checklist(topic, fresh))
     except Exception as e:
         st.error(f"Error generating checklist: {str(e)}")
         return []
 
+def checklist_events(topic, fresh=False):
+    """Checklist items as they are generated, then video lookups as they land"""
+    client = get_api_client()
+    if client:
+        return client.stream_checklist(topic, fresh)
+    return get_io_core().iterate(astream_checklist_with_videos(topic, fresh))
+
+def search_youtube_videos(query):
+    client = get_api_client()
+    if client:
+        return client.youtube_search(query)
+    return get_io_core().run(asearch_youtube_videos(query))
+
+def search_youtube_video(query):
+    video_ids = search_youtube_videos(query)
+    return youtube_video_url(video_ids[0]) if video_ids else None
+
 def get_best_youtube_video(query):
     try:
-        request = youtube.search().list(
-            part="snippet",
-            maxResults=3,
-            q=query,
-            type="video",
-            order="relevance"
-        )
-        response = request.execute()
-        
-        if response['items']:
-            video_id = response['items'][0]['id']['videoId']
-            return f"https://www.youtube.com/watch?v={video_id}"
-        return None
+        return search_youtube_video(query)
     except Exception as e:
         st.error(f"Error fetching YouTube video: {str(e)}")
         return None
 
-def generate_youtube_links(checklist):
+def get_alternative_youtube_videos(item):
+    """Runner-up videos for a checklist item: the ones that came with the checklist,
+    else this process's stored search results. Never searches: this runs on every render."""
+    alternatives = st.session_state["youtube_alternatives"].get(item)
+    if alternatives is None:
+        video_ids = get_youtube_cache().peek(item) or []
+        alternatives = [youtube_video_url(video_id) for video_id in video_ids[1:]]
+    return alternatives
+
+def collect_youtube_links(checklist, futures):
+    """Wait for submitted lookups (future -> item), advancing the progress bar as each one lands"""
     youtube_links = {}
     progress_bar = st.progress(0)
     status_text = st.empty()
+    status_text.text(f"Finding videos for {len(checklist)} topics...")
+    done = 0
+    errors = []
     
-    for i, item in enumerate(checklist):
-        status_text.text(f"Finding videos for: {item}")
-        video_link = get_best_youtube_video(item)
-        if video_link:
-            youtube_links[item] = video_link
-        progress_bar.progress((i + 1) / len(checklist))
-        time.sleep(0.1)
+    # Update the progress bar from the script thread as each lookup lands
+    for future in as_completed(futures):
+        item = futures[future]
+        try:
+            video_link = future.result()
+            if video_link:
+                youtube_links[item] = video_link
+        except Exception as e:
+            errors.append(str(e))
+        done += 1
+        progress_bar.progress(done / len(checklist))
+        status_text.text(f"Found videos for {done}/{len(checklist)} topics (latest: {item})")
+    
+    if errors:
+        st.error(f"Error fetching YouTube video: {errors[0]}")
     
     status_text.text("Video search complete!")
-    return youtube_links
+    # Keep the checklist order for display
+    return {item: youtube_links[item] for item in checklist if item in youtube_links}
+
+def generate_youtube_links(checklist):
+    if not checklist:
+        return {}
+    
+    client = get_api_client()
+    if client:
+        try:
+            youtube_links, errors = client.youtube_links(checklist)
+        except Exception as e:
+            errors = [str(e)]
+            youtube_links = {}
+        if errors:
+            st.error(f"Error fetching YouTube video: {errors[0]}")
+        return youtube_links
+    
+    # Lookups run concurrently on the I/O core, capped by its YouTube limit
+    limiter = get_youtube_rate_limiter()
+    core = get_io_core()
+    futures = {core.submit(asearch_youtube_video(item, limiter)): item for item in checklist}
+    return collect_youtube_links(checklist, futures)
+
+def generate_checklist_with_videos(topic, fresh=False):
+    """Streaming mode: show each checklist item as soon as it is generated and
+    start its video lookup right away instead of waiting for the whole list"""
+    checklist = []
+    youtube_links = {}
+    alternatives = {}
+    errors = []
+    preview = st.empty()
+    preview_box = preview.container()
+    preview_box.markdown("**Generating your personalized study checklist...**")
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    found = 0
+    
+    try:
+        for event in checklist_events(topic, fresh):
+            if event["event"] == "item":
+                checklist.append(event["item"])
+                preview_box.markdown(f"- {event['item']}")
+            elif event["event"] == "video":
+                found += 1
+                if event.get("url"):
+                    youtube_links[event["item"]] = event["url"]
+                if event.get("alternatives"):
+                    alternatives[event["item"]] = event["alternatives"]
+                if event.get("error"):
+                    errors.append(event["error"])
+                progress_bar.progress(found / len(checklist))
+                status_text.text(f"Found videos for {found}/{len(checklist)} topics (latest: {event['item']})")
+    except Exception as e:
+        st.error(f"Error generating checklist: {str(e)}")
+    
+    if errors:
+        st.error(f"Error fetching YouTube video: {errors[0]}")
+    
+    progress_bar.empty()
+    status_text.empty()
+    preview.empty()
+    # Keep the checklist order for display
+    return checklist, {item: youtube_links[item] for item in checklist if item in youtube_links}, alternatives
 
 # Quiz Functions - FIXED VERSION
-def generate_quiz_question(topic, checklist_item, difficulty):
+def request_quiz_question(topic, checklist_item, difficulty, fresh=False):
+    """One question for one item. Raises on failure so callers can decide how to fall back."""
+    client = get_api_client()
+    if client:
+        entry = client.quiz(topic, [checklist_item], difficulty, 1, fresh=fresh, batch=False, use_bank=False)[0]
+        return entry["question"], entry["options"], entry["correct"]
+    return get_io_core().run(arequest_quiz_question(topic, checklist_item, difficulty, fresh))
+
+def generate_quiz_question(topic, checklist_item, difficulty, fresh=False):
     try:
-        prompt = f"""Create a {difficulty}-difficulty multiple choice question about '{checklist_item}' in the context of {topic}. 
-        Make it educational and relevant. Return in this exact format:
-        Question: [question text]
-        A) [option 1]
-        B) [option 2]
-        C) [option 3]
-        D) [option 4]
-        Correct: [correct option letter]"""
-        
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-            max_tokens=500,
-            stream=False,
-        )
-        
-        response = chat_completion.choices[0].message.content.split("\n")
-        question = response[0].replace("Question: ", "")
-        options = [line[3:] for line in response[1:5] if line.strip()]
-        
-        # Find correct answer
-        correct_line = [line for line in response if line.startswith("Correct:")]
-        if correct_line:
-            correct_letter = correct_line[0].split(":")[1].strip()
-            correct_index = ord(correct_letter.upper()) - ord('A')
-            if 0 <= correct_index < len(options):
-                correct_answer = options[correct_index]
-            else:
-                correct_answer = options[0]
-        else:
-            correct_answer = options[0]
-        
-        return question, options, correct_answer
+        return request_quiz_question(topic, checklist_item, difficulty, fresh)
     except Exception as e:
         st.error(f"Error generating quiz question: {str(e)}")
         return "Sample question", ["A", "B", "C", "D"], "A"
 
-def generate_quiz(topic, checklist, difficulty, num_questions=5):
-    questions = []
-    random_items = random.sample(checklist, min(num_questions, len(checklist)))
-    
-    for item in random_items:
-        q, opts, correct = generate_quiz_question(topic, item, difficulty)
-        questions.append({
-            "question": q,
-            "options": opts,
-            "correct": correct,
-            "topic": item
-        })
+def generate_quiz(topic, checklist, difficulty, num_questions=5, concurrent=True, max_workers=None, fresh=False, batch=True, fallback=True, use_bank=True, exclude=()):
+    """Build a quiz from a sample of checklist items.
     
-    return questions
+    Questions come from the question bank where it has enough fresh ones
+    (skipping question texts in `exclude`); the model is only asked for the rest.
+    With fallback=False nothing touches Streamlit and any failed question
+    raises instead of being replaced, so it can run off the script thread."""
+    client = get_api_client()
+    if client:
+        quiz = client.quiz(
+            topic, checklist, difficulty, num_questions, concurrent=concurrent, fresh=fresh,
+            batch=batch, use_bank=use_bank, exclude=exclude, allow_partial=fallback
+        )
+        items = [entry["topic"] for entry in quiz]
+        generated = [
+            (entry["question"], entry["options"], entry["correct"]) if entry["question"] is not None else None
+            for entry in quiz
+        ]
+    else:
+        items = sample_quiz_items(checklist, num_questions)
+        generated = get_io_core().run(agenerate_quiz_questions(
+            topic, items, difficulty, concurrent, max_workers, fresh, batch, use_bank, exclude
+        ))
+    
+    if None in generated:
+        if not fallback:
+            raise RuntimeError("Failed to generate every quiz question")
+        # Failed items are retried one by one on the calling thread, where
+        # generate_quiz_question can report errors
+        for i, item in enumerate(items):
+            if generated[i] is None:
+                generated[i] = generate_quiz_question(topic, item, difficulty, fresh)
+    
+    return quiz_entries(items, generated)
+
+# Quiz Prefetching
+# While results are on screen the next quiz for the same settings is generated
+# in the background, so "Retake" / "Generate Quiz" can usually be served at once.
+QUIZ_PREFETCH_DEPTH = int(os.getenv("QUIZ_PREFETCH_DEPTH", "1"))
+
+@st.cache_resource
+def get_prefetch_executor():
+    # One pool for the whole process keeps background generation bounded
+    return ThreadPoolExecutor(
+        max_workers=int(os.getenv("QUIZ_PREFETCH_WORKERS", "4")),
+        thread_name_prefix="quiz-prefetch"
+    )
+
+class QuizPrefetcher:
+    """Small bounded queue of quizzes being generated ahead of time for one session"""
+    
+    def __init__(self, depth):
+        self.depth = depth
+        self.pending = deque()
+    
+    @staticmethod
+    def make_key(topic, items, difficulty, num_questions, fresh):
+        return (topic, tuple(items), difficulty, num_questions, fresh)
+    
+    def fill(self, executor, topic, items, difficulty, num_questions, fresh=False, exclude=()):
+        key = self.make_key(topic, items, difficulty, num_questions, fresh)
+        # Quizzes for other settings won't be asked for again
+        self.pending = deque(entry for entry in self.pending if entry[0] == key)
+        while len(self.pending) < self.depth:
+            # copy_context() keeps the background work attributed to this session
+            future = executor.submit(
+                contextvars.copy_context().run,
+                generate_quiz, topic, list(items), difficulty, num_questions,
+                fresh=fresh, fallback=False, exclude=tuple(exclude)
+            )
+            self.pending.append((key, future))
+    
+    def take(self, topic, items, difficulty, num_questions, fresh=False):
+        """Pop the oldest quiz for these settings, or None if there isn't a usable one"""
+        key = self.make_key(topic, items, difficulty, num_questions, fresh)
+        for entry in list(self.pending):
+            if entry[0] != key:
+                continue
+            self.pending.remove(entry)
+            # An in-flight quiz started earlier, so waiting for it still beats starting over
+            try:
+                return entry[1].result()
+            except Exception:
+                continue
+        return None
+
+def get_quiz_prefetcher():
+    if "quiz_prefetcher" not in st.session_state:
+        st.session_state["quiz_prefetcher"] = QuizPrefetcher(QUIZ_PREFETCH_DEPTH)
+    return st.session_state["quiz_prefetcher"]
+
+def next_quiz(topic, items, difficulty, num_questions, fresh=False, exclude=()):
+    """Serve a prefetched quiz when one is ready, otherwise generate it now"""
+    quiz = get_quiz_prefetcher().take(topic, items, difficulty, num_questions, fresh)
+    if quiz is None:
+        quiz = generate_quiz(topic, items, difficulty, num_questions, fresh=fresh, exclude=exclude)
+    return quiz
+
+# Spaced Repetition
+# Checklist items come back for review on an SM-2 schedule (see
+# review_scheduler.py): completing an item or answering a question about it
+# schedules its next review. Review quizzes are built from questions already
+# asked or banked, so they never wait on generation.
+REVIEW_QUIZ_SIZE = int(os.getenv("REVIEW_QUIZ_SIZE", "10"))
+
+def mark_studied():
+    """Count today towards the study streak"""
+    today = datetime.now().date()
+    last = st.session_state["last_study_date"]
+    if last == today:
+        return
+    st.session_state["study_streak"] = st.session_state["study_streak"] + 1 if last == today - timedelta(days=1) else 1
+    st.session_state["last_study_date"] = today
+
+def refresh_study_schedule():
+    """Next review date per checklist item of the active topic"""
+    st.session_state["study_schedule"] = {
+        item: datetime.fromtimestamp(due_at).date()
+        for item, due_at in get_review_scheduler().next_due(learner_id(), st.session_state["topic"]).items()
+    }
+
+def schedule_changed():
+    """After answers or completed items have rescheduled reviews"""
+    refresh_study_schedule()
+    st.session_state["due_review_count"] = None
+    mark_studied()
+
+def due_reviews(limit=None):
+    return get_review_scheduler().due(learner_id(), st.session_state["topic"], limit=limit)
+
+def due_review_count():
+    """Due reviews in the active topic for the sidebar. Recounted when the
+    schedule changes or the minute turns over, not on every rerun."""
+    key = (learner_id(), st.session_state["topic"], int(time.time() // 60))
+    cached = st.session_state["due_review_count"]
+    if cached is None or cached[0] != key:
+        cached = st.session_state["due_review_count"] = (key, len(due_reviews()))
+    return cached[1]
+
+def review_quiz(cards, difficulty):
+    """A quiz from stored questions only: each card's last question, or one
+    from the question bank; items with neither are left for a later review"""
+    bank = get_question_bank()
+    quiz = []
+    for topic, item, card in cards:
+        entry = card["question"]
+        if entry is None:
+            drawn = bank.draw(topic, item, difficulty)
+            if drawn is None:
+                continue
+            entry = quiz_entries([item], [drawn])[0]
+        quiz.append(entry)
+    return quiz
+
+def render_due_reviews(difficulty):
+    cards = due_reviews(REVIEW_QUIZ_SIZE)
+    if not cards:
+        return
+    st.markdown("#### 🔁 Reviews Due")
+    st.caption(", ".join(item for _, item, _ in cards))
+    if st.button(f"🔁 Start Review ({len(cards)})"):
+        quiz = review_quiz(cards, difficulty)
+        if quiz:
+            st.session_state["show_quiz"] = True
+            st.session_state["quiz_id"] = uuid.uuid4().hex
+            st.session_state["quiz"] = quiz
+            st.session_state["answers"] = {}
+            st.session_state["submitted"] = False
+            st.session_state["difficulty_level"] = difficulty
+            st.rerun()
+        else:
+            st.info("No stored questions for these items yet - take a regular quiz on them first.")
 
 # Quiz Center - FIXED VERSION
 def quiz_center():
@@ -247,23 +504,33 @@ def quiz_center():
     with col3:
         quiz_type = st.selectbox(
             "Quiz Type",
-            ["Random Topics", "Incomplete Topics", "All Topics"]
+            ["Random Topics", "Incomplete Topics", "All Topics", "Adaptive (Weakest Topics)"],
+            help="Adaptive quizzes ask about the topics you are least likely to know yet, based on your past answers"
         )
     
+    render_due_reviews(difficulty)
+    
     # Generate quiz button
     if st.button("🎯 Generate Quiz", type="primary"):
         if quiz_type == "Incomplete Topics":
             available_topics = [topic for topic, completed in st.session_state["progress"].items() if not completed]
+        elif quiz_type == "Adaptive (Weakest Topics)":
+            # Only the chosen items are generated, so no calls go to topics already mastered
+            available_topics = get_mastery_model().select(
+                learner_id(), st.session_state["topic"], st.session_state["checklist"], num_questions
+            )
         else:
             available_topics = st.session_state["checklist"]
         
         if available_topics:
             st.session_state["show_quiz"] = True
-            st.session_state["quiz"] = generate_quiz(
+            st.session_state["quiz_id"] = uuid.uuid4().hex
+            st.session_state["quiz"] = next_quiz(
                 st.session_state["topic"],
                 available_topics,
                 difficulty,
-                num_questions
+                num_questions,
+                fresh=st.session_state["fresh_generations"]
             )
             # FIXED: Properly initialize answers dictionary
             st.session_state["answers"] = {}
@@ -326,6 +593,38 @@ def display_quiz():
             
             if answered_questions == len(quiz):
                 st.session_state["submitted"] = True
+                # (checklist item, answered correctly) per question
+                graded = [(q.get("topic", "General"), st.session_state["answers"].get(i) == q["correct"]) for i, q in enumerate(quiz, 1)]
+                score = sum(correct for _, correct in graded)
+                # Keyed by quiz id: submitting the same quiz again doesn't count twice
+                recorded = st.session_state["quiz_history"].record(
+                    st.session_state["quiz_id"], st.session_state["topic"], score, len(quiz)
+                )
+                if recorded:
+                    get_mastery_model().record(
+                        learner_id(),
+                        st.session_state["topic"],
+                        st.session_state.get("difficulty_level", "Medium"),
+                        graded,
+                        persist=bool(current_user())
+                    )
+                    get_review_scheduler().record_answers(
+                        learner_id(),
+                        st.session_state["topic"],
+                        [(item, correct, q) for (item, correct), q in zip(graded, quiz)],
+                        persist=bool(current_user())
+                    )
+                    schedule_changed()
+                if recorded and current_user():
+                    get_progress_store().record_quiz_result(
+                        current_user(),
+                        st.session_state["topic"],
+                        st.session_state.get("difficulty_level", "Medium"),
+                        score,
+                        len(quiz),
+                        quiz_id=st.session_state["quiz_id"],
+                        answers=[{"item": item, "correct": correct} for item, correct in graded]
+                    )
                 st.rerun()
             else:
                 st.error(f"⚠️ Please answer all questions before submitting! ({answered_questions}/{len(quiz)} answered)")
@@ -357,7 +656,6 @@ def display_quiz_results():
     
     # Score display
     percentage = (score / len(quiz)) * 100
-    st.session_state["quiz_scores"].append(percentage)
     
     # Enhanced score display with metric cards
     col1, col2, col3 = st.columns(3)
@@ -441,6 +739,17 @@ def display_quiz_results():
         </div>
         """, unsafe_allow_html=True)
     
+    # Start generating the next quiz while the user reads the results
+    get_quiz_prefetcher().fill(
+        get_prefetch_executor(),
+        st.session_state["topic"],
+        st.session_state["checklist"],
+        st.session_state["difficulty_level"],
+        len(quiz),
+        fresh=st.session_state["fresh_generations"],
+        exclude=[q["question"] for q in quiz]
+    )
+    
     # Action buttons with enhanced styling
     st.markdown("---")
     st.subheader("🎯 Next Steps")
@@ -450,11 +759,14 @@ def display_quiz_results():
     with col1:
         if st.button("🔄 Retake Quiz", type="primary", use_container_width=True):
             # Reset quiz state
-            st.session_state["quiz"] = generate_quiz(
+            st.session_state["quiz_id"] = uuid.uuid4().hex
+            st.session_state["quiz"] = next_quiz(
                 st.session_state["topic"],
                 st.session_state["checklist"],
                 st.session_state["difficulty_level"],
-                len(quiz)
+                len(quiz),
+                fresh=st.session_state["fresh_generations"],
+                exclude=[q["question"] for q in quiz]
             )
             st.session_state["answers"] = {}
             st.session_state["submitted"] = False
@@ -473,6 +785,196 @@ def display_quiz_results():
             st.session_state["submitted"] = False
             st.rerun()
 
+# Checklist Rendering
+# The cards and progress counters run as a fragment: a checkbox click reruns
+# only this block instead of the whole script (CSS, sidebar, other pages).
+# Older Streamlit releases without fragments fall back to a plain function.
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+def toggle_checklist_item(item, key):
+    # Runs before the fragment rerun, so the card is drawn with the new state
+    new_status = st.session_state[key]
+    st.session_state["progress"][item] = new_status
+    if current_user():
+        get_progress_store().set_item_progress(current_user(), st.session_state["topic"], item, new_status)
+    if new_status:
+        get_review_scheduler().record_completed(
+            learner_id(), st.session_state["topic"], item, persist=bool(current_user())
+        )
+        schedule_changed()
+
+def render_checklist_card(i, item):
+    is_completed = st.session_state["progress"].get(item, False)
+    
+    # Apply enhanced styling based on completion status
+    st.markdown(
+        study_card_html(item, is_completed, st.session_state["youtube_links"].get(item)),
+        unsafe_allow_html=True
+    )
+    
+    # Hidden checkbox for state management
+    key = f"checkbox_{i}_{item}"
+    st.checkbox(
+        "Mark as completed",
+        value=is_completed,
+        key=key,
+        label_visibility="collapsed",
+        on_change=toggle_checklist_item,
+        args=(item, key)
+    )
+
+@fragment
+def render_checklist_progress():
+    # Progress overview with enhanced styling
+    completed = sum(st.session_state["progress"].values())
+    total = len(st.session_state["progress"])
+    progress_percent = (completed / total * 100) if total > 0 else 0
+    
+    # Progress metrics
+    col1, col2, col3 = st.columns([2, 1, 1])
+    
+    with col1:
+        st.markdown(f"""
+        <div style="background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%); padding: 1.5rem; border-radius: 15px; border: 1px solid #dee2e6;">
+            <h4 style="margin: 0 0 1rem 0; color: #2c3e50;">📊 Progress Overview</h4>
+            <div style="margin-bottom: 1rem;">
+                <div style="display: flex; justify-content: space-between; margin-bottom: 0.5rem;">
+                    <span style="color: #666;">Progress</span>
+                    <span style="color: #2c3e50; font-weight: 600;">{progress_percent:.1f}%</span>
+                </div>
+                <div style="background: #e9ecef; height: 8px; border-radius: 4px; overflow: hidden;">
+                    <div style="background: linear-gradient(90deg, #4CAF50, #45a049); height: 100%; width: {progress_percent}%; transition: width 0.3s ease;"></div>
+                </div>
+            </div>
+            <p style="margin: 0; color: #666; font-size: 0.9rem;">
+                {completed}/{total} topics completed
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown(f"""
+        <div style="background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%); padding: 1.5rem; border-radius: 15px; border: 1px solid #90caf9; text-align: center;">
+            <h4 style="margin: 0 0 0.5rem 0; color: #1976d2;">🎯 Status</h4>
+            <p style="margin: 0; color: #1976d2; font-weight: 600; font-size: 1.2rem;">
+                {completed}/{total}
+            </p>
+            <p style="margin: 0; color: #1976d2; font-size: 0.9rem;">Completed</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        if st.button("🔄 Regenerate", type="secondary", use_container_width=True):
+            st.session_state["checklist"] = []
+            st.session_state["progress"] = {}
+            st.rerun()
+    
+    # Checklist items
+    for i, item in enumerate(st.session_state["checklist"]):
+        render_checklist_card(i, item)
+    
+    # Visual progress
+    if total > 0:
+        st.subheader("📊 Visual Progress")
+        # Native widgets are cheap to re-send on every checkbox click;
+        # the Plotly chart is only built and shipped when asked for
+        metric_col, bar_col = st.columns([1, 3])
+        with metric_col:
+            st.metric("Completed", f"{completed}/{total}")
+        with bar_col:
+            st.progress(completed / total, text=f"{progress_percent:.1f}% complete")
+        
+        if st.toggle("Show chart", key="show_progress_chart"):
+            fig = memoized_figure(
+                "progress_overview",
+                (completed, total),
+                lambda: build_progress_pie(completed, total)
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+def apply_checklist(topic, checklist, youtube_links, alternatives=None):
+    """Make a freshly generated checklist the active topic (and save it for signed-in users)"""
+    st.session_state["checklist"] = checklist
+    st.session_state["progress"] = {item: False for item in checklist}
+    st.session_state["topic"] = topic
+    st.session_state["show_quiz"] = False
+    st.session_state["youtube_links"] = youtube_links
+    st.session_state["youtube_alternatives"] = alternatives or {}
+    
+    if current_user():
+        get_progress_store().save_checklist(current_user(), topic, checklist, youtube_links)
+        st.session_state["saved_topics"] = [topic] + [t for t in st.session_state["saved_topics"] if t != topic]
+
+# Checklist Jobs
+# With JOB_QUEUE=1 checklist+video generation is handed to the worker pool
+# (job_worker.py) instead of running inside this script run. The page polls
+# the job and shows items and videos as the worker reports them; identical
+# requests from other sessions share one job.
+USE_JOB_QUEUE = os.getenv("JOB_QUEUE", "").lower() in ("1", "true", "yes")
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+
+def submit_checklist_job(topic, fresh=False):
+    try:
+        job_id = get_job_queue().submit(
+            "checklist_with_videos",
+            {"topic": topic, "fresh": fresh},
+            priority=PRIORITY_INTERACTIVE,
+            dedup_key=f"checklist:{topic.strip().lower()}:{fresh}",
+        )
+    except QueueFull as e:
+        st.warning(f"⏳ The generator is busy right now ({e.depth} checklists waiting). Please try again in a minute.")
+        return
+    st.session_state["checklist_job"] = {"id": job_id, "topic": topic}
+    st.session_state["checklist_job_error"] = None
+
+def polling_fragment(func):
+    """Rerun `func` every JOB_POLL_SECONDS. Without fragment support the
+    whole script sleeps and reruns instead, for as long as `func` returns True."""
+    if hasattr(st, "fragment"):
+        return st.fragment(run_every=JOB_POLL_SECONDS)(func)
+    
+    def poll():
+        if func():
+            time.sleep(JOB_POLL_SECONDS)
+            st.rerun()
+    return poll
+
+@polling_fragment
+def render_checklist_job():
+    """Show the queued job's status; returns True while it is still pending"""
+    pending = st.session_state["checklist_job"]
+    if not pending:
+        return False
+    queue = get_job_queue()
+    job = queue.get(pending["id"])
+    
+    if job is None or job["status"] == "failed":
+        st.session_state["checklist_job"] = None
+        # Shown by the page, outside this fragment, so the next poll doesn't wipe it
+        st.session_state["checklist_job_error"] = job["error"] if job else "the job was lost"
+        st.rerun()
+    
+    if job["status"] == "done":
+        st.session_state["checklist_job"] = None
+        result = job["result"]
+        apply_checklist(pending["topic"], result["checklist"], result["youtube_links"], result.get("alternatives"))
+        # Full rerun so the new checklist replaces this status block
+        st.rerun()
+    
+    if job["status"] == "queued":
+        st.info(f"⏳ Waiting for a free generator · {queue.position(job['id'])} ahead of you")
+        return True
+    
+    progress = job["progress"] or {}
+    checklist = progress.get("checklist", [])
+    st.markdown("**Generating your personalized study checklist...**")
+    for item in checklist:
+        st.markdown(f"- {item}")
+    if checklist:
+        st.progress(progress.get("videos", 0) / len(checklist))
+        st.text(f"Found videos for {progress.get('videos', 0)}/{len(checklist)} topics")
+    return True
+
 # Study Checklist Function
 def study_checklist():
     st.subheader("📝 Study Checklist Generator")
@@ -485,117 +987,121 @@ def study_checklist():
         generate_btn = st.button("Generate Checklist", type="primary")
     
     if generate_btn and topic:
-        with st.spinner("Generating your personalized study checklist..."):
-            checklist = generate_checklist(topic)
+        if USE_JOB_QUEUE:
+            submit_checklist_job(topic, fresh=st.session_state["fresh_generations"])
+        else:
+            # Items render as they stream in; video lookups start per item
+            checklist, youtube_links, alternatives = generate_checklist_with_videos(
+                topic, fresh=st.session_state["fresh_generations"]
+            )
             
             if checklist:
-                st.session_state["checklist"] = checklist
-                st.session_state["progress"] = {item: False for item in checklist}
-                st.session_state["topic"] = topic
-                st.session_state["show_quiz"] = False
+                apply_checklist(topic, checklist, youtube_links, alternatives)
                 st.success("✅ Checklist generated successfully!")
-                
-                # Generate YouTube links
-                with st.spinner("Finding relevant video resources..."):
-                    youtube_links = generate_youtube_links(checklist)
-                    st.session_state["youtube_links"] = youtube_links
             else:
                 st.error("Failed to generate checklist. Please try again.")
     
+    if st.session_state["checklist_job"]:
+        render_checklist_job()
+    elif st.session_state["checklist_job_error"]:
+        st.error(f"Error generating checklist: {st.session_state['checklist_job_error']}")
+    
     # Display checklist
     if st.session_state["checklist"]:
         st.subheader(f"📋 Study Checklist for: {st.session_state['topic']}")
         
-        # Progress overview with enhanced styling
-        completed = sum(st.session_state["progress"].values())
-        total = len(st.session_state["progress"])
-        progress_percent = (completed / total * 100) if total > 0 else 0
+        render_checklist_progress()
         
-        # Progress metrics
-        col1, col2, col3 = st.columns([2, 1, 1])
-        
-        with col1:
-            st.markdown(f"""
-            <div style="background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%); padding: 1.5rem; border-radius: 15px; border: 1px solid #dee2e6;">
-                <h4 style="margin: 0 0 1rem 0; color: #2c3e50;">📊 Progress Overview</h4>
-                <div style="margin-bottom: 1rem;">
-                    <div style="display: flex; justify-content: space-between; margin-bottom: 0.5rem;">
-                        <span style="color: #666;">Progress</span>
-                        <span style="color: #2c3e50; font-weight: 600;">{progress_percent:.1f}%</span>
-                    </div>
-                    <div style="background: #e9ecef; height: 8px; border-radius: 4px; overflow: hidden;">
-                        <div style="background: linear-gradient(90deg, #4CAF50, #45a049); height: 100%; width: {progress_percent}%; transition: width 0.3s ease;"></div>
-                    </div>
-                </div>
-                <p style="margin: 0; color: #666; font-size: 0.9rem;">
-                    {completed}/{total} topics completed
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown(f"""
-            <div style="background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%); padding: 1.5rem; border-radius: 15px; border: 1px solid #90caf9; text-align: center;">
-                <h4 style="margin: 0 0 0.5rem 0; color: #1976d2;">🎯 Status</h4>
-                <p style="margin: 0; color: #1976d2; font-weight: 600; font-size: 1.2rem;">
-                    {completed}/{total}
-                </p>
-                <p style="margin: 0; color: #1976d2; font-size: 0.9rem;">Completed</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            if st.button("🔄 Regenerate", type="secondary", use_container_width=True):
-                st.session_state["checklist"] = []
-                st.session_state["progress"] = {}
-                st.rerun()
-        
-        # Checklist items
-        for i, item in enumerate(st.session_state["checklist"]):
-            is_completed = st.session_state["progress"].get(item, False)
-            
-            # Apply enhanced styling based on completion status
-            card_class = "study-card completed" if is_completed else "study-card"
-            
-            st.markdown(f"""
-            <div class="{card_class}">
-                <div style="display: flex; justify-content: space-between; align-items: center;">
-                    <div style="flex: 1;">
-                        <h4 style="margin: 0 0 0.5rem 0; color: {'#2196F3' if is_completed else '#2c3e50'};">
-                            {item}
-                        </h4>
-                        <p style="margin: 0; color: #666; font-size: 0.9rem;">
-                            {'✅ Completed' if is_completed else '⏳ Pending'}
-                        </p>
-                    </div>
-                    <div style="text-align: right;">
-                        {f'<a href="{st.session_state["youtube_links"][item]}" target="_blank" style="text-decoration: none; color: #007bff;">📺 Video</a>' if item in st.session_state["youtube_links"] else '<span style="color: #999;">🔍 No video</span>'}
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Hidden checkbox for state management
-            new_status = st.checkbox(
-                f"Mark as completed",
-                value=is_completed,
-                key=f"checkbox_{i}",
-                label_visibility="collapsed"
-            )
-            
-            if new_status != is_completed:
-                st.session_state["progress"][item] = new_status
-                st.rerun()
-        
-        # Visual progress
-        if total > 0:
-            st.subheader("📊 Visual Progress")
-            progress_data = pd.DataFrame({
-                "Status": ["Completed", "Remaining"],
-                "Count": [completed, total - completed]
-            })
-            fig = px.pie(progress_data, names="Status", values="Count", title="Progress Overview")
-            st.plotly_chart(fig, use_container_width=True)
+        # Runner-up videos come with the checklist (or from stored search results), never from a new search
+        with st.expander("📺 More videos per topic"):
+            for item in st.session_state["checklist"]:
+                alternatives = get_alternative_youtube_videos(item) if item in st.session_state["youtube_links"] else []
+                if alternatives:
+                    links = " · ".join(f"[Option {n}]({url})" for n, url in enumerate(alternatives, 2))
+                    st.markdown(f"**{item}**: {links}")
+
+# Chart Building
+# Figures and tables are memoized per session on a cheap fingerprint of the
+# state they show, so reruns that don't change it reuse the built object.
+FIGURE_CACHE_SIZE = int(os.getenv("FIGURE_CACHE_SIZE", "16"))
+
+def memoized_figure(name, fingerprint, build):
+    cache = st.session_state.setdefault("figure_cache", OrderedDict())
+    key = (name, fingerprint)
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    
+    value = build()
+    cache[key] = value
+    # Bounded per session: drop the least recently used figures
+    while len(cache) > FIGURE_CACHE_SIZE:
+        cache.popitem(last=False)
+    return value
+
+def build_progress_pie(completed, total, title="Progress Overview", colored=False):
+    # Charting libraries are only loaded once a chart is actually drawn
+    import pandas as pd
+    import plotly.express as px
+    
+    progress_data = pd.DataFrame({
+        "Status": ["Completed", "Remaining"],
+        "Count": [completed, total - completed]
+    })
+    if not colored:
+        return px.pie(progress_data, names="Status", values="Count", title=title)
+    
+    fig = px.pie(progress_data, names="Status", values="Count", 
+                title=title,
+                color_discrete_map={"Completed": "#4CAF50", "Remaining": "#FF9800"})
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+def build_progress_table(checklist, progress):
+    import pandas as pd
+    
+    return pd.DataFrame([
+        {
+            "Topic": item,
+            "Status": "✅ Completed" if progress.get(item, False) else "⏳ Pending",
+            "Progress": "100%" if progress.get(item, False) else "0%"
+        }
+        for item in checklist
+    ])
+
+def build_score_trend(trend, title="Quiz Score Trend"):
+    """Line chart of analytics.rolling_scores output"""
+    import plotly.express as px
+    
+    fig = px.line(trend, x="Quiz", y=["Score", "Rolling Average"], 
+                title=title,
+                markers=True)
+    fig.update_layout(yaxis_title="Score (%)", xaxis_title="Quiz Number", legend_title_text="")
+    return fig
+
+def history_records(history):
+    return [
+        {"topic": topic, "percentage": percentage, "taken_at": taken_at}
+        for topic, percentage, taken_at in history.entries()
+    ]
+
+def build_history_trend(history):
+    from analytics import results_frame, rolling_scores
+    
+    return build_score_trend(rolling_scores(results_frame(history_records(history))))
+
+def build_study_summary(user_id):
+    """analytics.dashboard_summary over the user's whole stored history, or
+    this session's quizzes when nobody is signed in"""
+    from analytics import dashboard_summary
+    
+    if user_id:
+        store = get_progress_store()
+        return dashboard_summary(store.load_quiz_results(user_id), store.load_activity(user_id))
+    return dashboard_summary(history_records(st.session_state["quiz_history"]))
+
+def quiz_scores_fingerprint():
+    return (st.session_state["topic"], st.session_state["quiz_history"].version)
 
 # Progress Dashboard Function
 def progress_dashboard():
@@ -659,16 +1165,11 @@ def progress_dashboard():
         st.write(f"Overall Progress: {progress_percent:.1f}%")
         
         # Progress chart
-        progress_data = pd.DataFrame({
-            "Status": ["Completed", "Remaining"],
-            "Count": [completed, remaining],
-            "Color": ["#4CAF50", "#FF9800"]
-        })
-        
-        fig = px.pie(progress_data, names="Status", values="Count", 
-                    title="Progress Distribution",
-                    color_discrete_map={"Completed": "#4CAF50", "Remaining": "#FF9800"})
-        fig.update_traces(textposition='inside', textinfo='percent+label')
+        fig = memoized_figure(
+            "progress_distribution",
+            (completed, total),
+            lambda: build_progress_pie(completed, total, "Progress Distribution", colored=True)
+        )
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
@@ -676,6 +1177,13 @@ def progress_dashboard():
         
         if st.button("🔄 Reset Progress", type="secondary"):
             st.session_state["progress"] = {item: False for item in st.session_state["checklist"]}
+            if current_user():
+                get_progress_store().save_checklist(
+                    current_user(),
+                    st.session_state["topic"],
+                    st.session_state["checklist"],
+                    st.session_state["youtube_links"]
+                )
             st.success("Progress reset successfully!")
             st.rerun()
         
@@ -688,26 +1196,55 @@ def progress_dashboard():
     # Detailed Progress Table
     st.subheader("📋 Detailed Progress")
     
-    progress_df = pd.DataFrame([
-        {
-            "Topic": item,
-            "Status": "✅ Completed" if st.session_state["progress"].get(item, False) else "⏳ Pending",
-            "Progress": "100%" if st.session_state["progress"].get(item, False) else "0%"
-        }
-        for item in st.session_state["checklist"]
-    ])
+    progress_df = memoized_figure(
+        "progress_table",
+        (st.session_state["topic"], tuple(st.session_state["progress"].get(item, False) for item in st.session_state["checklist"])),
+        lambda: build_progress_table(st.session_state["checklist"], st.session_state["progress"])
+    )
     
     st.dataframe(progress_df, use_container_width=True)
     
+    # Review schedule (see review_scheduler.py)
+    refresh_study_schedule()
+    schedule = st.session_state["study_schedule"]
+    if schedule:
+        st.subheader("🗓️ Review Schedule")
+        today = datetime.now().date()
+        st.dataframe(
+            {
+                "Topic": list(schedule),
+                "Next Review": [due.isoformat() if due > today else "Due now" for due in schedule.values()],
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    # Cohort difficulty, precomputed offline by cohort_stats.py
+    from cohort_stats import topic_item_stats
+    cohort = topic_item_stats(st.session_state["topic"], st.session_state["checklist"])
+    if cohort is not None and len(cohort):
+        st.subheader("👥 How Other Learners Do")
+        st.dataframe(
+            {
+                "Topic": cohort["item"],
+                "Answers": cohort["answers"],
+                "Answered Correctly (%)": (cohort["correct_rate"] * 100).round(1),
+                "Discrimination": cohort["discrimination"].round(2),
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+    
     # Quiz Performance (if available)
-    if st.session_state.get("quiz_scores"):
+    history = st.session_state["quiz_history"]
+    if len(history):
         st.markdown("---")
         st.subheader("🧠 Quiz Performance")
         
         col1, col2 = st.columns(2)
         
         with col1:
-            avg_score = sum(st.session_state["quiz_scores"]) / len(st.session_state["quiz_scores"])
+            avg_score = history.average()
             st.metric("Average Quiz Score", f"{avg_score:.1f}%")
             
             if avg_score >= 80:
@@ -719,102 +1256,183 @@ def progress_dashboard():
         
         with col2:
             # Quiz score trend
-            if len(st.session_state["quiz_scores"]) > 1:
-                scores_df = pd.DataFrame({
-                    "Quiz": range(1, len(st.session_state["quiz_scores"]) + 1),
-                    "Score": st.session_state["quiz_scores"]
-                })
-                
-                fig = px.line(scores_df, x="Quiz", y="Score", 
-                            title="Quiz Score Trend",
-                            markers=True)
-                fig.update_layout(yaxis_title="Score (%)", xaxis_title="Quiz Number")
+            if len(history) > 1:
+                fig = memoized_figure(
+                    "score_trend",
+                    quiz_scores_fingerprint(),
+                    lambda: build_history_trend(history)
+                )
                 st.plotly_chart(fig, use_container_width=True)
+    
+    # Study Analytics, over the whole stored history
+    summary = memoized_figure(
+        "study_summary",
+        (current_user(), history.version, completed),
+        lambda: build_study_summary(current_user())
+    )
+    if summary["quizzes"] or summary["current_streak"]:
+        st.markdown("---")
+        st.subheader("📈 Study Analytics")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Current Streak", f"{summary['current_streak']} days")
+        with col2:
+            st.metric("Longest Streak", f"{summary['longest_streak']} days")
+        with col3:
+            st.metric("Study Time (7 days)", f"{summary['minutes_last_7_days']:.0f} min")
+        with col4:
+            st.metric("Quizzes Taken", summary["quizzes"])
+        
+        if summary["quizzes"]:
+            st.markdown("#### 🎯 Accuracy by Topic")
+            st.dataframe(summary["topics"], use_container_width=True, hide_index=True)
+        
+        if len(summary["minutes_per_day"]) > 1:
+            st.markdown("#### ⏱️ Time on Task")
+            st.bar_chart(summary["minutes_per_day"])
 
 # Main Application
+# Admin Panel
+# Off by default; set ADMIN_PANEL=1 to list it in the navigation
+ADMIN_PANEL = os.getenv("ADMIN_PANEL", "").lower() in ("1", "true", "yes")
+
+def admin_panel():
+    """Per-session latency, token and cache breakdown of traced calls"""
+    st.markdown("## 🛠️ Admin")
+    tracer = get_tracer()
+    rows = tracer.session_breakdown()
+    if not rows:
+        st.info("No calls traced yet.")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Traced Calls", sum(row["calls"] for row in rows))
+    with col2:
+        st.metric("Tokens", sum(row["tokens"] for row in rows))
+    with col3:
+        st.metric("Retries", sum(row["retries"] for row in rows))
+    
+    st.markdown("### ⏱️ Latency by Session")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    
+    st.markdown("### 🔌 Connection Reuse")
+    st.dataframe(
+        [{"pool": pool, **counts} for pool, counts in connection_stats.stats().items()],
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    with st.expander("Prometheus metrics"):
+        st.code(tracer.prometheus_text(), language="text")
+
 def main():
     # FIXED: Initialize session state first
     initialize_session_state()
+    bind_session(st.session_state["session_id"])
     
     # Header with enhanced styling
-    st.markdown("""
-    <div class="main-header fade-in">
-        <h1>📚 StudyHub - Smart Learning Platform</h1>
-        <p>Your AI-powered companion for effective studying and skill development</p>
-        <div style="margin-top: 1rem; opacity: 0.8;">
-            <span style="background: rgba(255,255,255,0.2); padding: 0.5rem 1rem; border-radius: 20px; margin: 0 0.5rem;">
-                🎯 Personalized Learning
-            </span>
-            <span style="background: rgba(255,255,255,0.2); padding: 0.5rem 1rem; border-radius: 20px; margin: 0 0.5rem;">
-                📊 Progress Tracking
-            </span>
-            <span style="background: rgba(255,255,255,0.2); padding: 0.5rem 1rem; border-radius: 20px; margin: 0 0.5rem;">
-                🧠 AI-Powered Quizzes
-            </span>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
     
     # Enhanced Sidebar Navigation
     with st.sidebar:
-        st.markdown("""
-        <div style="text-align: center; padding: 1rem 0;">
-            <h2 style="color: white; margin-bottom: 1rem;">🎯 StudyHub</h2>
-            <div style="background: rgba(255,255,255,0.1); padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
-                <p style="color: white; margin: 0; font-size: 0.9rem;">Current Topic</p>
-                <p style="color: #4CAF50; font-weight: bold; margin: 0;">{}</p>
-            </div>
-        </div>
-        """.format(st.session_state.get("topic", "None Selected")), unsafe_allow_html=True)
+        # Signing in with a name keeps progress across reconnects
+        st.text_input("👤 Your name", key="user_id", placeholder="Enter a name to save progress")
+        sync_user_session()
+        if current_user():
+            bind_session(f"{current_user()} ({st.session_state['session_id']})")
+        
+        if current_user() and st.session_state["saved_topics"]:
+            topics = st.session_state["saved_topics"]
+            st.selectbox(
+                "📂 Saved topics",
+                topics,
+                index=topics.index(st.session_state["topic"]) if st.session_state["topic"] in topics else 0,
+                key="saved_topic_choice",
+                on_change=switch_saved_topic
+            )
+        
+        st.markdown(sidebar_brand_html(st.session_state.get("topic")), unsafe_allow_html=True)
         
         st.markdown("---")
         
         # Navigation with icons and better styling
         st.markdown("### 🧭 Navigation")
         
+        pages = ["📝 Study Checklist", "🎯 Quiz Center", "📊 Progress Dashboard"]
+        if ADMIN_PANEL:
+            pages.append("🛠️ Admin")
         page = st.selectbox(
             "Choose a section:",
-            ["📝 Study Checklist", "🎯 Quiz Center", "📊 Progress Dashboard"],
+            pages,
             label_visibility="collapsed"
         )
         
         st.markdown("---")
         
         # Quick Stats
+        # Checkbox clicks rerun only the checklist fragment, which shows the live
+        # count; this copy catches up on the next full rerun
         if st.session_state.get("checklist"):
             completed = sum(st.session_state["progress"].values())
             total = len(st.session_state["progress"])
             progress_percent = (completed / total * 100) if total > 0 else 0
             
             st.markdown("### 📈 Quick Stats")
-            st.markdown(f"""
-            <div style="background: rgba(255,255,255,0.1); padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
-                <p style="color: white; margin: 0; font-size: 0.9rem;">Progress</p>
-                <p style="color: #4CAF50; font-weight: bold; margin: 0; font-size: 1.5rem;">{progress_percent:.1f}%</p>
-                <p style="color: rgba(255,255,255,0.8); margin: 0; font-size: 0.8rem;">{completed}/{total} completed</p>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(
+                sidebar_stat_html("Progress", f"{progress_percent:.1f}%", "#4CAF50", "1.5rem", f"{completed}/{total} completed"),
+                unsafe_allow_html=True
+            )
             
             # Progress bar
             st.progress(completed / total if total > 0 else 0)
+            st.caption("Updates when you switch pages or topics")
+        
+        # Response cache controls
+        st.markdown("### ⚡ AI Cache")
+        st.checkbox(
+            "Force fresh generations",
+            key="fresh_generations",
+            help="Skip cached checklist and quiz answers and ask the model again"
+        )
+        cache_stats = get_response_cache().stats()
+        st.caption(f"Hits: {cache_stats['hits']} · Misses: {cache_stats['misses']} · Stored: {cache_stats['entries']}")
+        quota = get_youtube_cache().quota_usage()
+        st.caption(f"YouTube quota today: {quota['spent']} units spent · {quota['saved']} saved by cache")
+        shared = sum(counts.get("shared", 0) for counts in get_io_core().inflight.stats().values())
+        st.caption(f"Requests joined in flight: {shared}")
+        
+        with st.expander("🛡️ API health"):
+            health = get_io_core().resilience.stats()
+            if not health:
+                st.caption("No API calls yet")
+            for endpoint, counts in health.items():
+                st.caption(
+                    f"**{endpoint}** · breaker {counts['breaker']} · "
+                    f"{counts.get('successes', 0)} ok · {counts.get('retries', 0)} retries · "
+                    f"{counts.get('failures', 0)} failures · {counts.get('rejected', 0)} rejected · "
+                    f"{counts.get('hedges', 0)} hedged ({counts.get('hedge_wins', 0)} won)"
+                )
+            for pool, counts in connection_stats.stats().items():
+                st.caption(f"**{pool}** connections · {counts['opened']} opened for {counts['requests']} requests ({counts['reuse_ratio']:.0%} reused)")
         
         # User Points and Streak
-        if st.session_state.get("user_points", 0) > 0:
+        if st.session_state.get("user_points", 0) > 0 or st.session_state.get("study_streak", 0) > 0:
             st.markdown("### 🏆 Achievements")
-            st.markdown(f"""
-            <div style="background: rgba(255,255,255,0.1); padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
-                <p style="color: white; margin: 0; font-size: 0.9rem;">Points</p>
-                <p style="color: #FFD700; font-weight: bold; margin: 0; font-size: 1.2rem;">{st.session_state['user_points']} pts</p>
-            </div>
-            """, unsafe_allow_html=True)
+            if st.session_state.get("user_points", 0) > 0:
+                st.markdown(sidebar_stat_html("Points", f"{st.session_state['user_points']} pts", "#FFD700"), unsafe_allow_html=True)
             
             if st.session_state.get("study_streak", 0) > 0:
-                st.markdown(f"""
-                <div style="background: rgba(255,255,255,0.1); padding: 1rem; border-radius: 10px;">
-                    <p style="color: white; margin: 0; font-size: 0.9rem;">Study Streak</p>
-                    <p style="color: #FF6B6B; font-weight: bold; margin: 0; font-size: 1.2rem;">🔥 {st.session_state['study_streak']} days</p>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(
+                    sidebar_stat_html("Study Streak", f"🔥 {st.session_state['study_streak']} days", "#FF6B6B"),
+                    unsafe_allow_html=True
+                )
+        
+        if st.session_state["topic"]:
+            due = due_review_count()
+            if due:
+                st.caption(f"🔁 {due} review{'s' if due != 1 else ''} due in {st.session_state['topic']}")
     
     # Main content based on navigation
     if page == "📝 Study Checklist":
@@ -823,6 +1441,8 @@ def main():
         quiz_center()
     elif page == "📊 Progress Dashboard":
         progress_dashboard()
+    elif page == "🛠️ Admin":
+        admin_panel()
 
 if __name__ == "__main__":
     main()
@@ -1,64 +1,54 @@
 import streamlit as st
-import os
-import json
-import pandas as pd
-import plotly.express as px
-from groq import Groq
-from googleapiclient.discovery import build
+import asyncio
 from dotenv import load_dotenv
 import random
+from async_io import get_io_core
 
 load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-
 # Checklist Functions
 def generate_checklist(topic):
-    chat_completion = client.chat.completions.create(
-        messages=[{"role": "user", "content": f"Generate a concise checklist (max 10 items) of key topics for studying {topic}."}],
-        model="llama-3.3-70b-versatile",
-        max_tokens=1000,
-        stream=False,
-    )
-    checklist = chat_completion.choices[0].message.content.split("\n")
+    core = get_io_core()
+    chat_completion = core.run(core.groq_chat(
+        [{"role": "user", "content": f"Generate a concise checklist (max 10 items) of key topics for studying {topic}."}],
+        "llama-3.3-70b-versatile",
+        1000,
+    ))
+    checklist = chat_completion["choices"][0]["message"]["content"].split("\n")
     checklist = [item.strip() for item in checklist if item.strip() and not item.lower().startswith("Here's a")]
     checklist.pop(0)
     return checklist
 
-def get_best_youtube_video(query):
-    request = youtube.search().list(
-        part="snippet",
-        maxResults=3,
-        q=query,
-        type="video",
-        order="relevance"
-    )
-    response = request.execute()
+def best_video_link(response):
     if response['items']:
         video_id = response['items'][0]['id']['videoId']
         return f"https://www.youtube.com/watch?v={video_id}"
     return None
 
+def get_best_youtube_video(query):
+    core = get_io_core()
+    return best_video_link(core.run(core.youtube_search(query, max_results=3)))
+
 def generate_youtube_links(checklist):
+    # All searches are in flight at once on the shared I/O core
+    core = get_io_core()
+    futures = {item: core.submit(core.youtube_search(item, max_results=3)) for item in checklist}
     youtube_links = {}
-    for item in checklist:
-        video_link = get_best_youtube_video(item)
+    for item, future in futures.items():
+        video_link = best_video_link(future.result())
         if video_link:
             youtube_links[item] = video_link
     return youtube_links
 
 # Quiz Functions
-def generate_quiz_question(topic, checklist_item, difficulty):
+async def agenerate_quiz_question(topic, checklist_item, difficulty):
     prompt = f"Create a {difficulty}-difficulty multiple choice question about '{checklist_item}' in the context of {topic}. Provide 1 correct answer and 3 incorrect answers. Return in this format:\nQuestion: [question text]\nA) [correct answer]\nB) [incorrect1]\nC) [incorrect2]\nD) [incorrect3]"
-    chat_completion = client.chat.completions.create(
-        messages=[{"role": "user", "content": prompt}],
-        model="llama-3.3-70b-versatile",
-        max_tokens=500,
-        stream=False,
+    chat_completion = await get_io_core().groq_chat(
+        [{"role": "user", "content": prompt}],
+        "llama-3.3-70b-versatile",
+        500,
     )
-    response = chat_completion.choices[0].message.content.split("\n")
+    response = chat_completion["choices"][0]["message"]["content"].split("\n")
     question = response[0].replace("Question: ", "")
     options = [line[3:] for line in response[1:5]]
     correct_answer = options[0]
@@ -66,12 +56,14 @@ def generate_quiz_question(topic, checklist_item, difficulty):
     return question, options, correct_answer
 
 def generate_quiz(topic, checklist, difficulty):
-    questions = []
     random_items = random.sample(checklist, min(5, len(checklist)))
-    for item in random_items:
-        q, opts, correct = generate_quiz_question(topic, item, difficulty)
-        questions.append({"question": q, "options": opts, "correct": correct})
-    return questions
+    
+    # Every question is in flight at once on the shared I/O core
+    async def generate_all():
+        return await asyncio.gather(*(agenerate_quiz_question(topic, item, difficulty) for item in random_items))
+    
+    generated = get_io_core().run(generate_all())
+    return [{"question": q, "options": opts, "correct": correct} for q, opts, correct in generated]
 
 # Streamlit UI
 st.title("Study Preparation App")
@@ -107,6 +99,9 @@ if "checklist" in st.session_state:
     total = len(st.session_state["progress"])
     st.progress(completed / total)
 
+    import pandas as pd
+    import plotly.express as px
+
     progress_df = pd.DataFrame({"Status": ["Completed", "Remaining"], "Count": [completed, total - completed]})
     fig = px.pie(progress_df, names="Status", values="Count", title="Progress Overview")
     st.plotly_chart(fig)
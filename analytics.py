@@ -0,0 +1,133 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dateutil import tz
+
+# Progress Dashboard analytics, computed in bulk.
+# Everything works on whole columns of a user's persisted history (quiz
+# results from the progress store, activity timestamps) with NumPy/pandas
+# operations instead of per-row Python loops, so a user with thousands of
+# quiz attempts costs about the same to summarize as one with ten.
+#
+# Days and clock times are local to STUDY_TIMEZONE (an IANA name such as
+# "Europe/Berlin"), or the server's zone when unset. Each timestamp is
+# converted with the offset in force at that moment, so streaks and daily
+# totals stay right across daylight saving changes.
+
+# A gap between two study events longer than this counts as a break, not study time
+IDLE_CUTOFF_SECONDS = 30 * 60
+# Credit for a lone event (or the last in a sitting) with nothing after it to measure against
+EVENT_CREDIT_SECONDS = 60
+ROLLING_WINDOW = 5
+
+SECONDS_PER_DAY = 86400
+
+
+def results_frame(results):
+    """Quiz results as a DataFrame sorted oldest first.
+
+    Rows need topic, percentage and taken_at; score and total are optional
+    (a row without them counts as one quiz worth 100 points)."""
+    frame = pd.DataFrame.from_records(results, columns=["topic", "score", "total", "percentage", "taken_at"])
+    if frame.empty:
+        return frame
+    missing = frame["total"].isna()
+    frame.loc[missing, "score"] = frame.loc[missing, "percentage"]
+    frame.loc[missing, "total"] = 100
+    frame = frame.astype({"score": "float64", "total": "float64", "percentage": "float64", "taken_at": "float64"})
+    return frame.sort_values("taken_at", kind="stable").reset_index(drop=True)
+
+
+def topic_accuracy(frame):
+    """Per-topic quiz count and accuracy (questions right / questions asked), weakest first"""
+    if frame.empty:
+        return pd.DataFrame(columns=["Topic", "Quizzes", "Accuracy", "Last Taken"])
+    grouped = frame.groupby("topic", sort=False).agg(
+        Quizzes=("percentage", "size"),
+        score=("score", "sum"),
+        total=("total", "sum"),
+        last=("taken_at", "max"),
+    )
+    table = pd.DataFrame({
+        "Topic": grouped.index,
+        "Quizzes": grouped["Quizzes"].to_numpy(),
+        "Accuracy": np.round(grouped["score"].to_numpy() / np.maximum(grouped["total"].to_numpy(), 1) * 100, 1),
+        "Last Taken": _local_times(grouped["last"].to_numpy()).floor("min"),
+    })
+    return table.sort_values("Accuracy", kind="stable").reset_index(drop=True)
+
+
+def rolling_scores(frame, window=ROLLING_WINDOW):
+    """Each quiz's score next to the rolling average of the last `window` quizzes"""
+    scores = frame["percentage"]
+    return pd.DataFrame({
+        "Quiz": np.arange(1, len(scores) + 1),
+        "Score": scores.to_numpy(),
+        "Rolling Average": scores.rolling(window, min_periods=1).mean().to_numpy(),
+    })
+
+
+def _timezone():
+    return os.getenv("STUDY_TIMEZONE") or tz.tzlocal()
+
+
+def _local_times(timestamps):
+    """Naive local wall-clock times for Unix timestamps"""
+    utc = pd.to_datetime(np.asarray(timestamps, dtype="float64"), unit="s", utc=True)
+    return utc.tz_convert(_timezone()).tz_localize(None)
+
+
+def _local_days(timestamps):
+    """Local calendar day numbers (days since 1970-01-01) for Unix timestamps"""
+    return _local_times(timestamps).to_numpy().astype("datetime64[D]").astype("int64")
+
+
+def study_streaks(timestamps, now=None):
+    """(current, longest) run of consecutive days with any study activity.
+    The current streak survives until a full day passes with nothing done."""
+    if len(timestamps) == 0:
+        return 0, 0
+    days = np.unique(_local_days(timestamps))
+    # A new run starts wherever consecutive active days are more than a day apart
+    starts = np.flatnonzero(np.diff(days, prepend=days[0] - 2) != 1)
+    lengths = np.diff(np.append(starts, len(days)))
+    today = _local_days([now if now is not None else datetime.now().timestamp()])[0]
+    current = int(lengths[-1]) if today - days[-1] <= 1 else 0
+    return current, int(lengths.max())
+
+
+def time_on_task(timestamps, idle_cutoff=IDLE_CUTOFF_SECONDS, event_credit=EVENT_CREDIT_SECONDS):
+    """Estimated study minutes per local day: gaps between consecutive events
+    count while shorter than `idle_cutoff`, and each sitting's last event earns
+    `event_credit`"""
+    if len(timestamps) == 0:
+        return pd.Series(index=pd.DatetimeIndex([]), dtype="float64", name="Minutes")
+    stamps = np.sort(np.asarray(timestamps, dtype="float64"))
+    gaps = np.diff(stamps, append=np.inf)
+    seconds = np.where(gaps <= idle_cutoff, gaps, event_credit)
+    days = _local_days(stamps)
+    minutes = pd.Series(seconds / 60, index=pd.to_datetime(days * SECONDS_PER_DAY, unit="s"), name="Minutes")
+    return minutes.groupby(level=0).sum()
+
+
+def dashboard_summary(results, activity=(), now=None):
+    """Everything the Progress Dashboard shows about quiz history and study habits"""
+    frame = results_frame(results)
+    stamps = np.concatenate([frame["taken_at"].to_numpy(dtype="float64") if len(frame) else np.empty(0),
+                             np.asarray(activity, dtype="float64")])
+    current_streak, longest_streak = study_streaks(stamps, now)
+    minutes = time_on_task(stamps)
+    now = now if now is not None else datetime.now().timestamp()
+    recent = minutes[minutes.index >= pd.to_datetime((_local_days([now])[0] - 6) * SECONDS_PER_DAY, unit="s")]
+    return {
+        "quizzes": len(frame),
+        "average": float(frame["percentage"].mean()) if len(frame) else None,
+        "topics": topic_accuracy(frame),
+        "trend": rolling_scores(frame),
+        "current_streak": current_streak,
+        "longest_streak": longest_streak,
+        "minutes_per_day": minutes,
+        "minutes_last_7_days": float(recent.sum()),
+    }
@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+
+import httpx
+
+from async_io import EXPECTED_SESSIONS, pool_limits
+from metrics import current_session, connection_stats
+
+# Client for the generation service in backend/app.
+# When QUESTIFY_API_URL is set the Streamlit app becomes a thin client: it
+# sends checklist, quiz and video work here instead of calling Groq and
+# YouTube itself, so generation can be scaled separately from the UI.
+
+
+class APIError(Exception):
+    """The service answered with an error; the message is its detail"""
+
+
+class QuestifyClient:
+    def __init__(self, base_url, timeout=120.0, expected_sessions=EXPECTED_SESSIONS):
+        max_connections, keepalive = pool_limits(expected_sessions)
+        self.http = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=keepalive),
+        )
+
+    def _headers(self):
+        # Lets the service attribute latency to the calling session
+        session_id = current_session.get()
+        return {"X-Session-Id": session_id} if session_id else {}
+
+    def _extensions(self):
+        # Counts the connections this client had to open (see metrics.ConnectionStats)
+        return {"trace": connection_stats.trace_hook("questify_api")}
+
+    def _post(self, path, payload):
+        connection_stats.count("questify_api", "requests")
+        response = self.http.post(path, json=payload, headers=self._headers(), extensions=self._extensions())
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail", response.text)
+            except ValueError:
+                detail = response.text
+            raise APIError(f"{response.status_code}: {detail}")
+        return response.json()
+
+    def checklist(self, topic, fresh=False):
+        return self._post("/v1/checklist", {"topic": topic, "fresh": fresh})["checklist"]
+
+    def stream_checklist(self, topic, fresh=False):
+        """Yield the service's checklist events ("item", then "video" as lookups land)"""
+        connection_stats.count("questify_api", "requests")
+        with self.http.stream(
+            "POST", "/v1/checklist/stream", json={"topic": topic, "fresh": fresh},
+            headers=self._headers(), extensions=self._extensions(),
+        ) as response:
+            if response.status_code >= 400:
+                response.read()
+                raise APIError(f"{response.status_code}: {response.text}")
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["event"] == "error":
+                    raise APIError(event["detail"])
+                if event["event"] == "done":
+                    return
+                yield event
+
+    def quiz(self, topic, checklist, difficulty, num_questions=5, concurrent=True, fresh=False,
+             batch=True, use_bank=True, exclude=(), allow_partial=False):
+        """Quiz entries as the app stores them; with allow_partial, failed ones have question None"""
+        return self._post("/v1/quiz", {
+            "topic": topic,
+            "checklist": list(checklist),
+            "difficulty": difficulty,
+            "num_questions": num_questions,
+            "concurrent": concurrent,
+            "fresh": fresh,
+            "batch": batch,
+            "use_bank": use_bank,
+            "exclude": list(exclude),
+            "allow_partial": allow_partial,
+        })["questions"]
+
+    def youtube_links(self, checklist):
+        """Returns (links, errors) like generation.agenerate_youtube_links"""
+        data = self._post("/v1/youtube/links", {"checklist": list(checklist)})
+        return data["links"], data["errors"]
+
+    def youtube_search(self, query):
+        return self._post("/v1/youtube/search", {"query": query})["video_ids"]
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_api_client():
+    """Process-wide client for QUESTIFY_API_URL, or None to generate in-process"""
+    global _default_client
+    base_url = os.getenv("QUESTIFY_API_URL")
+    if not base_url:
+        return None
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = QuestifyClient(base_url, timeout=float(os.getenv("QUESTIFY_API_TIMEOUT", "120")))
+        return _default_client
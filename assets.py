@@ -0,0 +1,161 @@
+import html
+import re
+from functools import lru_cache
+
+# Static CSS and HTML templates for the Streamlit pages.
+# Streamlit re-executes the page script on every rerun of every session, but
+# this module is imported once per process: the stylesheet and templates are
+# minified here once, and rendered fragments that repeat across reruns (the
+# same card with the same state) come from a small cache instead of being
+# formatted again. Minifying also shrinks what each rerun ships to the browser.
+
+# Rendered fragments worth keeping. The cache is process-wide and shared by
+# every session, so cached renderers must depend only on their arguments:
+# item text, state and video URL, never the user or anything from session state.
+TEMPLATE_CACHE_SIZE = 1024
+
+
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{}:;,])\s*", r"\1", css).replace(";}", "}").strip()
+
+
+def minify_html(markup):
+    """Collapse the indentation of a template onto one line (Markdown would
+    otherwise render indented lines as code blocks)"""
+    markup = re.sub(r">\s+<", "><", markup.strip())
+    return re.sub(r"\s+", " ", markup)
+
+
+APP_CSS = """
+.main-header {
+    background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
+    padding: 2rem;
+    border-radius: 10px;
+    color: white;
+    text-align: center;
+    margin-bottom: 2rem;
+}
+
+.study-card {
+    background: white;
+    padding: 1.5rem;
+    border-radius: 10px;
+    box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+    margin: 1rem 0;
+    border-left: 4px solid #4CAF50;
+    transition: transform 0.3s ease;
+}
+
+.study-card:hover {
+    transform: translateY(-2px);
+    box-shadow: 0 6px 20px rgba(0,0,0,0.15);
+}
+
+.study-card.completed {
+    border-left-color: #2196F3;
+    background: #f8f9fa;
+}
+
+.metric-card {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    padding: 1.5rem;
+    border-radius: 10px;
+    color: white;
+    text-align: center;
+    margin: 0.5rem;
+}
+
+.quiz-question {
+    background: white;
+    padding: 1.5rem;
+    border-radius: 10px;
+    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+    margin: 1rem 0;
+    border-left: 4px solid #007bff;
+}
+"""
+
+STYLE_HTML = f"<style>{minify_css(APP_CSS)}</style>"
+
+HEADER_HTML = minify_html("""
+<div class="main-header fade-in">
+    <h1>📚 StudyHub - Smart Learning Platform</h1>
+    <p>Your AI-powered companion for effective studying and skill development</p>
+    <div style="margin-top: 1rem; opacity: 0.8;">
+        <span style="background: rgba(255,255,255,0.2); padding: 0.5rem 1rem; border-radius: 20px; margin: 0 0.5rem;">
+            🎯 Personalized Learning
+        </span>
+        <span style="background: rgba(255,255,255,0.2); padding: 0.5rem 1rem; border-radius: 20px; margin: 0 0.5rem;">
+            📊 Progress Tracking
+        </span>
+        <span style="background: rgba(255,255,255,0.2); padding: 0.5rem 1rem; border-radius: 20px; margin: 0 0.5rem;">
+            🧠 AI-Powered Quizzes
+        </span>
+    </div>
+</div>
+""")
+
+SIDEBAR_BRAND_TEMPLATE = minify_html("""
+<div style="text-align: center; padding: 1rem 0;">
+    <h2 style="color: white; margin-bottom: 1rem;">🎯 StudyHub</h2>
+    <div style="background: rgba(255,255,255,0.1); padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
+        <p style="color: white; margin: 0; font-size: 0.9rem;">Current Topic</p>
+        <p style="color: #4CAF50; font-weight: bold; margin: 0;">{topic}</p>
+    </div>
+</div>
+""")
+
+SIDEBAR_STAT_TEMPLATE = minify_html("""
+<div style="background: rgba(255,255,255,0.1); padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
+    <p style="color: white; margin: 0; font-size: 0.9rem;">{label}</p>
+    <p style="color: {color}; font-weight: bold; margin: 0; font-size: {size};">{value}</p>
+    {note}
+</div>
+""")
+
+SIDEBAR_STAT_NOTE_TEMPLATE = '<p style="color: rgba(255,255,255,0.8); margin: 0; font-size: 0.8rem;">{note}</p>'
+
+STUDY_CARD_TEMPLATE = minify_html("""
+<div class="{card_class}">
+    <div style="display: flex; justify-content: space-between; align-items: center;">
+        <div style="flex: 1;">
+            <h4 style="margin: 0 0 0.5rem 0; color: {title_color};">
+                {item}
+            </h4>
+            <p style="margin: 0; color: #666; font-size: 0.9rem;">
+                {status}
+            </p>
+        </div>
+        <div style="text-align: right;">
+            {video}
+        </div>
+    </div>
+</div>
+""")
+
+VIDEO_LINK_TEMPLATE = '<a href="{url}" target="_blank" style="text-decoration: none; color: #007bff;">📺 Video</a>'
+NO_VIDEO_HTML = '<span style="color: #999;">🔍 No video</span>'
+
+
+def sidebar_brand_html(topic):
+    return SIDEBAR_BRAND_TEMPLATE.format(topic=html.escape(topic or "None Selected"))
+
+
+def sidebar_stat_html(label, value, color, size="1.2rem", note=None):
+    return SIDEBAR_STAT_TEMPLATE.format(
+        label=label, value=value, color=color, size=size,
+        note=SIDEBAR_STAT_NOTE_TEMPLATE.format(note=note) if note else "",
+    )
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def study_card_html(item, completed, video_url=None):
+    return STUDY_CARD_TEMPLATE.format(
+        card_class="study-card completed" if completed else "study-card",
+        title_color="#2196F3" if completed else "#2c3e50",
+        item=html.escape(item),
+        status="✅ Completed" if completed else "⏳ Pending",
+        video=VIDEO_LINK_TEMPLATE.format(url=html.escape(video_url)) if video_url else NO_VIDEO_HTML,
+    )
@@ -0,0 +1,328 @@
+import asyncio
+import contextvars
+import json
+import os
+import queue
+import threading
+
+import httpx
+
+from resilience import ResilienceLayer
+from metrics import current_span, connection_stats
+from singleflight import SingleFlight
+
+# Shared async I/O core for every outbound Groq and YouTube call.
+# One event loop runs on a background thread for the whole process and owns a
+# pooled keep-alive HTTP client. Streamlit script threads hand coroutines to it
+# and wait only on their own result, so one session's slow call never holds a
+# connection or thread that another session needs. Each provider has its own
+# concurrency limit and timeout, and abandoned calls are cancelled. Retries,
+# circuit breakers and hedging come from the resilience layer, and identical
+# concurrent calls can be collapsed into one through `inflight`.
+
+# Overridable so benchmarks (bench_pipeline.py) and proxies can stand in for the real APIs
+GROQ_CHAT_URL = os.getenv("GROQ_CHAT_URL", "https://api.groq.com/openai/v1/chat/completions")
+YOUTUBE_SEARCH_URL = os.getenv("YOUTUBE_SEARCH_URL", "https://www.googleapis.com/youtube/v3/search")
+
+# Sessions the process is expected to serve at once, and the outbound calls a
+# busy session has on the wire together (a completion plus a video search)
+EXPECTED_SESSIONS = int(os.getenv("EXPECTED_SESSIONS", "10"))
+CALLS_PER_SESSION = 2
+
+
+def pool_limits(expected_sessions, ceiling=None):
+    """(max_connections, max_keepalive) for an HTTP pool shared by `expected_sessions`.
+    Keep-alive covers what those sessions have in flight together; `ceiling`
+    caps both when something else (e.g. per-provider limits) already bounds
+    how many calls can be on the wire."""
+    wanted = max(1, CALLS_PER_SESSION * expected_sessions)
+    if ceiling:
+        return ceiling, min(wanted, ceiling)
+    return wanted, wanted
+
+
+class AsyncIOCore:
+    def __init__(self, limits, timeouts, pool_size=20, keepalive=None, resilience=None):
+        self.limits = limits
+        self.timeouts = timeouts
+        self.pool_size = pool_size
+        self.keepalive = min(keepalive or pool_size, pool_size)
+        self.resilience = resilience or ResilienceLayer()
+        self.inflight = SingleFlight()
+        self.semaphores = {}
+        self.http = None
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-io", daemon=True)
+        self.thread.start()
+
+    # Bridging from synchronous code
+
+    def submit(self, coro):
+        """Schedule a coroutine on the I/O loop; returns a concurrent.futures.Future.
+        The caller's context variables (session, tracing span) go with it."""
+        return asyncio.run_coroutine_threadsafe(_with_context(contextvars.copy_context(), coro), self.loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the I/O loop and wait for it, cancelling it on timeout"""
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("AsyncIOCore.run() called from the I/O loop; await the coroutine instead")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def iterate(self, agen, timeout=None):
+        """Consume an async generator from synchronous code, item by item.
+        Stopping early (break, exception, rerun) cancels the generator."""
+        items = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put((True, item))
+            except BaseException as e:
+                items.put((False, e))
+                raise
+            else:
+                items.put((False, done))
+
+        future = self.submit(pump())
+        try:
+            while True:
+                ok, value = items.get(timeout=timeout)
+                if ok:
+                    yield value
+                elif value is done:
+                    return
+                else:
+                    raise value
+        finally:
+            future.cancel()
+
+    # Bridging from another event loop (e.g. an ASGI server's)
+
+    async def arun(self, coro):
+        """Await a coroutine that runs on the I/O loop; cancelling the caller cancels it"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    async def aiterate(self, agen):
+        """Consume an async generator that runs on the I/O loop, item by item"""
+        loop = asyncio.get_running_loop()
+        items = asyncio.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    loop.call_soon_threadsafe(items.put_nowait, (True, item))
+            except BaseException as e:
+                loop.call_soon_threadsafe(items.put_nowait, (False, e))
+                raise
+            else:
+                loop.call_soon_threadsafe(items.put_nowait, (False, done))
+
+        future = self.submit(pump())
+        try:
+            while True:
+                ok, value = await items.get()
+                if ok:
+                    yield value
+                elif value is done:
+                    return
+                else:
+                    raise value
+        finally:
+            future.cancel()
+
+    # Pooled connections and per-provider limits (only touched on the loop)
+
+    def _client(self):
+        if self.http is None:
+            self.http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.keepalive,
+                    keepalive_expiry=30,
+                ),
+                timeout=httpx.Timeout(max(self.timeouts.values()), connect=5.0),
+            )
+        return self.http
+
+    def _semaphore(self, provider):
+        if provider not in self.semaphores:
+            self.semaphores[provider] = asyncio.Semaphore(self.limits.get(provider, 4))
+        return self.semaphores[provider]
+
+    async def request(self, provider, method, url, endpoint=None, on_attempt=None, **kwargs):
+        """One HTTP request under the provider's concurrency limit and timeout,
+        retried, circuit-broken and hedged per endpoint. `on_attempt` (a coroutine
+        function) is awaited before every request actually sent, retries and
+        hedges included, e.g. to take a rate limit token or charge quota."""
+        async def send():
+            if on_attempt:
+                await on_attempt()
+            # Each attempt takes its own slot, so backoff sleeps don't hold one
+            async with self._semaphore(provider):
+                connection_stats.count(provider, "requests")
+                response = await asyncio.wait_for(
+                    self._client().request(
+                        method, url, extensions={"trace": connection_stats.trace_hook(provider, is_async=True)}, **kwargs
+                    ),
+                    self.timeouts.get(provider, 30),
+                )
+            response.raise_for_status()
+            return response
+
+        return await self.resilience.call(endpoint or provider, send)
+
+    # Provider calls
+
+    def _groq_headers(self):
+        return {"Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"}
+
+    async def groq_chat(self, messages, model, max_tokens, **params):
+        """Chat completion; returns the decoded JSON response"""
+        payload = {"messages": messages, "model": model, "max_tokens": max_tokens, **params}
+        response = await self.request(
+            "groq", "POST", GROQ_CHAT_URL, endpoint="groq.chat", headers=self._groq_headers(), json=payload
+        )
+        data = response.json()
+        span = current_span.get()
+        if span:
+            span.add_usage(data.get("usage"))
+        return data
+
+    async def groq_chat_stream(self, messages, model, max_tokens, **params):
+        """Streaming chat completion; yields content deltas as they arrive.
+
+        Opening the stream, up to its first delta, goes through the resilience
+        layer like any other call, so it is retried, circuit-broken and hedged
+        the same way. Once output has been yielded an error is raised to the
+        caller instead."""
+        payload = {"messages": messages, "model": model, "max_tokens": max_tokens, "stream": True, **params}
+        span = current_span.get()
+        semaphore = self._semaphore("groq")
+
+        async def open_stream():
+            # The slot is held until the stream is closed, not just while it opens
+            await semaphore.acquire()
+            response = None
+            try:
+                connection_stats.count("groq", "requests")
+                client = self._client()
+                response = await client.send(client.build_request(
+                    "POST", GROQ_CHAT_URL, headers=self._groq_headers(), json=payload,
+                    timeout=httpx.Timeout(self.timeouts.get("groq", 30), connect=5.0),
+                    extensions={"trace": connection_stats.trace_hook("groq", is_async=True)},
+                ), stream=True)
+                response.raise_for_status()
+                lines = response.aiter_lines()
+                return response, lines, await _next_delta(lines, span)
+            except BaseException:
+                if response is not None:
+                    await response.aclose()
+                semaphore.release()
+                raise
+
+        async def close_stream(opened):
+            await opened[0].aclose()
+            semaphore.release()
+
+        opened = await self.resilience.call("groq.chat", open_stream, discard=close_stream)
+        lines, delta = opened[1], opened[2]
+        try:
+            while delta is not None:
+                yield delta
+                delta = await _next_delta(lines, span)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            self.resilience.record_failure(self.resilience.breaker("groq.chat"), "groq.chat", error)
+            raise
+        finally:
+            await close_stream(opened)
+
+    async def youtube_search(self, query, max_results=3, on_attempt=None):
+        """YouTube Data API search.list for videos; returns the decoded JSON response"""
+        params = {
+            "part": "snippet",
+            "maxResults": max_results,
+            "q": query,
+            "type": "video",
+            "order": "relevance",
+            "key": os.getenv("YOUTUBE_API_KEY"),
+        }
+        response = await self.request(
+            "youtube", "GET", YOUTUBE_SEARCH_URL, endpoint="youtube.search", on_attempt=on_attempt, params=params
+        )
+        return response.json()
+
+
+async def _next_delta(lines, span):
+    """The next non-empty content delta of a chat stream, or None at its end"""
+    async for line in lines:
+        if not line.startswith("data: "):
+            continue
+        data = line[len("data: "):]
+        if data.strip() == "[DONE]":
+            return None
+        chunk = json.loads(data)
+        if span:
+            # Groq reports usage on the last chunk
+            span.add_usage(chunk.get("usage") or chunk.get("x_groq", {}).get("usage"))
+        if chunk.get("choices"):
+            delta = chunk["choices"][0].get("delta", {}).get("content")
+            if delta:
+                if span:
+                    span.first_token()
+                return delta
+    return None
+
+
+async def _with_context(context, coro):
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+_default_core = None
+_default_core_lock = threading.Lock()
+
+
+def get_io_core():
+    """Process-wide I/O core, configured from the environment"""
+    global _default_core
+    with _default_core_lock:
+        if _default_core is None:
+            limits = {
+                "groq": int(os.getenv("GROQ_MAX_CONCURRENCY", "4")),
+                "youtube": int(os.getenv("YOUTUBE_MAX_CONCURRENCY", "4")),
+            }
+            # Every call holds a provider slot while it is on the wire, so more
+            # connections than the provider limits add up to would never be used
+            pool_size, keepalive = pool_limits(EXPECTED_SESSIONS, ceiling=sum(limits.values()))
+            _default_core = AsyncIOCore(
+                limits=limits,
+                timeouts={
+                    "groq": float(os.getenv("GROQ_TIMEOUT", "60")),
+                    "youtube": float(os.getenv("YOUTUBE_TIMEOUT", "15")),
+                },
+                pool_size=int(os.getenv("HTTP_POOL_SIZE", pool_size)),
+                keepalive=keepalive,
+                resilience=ResilienceLayer(
+                    max_attempts=int(os.getenv("API_MAX_ATTEMPTS", "4")),
+                    failure_threshold=int(os.getenv("API_BREAKER_THRESHOLD", "5")),
+                    reset_timeout=float(os.getenv("API_BREAKER_RESET", "30")),
+                    hedge_delays={
+                        # Off unless asked for: a hedged search spends another 100
+                        # quota units and a hedged completion spends tokens again
+                        "youtube.search": float(os.getenv("YOUTUBE_HEDGE_DELAY", "0")),
+                        "groq.chat": float(os.getenv("GROQ_HEDGE_DELAY", "0")),
+                    },
+                ),
+            )
+        return _default_core
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import sys
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+# Headless generation service: checklists, quizzes and videos over HTTP.
+# The Streamlit app talks to it when QUESTIFY_API_URL is set (see
+# api_client.py). Each worker process has its own async I/O core; the caches,
+# question bank and rate limits it uses are the same as the app's.
+#
+# Run with: uvicorn backend.app.main:app --workers 4
+
+# The generation modules live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Before the generation modules read their settings
+load_dotenv()
+
+from async_io import get_io_core  # noqa: E402
+from generation import (  # noqa: E402
+    agenerate_checklist, astream_checklist_with_videos, agenerate_youtube_links,
+    asearch_youtube_videos, agenerate_quiz_questions, sample_quiz_items, quiz_entries
+)
+from metrics import bind_session, get_tracer  # noqa: E402
+from resilience import CircuitOpenError  # noqa: E402
+
+# Largest batch a single request may carry
+MAX_BATCH = int(os.getenv("API_MAX_BATCH", "20"))
+
+app = FastAPI(title="Questify generation service")
+
+
+class ChecklistRequest(BaseModel):
+    topic: str = Field(min_length=1, max_length=200)
+    fresh: bool = False
+
+
+class QuizRequest(BaseModel):
+    topic: str = Field(min_length=1, max_length=200)
+    checklist: List[str] = Field(min_length=1)
+    difficulty: str = "Medium"
+    num_questions: int = Field(5, ge=1, le=20)
+    concurrent: bool = True
+    fresh: bool = False
+    batch: bool = True
+    use_bank: bool = True
+    exclude: List[str] = []
+    allow_partial: bool = False
+
+
+class ChecklistBatchRequest(BaseModel):
+    topics: List[str] = Field(min_length=1)
+    fresh: bool = False
+
+
+class QuizBatchRequest(BaseModel):
+    requests: List[QuizRequest] = Field(min_length=1)
+
+
+class YouTubeLinksRequest(BaseModel):
+    checklist: List[str] = Field(min_length=1)
+
+
+class YouTubeSearchRequest(BaseModel):
+    query: str = Field(min_length=1, max_length=200)
+
+
+def upstream_error(error):
+    """Map a generation failure to an HTTP error"""
+    if isinstance(error, CircuitOpenError):
+        return HTTPException(503, str(error), headers={"Retry-After": str(int(error.retry_in) + 1)})
+    return HTTPException(502, str(error) or type(error).__name__)
+
+
+def check_batch_size(size):
+    if size > MAX_BATCH:
+        raise HTTPException(413, f"At most {MAX_BATCH} entries per batch")
+
+
+async def run_generation(coro):
+    """Run generation on the I/O core's loop, turning its errors into HTTP errors"""
+    try:
+        return await get_io_core().arun(coro)
+    except Exception as e:
+        raise upstream_error(e)
+
+
+async def gather(*coros):
+    return await asyncio.gather(*coros, return_exceptions=True)
+
+
+async def agenerate_quiz(request):
+    items = sample_quiz_items(request.checklist, request.num_questions)
+    generated = await agenerate_quiz_questions(
+        request.topic, items, request.difficulty,
+        concurrent=request.concurrent, fresh=request.fresh, batch=request.batch,
+        use_bank=request.use_bank, exclude=tuple(request.exclude),
+    )
+    if None in generated and not request.allow_partial:
+        raise RuntimeError("Failed to generate every quiz question")
+    placeholder = (None, None, None)
+    return quiz_entries(items, [result or placeholder for result in generated])
+
+
+@app.post("/v1/checklist")
+async def checklist(request: ChecklistRequest, x_session_id: Optional[str] = Header(None)):
+    bind_session(x_session_id)
+    return {"topic": request.topic, "checklist": await run_generation(agenerate_checklist(request.topic, request.fresh))}
+
+
+@app.post("/v1/checklist/stream")
+async def checklist_stream(request: ChecklistRequest, x_session_id: Optional[str] = Header(None)):
+    """Newline-delimited JSON events: "item" as each checklist item is generated,
+    "video" as each item's lookup lands, then "done" (or "error")"""
+    async def events():
+        bind_session(x_session_id)
+        core = get_io_core()
+        try:
+            async for event in core.aiterate(astream_checklist_with_videos(request.topic, request.fresh)):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "detail": upstream_error(e).detail}) + "\n"
+            return
+        yield json.dumps({"event": "done"}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/v1/quiz")
+async def quiz(request: QuizRequest, x_session_id: Optional[str] = Header(None)):
+    bind_session(x_session_id)
+    return {"topic": request.topic, "questions": await run_generation(agenerate_quiz(request))}
+
+
+@app.post("/v1/youtube/links")
+async def youtube_links(request: YouTubeLinksRequest, x_session_id: Optional[str] = Header(None)):
+    bind_session(x_session_id)
+    check_batch_size(len(request.checklist))
+    links, errors = await run_generation(agenerate_youtube_links(request.checklist))
+    return {"links": links, "errors": errors}
+
+
+@app.post("/v1/youtube/search")
+async def youtube_search(request: YouTubeSearchRequest, x_session_id: Optional[str] = Header(None)):
+    bind_session(x_session_id)
+    return {"query": request.query, "video_ids": await run_generation(asearch_youtube_videos(request.query))}
+
+
+# Batch endpoints: every entry runs concurrently on the I/O core and fails on
+# its own, so one bad topic doesn't sink the rest
+
+@app.post("/v1/batch/checklists")
+async def batch_checklists(request: ChecklistBatchRequest, x_session_id: Optional[str] = Header(None)):
+    bind_session(x_session_id)
+    check_batch_size(len(request.topics))
+    results = await get_io_core().arun(gather(*(agenerate_checklist(topic, request.fresh) for topic in request.topics)))
+    return {"results": [
+        {"topic": topic, "error": upstream_error(result).detail} if isinstance(result, Exception)
+        else {"topic": topic, "checklist": result}
+        for topic, result in zip(request.topics, results)
+    ]}
+
+
+@app.post("/v1/batch/quizzes")
+async def batch_quizzes(request: QuizBatchRequest, x_session_id: Optional[str] = Header(None)):
+    bind_session(x_session_id)
+    check_batch_size(len(request.requests))
+    results = await get_io_core().arun(gather(*(agenerate_quiz(entry) for entry in request.requests)))
+    return {"results": [
+        {"topic": entry.topic, "error": upstream_error(result).detail} if isinstance(result, Exception)
+        else {"topic": entry.topic, "questions": result}
+        for entry, result in zip(request.requests, results)
+    ]}
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok", "upstream": get_io_core().resilience.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return get_tracer().prometheus_text()
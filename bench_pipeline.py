@@ -0,0 +1,351 @@
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from prompts import parse_checklist
+
+# Offline benchmark for the checklist, quiz and video pipelines.
+# Local stand-in servers replay recorded Groq and YouTube responses
+# (bench_recordings.json) with configurable latency and error injection, and
+# the app's own functions are driven end to end against them, so the numbers
+# include the I/O core, retries, caches and parsing - everything but the network.
+#
+# Run with: python bench_pipeline.py --iterations 20 --concurrency 4 --latency-ms 300
+# Save a baseline with --save and catch regressions later with --compare.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, "1.py")
+RECORDINGS_PATH = os.path.join(HERE, "bench_recordings.json")
+
+CHECKLIST_PROMPT = re.compile(r"checklist \(8-12 items\) of key topics for studying (.+)\. Make each", re.S)
+QUIZ_PROMPT = re.compile(r"multiple choice question about '(.+)' in the context of (.+?)\. \n", re.S)
+BATCH_PROMPT = re.compile(r"multiple choice questions in the context of (.+?), one for each")
+NUMBERED_ITEM = re.compile(r"^\d+\. (.+)$", re.M)
+
+
+def fill(template, **values):
+    if isinstance(template, str):
+        for name, value in values.items():
+            template = template.replace("{" + name + "}", value)
+        return template
+    if isinstance(template, list):
+        return [fill(value, **values) for value in template]
+    if isinstance(template, dict):
+        return {key: fill(value, **values) for key, value in template.items()}
+    return template
+
+
+class StandInServer:
+    """Groq chat completions and YouTube search, answered from recordings"""
+
+    def __init__(self, recordings, latency=0.2, jitter=0.05, token_interval=0.005, error_rate=0.0, seed=0):
+        self.recordings = recordings
+        self.latency = latency
+        self.jitter = jitter
+        self.token_interval = token_interval
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+        server = self
+        class Handler(StandInHandler):
+            stand_in = server
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.http.daemon_threads = True
+        threading.Thread(target=self.http.serve_forever, name="bench-stand-in", daemon=True).start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.http.server_port}"
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return Counter(self.counts)
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, self.latency + jitter))
+
+    def inject_error(self):
+        """Return a status code to fail this request with, or None"""
+        with self.lock:
+            if self.random.random() >= self.error_rate:
+                return None
+            return self.random.choice((429, 503))
+
+    def completion(self, prompt):
+        match = CHECKLIST_PROMPT.search(prompt)
+        if match:
+            return fill(self.recordings["checklist"], topic=match.group(1))
+        match = QUIZ_PROMPT.search(prompt)
+        if match:
+            return fill(self.recordings["quiz_question"], item=match.group(1), topic=match.group(2))
+        match = BATCH_PROMPT.search(prompt)
+        if match:
+            items = NUMBERED_ITEM.findall(prompt.split("Make them", 1)[0])
+            questions = [
+                {"item": n, **fill(self.recordings["quiz_batch_entry"], item=item, topic=match.group(1))}
+                for n, item in enumerate(items, 1)
+            ]
+            return json.dumps({"questions": questions})
+        return "I'm not sure what you are asking for."
+
+    def search(self, query):
+        video_id = hashlib.sha1(query.encode("utf-8")).hexdigest()[:10]
+        return fill(self.recordings["youtube_search"], query=query, video_id=video_id)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stand_in = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=()):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def fail(self, endpoint, status):
+        self.stand_in.count(f"{endpoint} injected {status}")
+        self.send_json(status, {"error": {"message": "injected by bench_pipeline"}}, headers=[("Retry-After", "0")])
+
+    def do_POST(self):
+        stand_in = self.stand_in
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        endpoint = "groq.stream" if request.get("stream") else "groq.chat"
+        stand_in.count(endpoint)
+        stand_in.delay()
+        status = stand_in.inject_error()
+        if status:
+            return self.fail(endpoint, status)
+
+        prompt = "\n".join(message.get("content", "") for message in request.get("messages", []))
+        content = stand_in.completion(prompt)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+        if not request.get("stream"):
+            return self.send_json(200, {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in re.findall(r"\S+\s*", content):
+            self.send_event({"choices": [{"delta": {"content": token}}]})
+            time.sleep(stand_in.token_interval)
+        self.send_event({"choices": [], "x_groq": {"usage": usage}})
+        self.send_chunk(b"data: [DONE]\n\n")
+        self.send_chunk(b"")
+
+    def send_event(self, payload):
+        self.send_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+    def send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        stand_in = self.stand_in
+        stand_in.count("youtube.search")
+        stand_in.delay()
+        status = stand_in.inject_error()
+        if status:
+            return self.fail("youtube.search", status)
+        query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        self.send_json(200, stand_in.search(query))
+
+
+def load_app(stand_in, workdir):
+    """Import 1.py with every cache and store in `workdir` and the APIs pointed at the stand-ins"""
+    os.environ.update({
+        "GROQ_CHAT_URL": f"{stand_in.base_url}/openai/v1/chat/completions",
+        "YOUTUBE_SEARCH_URL": f"{stand_in.base_url}/youtube/v3/search",
+        "GROQ_API_KEY": "bench",
+        "YOUTUBE_API_KEY": "bench",
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite3"),
+        "YOUTUBE_CACHE_PATH": os.path.join(workdir, "youtube_cache.sqlite3"),
+        "QUESTION_BANK_PATH": os.path.join(workdir, "question_bank.sqlite3"),
+        "PROGRESS_STORE_URL": "memory://",
+        "METRICS_FILE": "",
+    })
+    spec = importlib.util.spec_from_file_location("questify_app", APP_PATH)
+    app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+    return app
+
+
+def scenarios(app, recordings, quiz_mode):
+    def checklist_for(topic):
+        # The recorded checklist, parsed the way the app parses it
+        return parse_checklist(fill(recordings["checklist"], topic=topic))
+
+    return {
+        "generate_checklist": lambda topic: app.generate_checklist(topic),
+        "generate_quiz": lambda topic: app.generate_quiz(
+            topic, checklist_for(topic), "Medium", num_questions=5,
+            batch=quiz_mode == "batch", fallback=False, use_bank=False,
+        ),
+        "generate_youtube_links": lambda topic: app.generate_youtube_links(checklist_for(topic)),
+    }
+
+
+def run_scenario(run, topics, concurrency):
+    latencies = []
+    errors = Counter()
+    lock = threading.Lock()
+
+    def one(topic):
+        start = time.perf_counter()
+        try:
+            result = run(topic)
+            if not result:
+                raise ValueError("empty result")
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, topics))
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(latencies, errors, elapsed, calls):
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "runs": len(latencies) + sum(errors.values()),
+        "errors": dict(errors),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": cuts[49] * 1000 if cuts else None,
+        "p95_ms": cuts[94] * 1000 if cuts else None,
+        "p99_ms": cuts[98] * 1000 if cuts else None,
+        "calls": dict(calls),
+    }
+
+
+def print_report(results):
+    print(f"{'scenario':<24}{'runs':>6}{'errors':>8}{'runs/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}  upstream calls")
+    for name, result in results.items():
+        timings = "".join(
+            f"{result[key]:>8.0f}ms" if result[key] is not None else f"{'-':>10}"
+            for key in ("p50_ms", "p95_ms", "p99_ms")
+        )
+        calls = ", ".join(f"{endpoint}={count}" for endpoint, count in sorted(result["calls"].items()))
+        print(f"{name:<24}{result['runs']:>6}{sum(result['errors'].values()):>8}{result['throughput']:>9.2f}{timings}  {calls}")
+        if result["errors"]:
+            print(f"{'':<24}errors: {result['errors']}")
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions against a saved baseline (p95 latency, throughput, upstream calls)"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and result["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.0f}ms -> {result['p95_ms']:.0f}ms")
+        if before["throughput"] and result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput']:.2f}/s -> {result['throughput']:.2f}/s")
+        calls_before = sum(before["calls"].values())
+        calls_now = sum(result["calls"].values())
+        if calls_now > calls_before * (1 + tolerance):
+            regressions.append(f"{name}: upstream calls {calls_before} -> {calls_now}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the checklist, quiz and video pipelines against local stand-ins")
+    parser.add_argument("--scenario", nargs="+", choices=["generate_checklist", "generate_quiz", "generate_youtube_links"],
+                        help="Scenarios to run (default: all)")
+    parser.add_argument("--iterations", type=int, default=20, help="Runs per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Simulated sessions running at once")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Stand-in response latency")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--token-ms", type=float, default=5, help="Delay between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream requests answered with 429/503")
+    parser.add_argument("--quiz-mode", choices=["batch", "concurrent"], default="batch")
+    parser.add_argument("--warm", action="store_true", help="Reuse one topic so repeat runs hit the caches")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write the results as JSON, for use as a baseline")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before a regression is reported")
+    args = parser.parse_args()
+
+    with open(RECORDINGS_PATH, encoding="utf-8") as f:
+        recordings = json.load(f)
+    stand_in = StandInServer(
+        recordings,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        token_interval=args.token_ms / 1000,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="questify-bench-") as workdir:
+        app = load_app(stand_in, workdir)
+        available = scenarios(app, recordings, args.quiz_mode)
+        print(
+            f"{args.iterations} runs x {args.concurrency} sessions, {args.latency_ms:.0f}+/-{args.jitter_ms:.0f}ms latency, "
+            f"{args.error_rate:.0%} errors, {'warm' if args.warm else 'cold'} caches"
+        )
+
+        results = {}
+        for name in args.scenario or list(available):
+            topics = [
+                "Benchmark Topic" if args.warm else f"Benchmark Topic {name} {i}"
+                for i in range(args.iterations)
+            ]
+            calls_before = stand_in.snapshot()
+            latencies, errors, elapsed = run_scenario(available[name], topics, args.concurrency)
+            calls = stand_in.snapshot() - calls_before
+            results[name] = summarize(latencies, errors, elapsed, calls)
+        print_report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Small cold-start benchmark for the Streamlit entry points.
+# Each scenario runs in a fresh interpreter so nothing is already imported,
+# which is what a new worker (or a script rerun after a reload) pays.
+#
+# The entry point scenarios are read from the scripts' own top-level imports,
+# so they follow the import graph as it changes; the lazy scenarios are what
+# the app defers until a page or chart needs it.
+#
+# Run with: python bench_startup.py [runs]
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ENTRY_POINTS = ["1.py", "2.py"]
+
+LAZY_SCENARIOS = {
+    # Progress Dashboard charts (1.py imports these inside the chart builders)
+    "dashboard charting": [
+        "import pandas",
+        "import plotly.express",
+    ],
+    # Study Analytics section
+    "study analytics": [
+        "import analytics",
+    ],
+    # Cohort table: the module plus the Parquet reader pandas loads for it
+    "cohort statistics": [
+        "import cohort_stats",
+        "import pyarrow.parquet",
+    ],
+}
+
+
+def top_level_imports(path):
+    """The import statements a script runs at module level, in order"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    statements = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            statements.append(ast.unparse(node))
+    return statements
+
+
+def scenarios():
+    found = {
+        f"{script} imports": top_level_imports(os.path.join(ROOT, script))
+        for script in ENTRY_POINTS
+    }
+    found.update(LAZY_SCENARIOS)
+    return found
+
+
+def time_scenario(statements, runs):
+    code = "\n".join(statements)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        # From the repository root, so the app's own modules import as they do under streamlit run
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        timings.append(elapsed)
+    return timings, None
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    baseline, _ = time_scenario(["pass"], runs)
+    interpreter = statistics.median(baseline)
+
+    print(f"Cold start timings over {runs} runs (interpreter start-up of {interpreter * 1000:.0f} ms subtracted)")
+    print(f"{'scenario':<38}{'median':>10}{'min':>10}{'max':>10}")
+    for name, statements in scenarios().items():
+        timings, error = time_scenario(statements, runs)
+        if timings is None:
+            print(f"{name:<38}  skipped: {error}")
+            continue
+        timings = [t - interpreter for t in timings]
+        print(f"{name:<38}{statistics.median(timings) * 1000:>8.0f}ms{min(timings) * 1000:>8.0f}ms{max(timings) * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
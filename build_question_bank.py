@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+
+from dotenv import load_dotenv
+
+from async_io import get_io_core
+from generation import agenerate_checklist, arequest_quiz_question
+from question_bank import get_question_bank
+
+# Offline batch job that fills the question bank ahead of traffic.
+# It goes through the same generation code as the app (async I/O core,
+# response cache, retries, tracing), so banked questions look exactly like
+# live ones, and the checklist is the cached one users are shown for the
+# topic, so its items match the slots the app draws from.
+#
+# Run with: python build_question_bank.py "Python Programming" --per-item 5
+
+
+async def fill_slot(topic, item, difficulty, per_item, max_attempts):
+    """Top a single (topic, item, difficulty) slot up to per_item questions"""
+    bank = get_question_bank()
+    before = await asyncio.to_thread(bank.count, topic, item, difficulty)
+    attempts = 0
+    while await asyncio.to_thread(bank.count, topic, item, difficulty) < per_item and attempts < max_attempts:
+        attempts += 1
+        try:
+            # Fresh: a cached completion would only repeat a question already banked.
+            # Each generated question is added to the bank by arequest_quiz_question.
+            await arequest_quiz_question(topic, item, difficulty, fresh=True)
+        except Exception as e:
+            print(f"  ! {item} ({difficulty}): {e}")
+    total = await asyncio.to_thread(bank.count, topic, item, difficulty)
+    return item, difficulty, total - before, total
+
+
+async def fill_bank(topic, items, difficulties, per_item, workers):
+    # Duplicates are dropped by the bank, so allow a few extra attempts per slot
+    max_attempts = per_item * 2
+    slots = asyncio.Semaphore(workers)
+
+    async def fill(item, difficulty):
+        async with slots:
+            return await fill_slot(topic, item, difficulty, per_item, max_attempts)
+
+    return await asyncio.gather(*(fill(item, difficulty) for item in items for difficulty in difficulties))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate quiz questions into the question bank")
+    parser.add_argument("topic", help="Study topic, as typed into the app")
+    parser.add_argument("--items-file", help="File with one checklist item per line (default: the topic's checklist)")
+    parser.add_argument("--difficulty", nargs="+", default=["Easy", "Medium", "Hard"])
+    parser.add_argument("--per-item", type=int, default=5, help="Target fresh questions per item and difficulty")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Slots filled at once (Groq concurrency is also capped by GROQ_MAX_CONCURRENCY)")
+    parser.add_argument("--prune", action="store_true", help="Delete stale questions first")
+    args = parser.parse_args()
+
+    load_dotenv()
+    core = get_io_core()
+    bank = get_question_bank()
+    if args.prune:
+        print(f"Pruned {bank.prune()} stale questions")
+
+    if args.items_file:
+        with open(args.items_file, encoding="utf-8") as f:
+            items = [line.strip() for line in f if line.strip()]
+    else:
+        # Served from the response cache when the app has already generated this topic
+        items = core.run(agenerate_checklist(args.topic))
+    print(f"Filling {len(items)} items x {len(args.difficulty)} difficulties for '{args.topic}'")
+
+    results = core.run(fill_bank(args.topic, items, args.difficulty, args.per_item, args.workers))
+    for item, difficulty, added, total in results:
+        print(f"  {difficulty:<8} +{added:<3} ({total} banked)  {item}")
+
+    stats = bank.stats()
+    print(f"Bank now holds {stats['questions']} questions across {stats['slots']} slots")
+
+
+if __name__ == "__main__":
+    main()
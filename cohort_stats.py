@@ -0,0 +1,206 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from progress_store import DEFAULT_STORE_URL
+
+# Cohort statistics over every user's quiz answers.
+# An offline job (cron, or by hand) reads the per-question answers from the
+# progress store's SQLite database in rowid-range chunks, aggregates each
+# chunk in its own worker process, merges the partial sums and writes the
+# result as a Parquet file. The app only reads that file, so nothing is
+# computed across users while a page renders.
+#
+#   python cohort_stats.py --workers 4
+#
+# Per checklist item:
+# - correct_rate: share of answers that were right (classical item
+#   difficulty; low means hard)
+# - discrimination: point-biserial correlation between getting the item right
+#   and the learner's accuracy on everything else they answered. Near zero or
+#   negative flags a question that doesn't separate strong learners from weak.
+
+DEFAULT_OUTPUT_DIR = os.path.join(".cache", "cohort")
+ITEM_STATS_FILE = "item_stats.parquet"
+CHUNK_ROWS = 200_000
+
+SUM_COLUMNS = ["answers", "correct", "paired", "x", "y", "xy", "yy"]
+
+
+def store_database(url=None):
+    """The SQLite file behind a progress store URL"""
+    url = url or os.getenv("PROGRESS_STORE_URL", DEFAULT_STORE_URL)
+    scheme, _, location = url.partition("://")
+    if scheme != "sqlite":
+        raise ValueError(f"Cohort statistics need a sqlite progress store, not {scheme}")
+    return location[1:] if location.startswith("/") else location
+
+
+def connect(path):
+    # Read-only: the job never contends with the app for the write lock
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def user_totals(path):
+    """Answers and correct answers per user, indexed by user_id"""
+    with connect(path) as conn:
+        return pd.read_sql_query(
+            "SELECT user_id, COUNT(*) AS answers, SUM(correct) AS correct FROM quiz_answers GROUP BY user_id",
+            conn, index_col="user_id",
+        )
+
+
+def chunk_ranges(path, chunk_rows=CHUNK_ROWS):
+    with connect(path) as conn:
+        low, high = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM quiz_answers").fetchone()
+    if low is None:
+        return []
+    return [(start, min(start + chunk_rows, high + 1)) for start in range(low, high + 1, chunk_rows)]
+
+
+# Worker processes get the per-user totals once, when they start
+_users = None
+
+
+def _init_worker(users):
+    global _users
+    _users = users
+
+
+def aggregate_chunk(path, start, stop):
+    """Partial sums per (topic, item) for answers with rowid in [start, stop)"""
+    with connect(path) as conn:
+        frame = pd.read_sql_query(
+            "SELECT topic, item, user_id, correct FROM quiz_answers WHERE rowid >= ? AND rowid < ?",
+            conn, params=(start, stop),
+        )
+    if frame.empty:
+        return pd.DataFrame(columns=SUM_COLUMNS)
+
+    totals = _users.reindex(frame["user_id"])
+    x = frame["correct"].to_numpy(dtype="float64")
+    # Rest score: the learner's accuracy with this answer left out
+    others = totals["answers"].to_numpy(dtype="float64") - 1
+    paired = others > 0
+    y = np.where(paired, (totals["correct"].to_numpy(dtype="float64") - x) / np.maximum(others, 1), 0.0)
+    pairs = paired.astype("float64")
+
+    sums = pd.DataFrame({
+        "topic": frame["topic"],
+        "item": frame["item"],
+        "answers": 1,
+        "correct": x,
+        # Correlation sums only over answers that have a rest score
+        "paired": pairs,
+        "x": x * pairs,
+        "y": y,
+        "xy": x * y,
+        "yy": y * y,
+    })
+    return sums.groupby(["topic", "item"], sort=False).sum()
+
+
+def item_stats(sums):
+    """Final per-item statistics from merged partial sums"""
+    n = sums["paired"].to_numpy()
+    x, y, xy, yy = (sums[column].to_numpy() for column in ("x", "y", "xy", "yy"))
+    # Pearson r with a 0/1 variable; x*x == x
+    spread = (n * x - x * x) * (n * yy - y * y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        discrimination = np.where(spread > 0, (n * xy - x * y) / np.sqrt(spread), np.nan)
+    return pd.DataFrame({
+        "topic": sums.index.get_level_values("topic"),
+        "item": sums.index.get_level_values("item"),
+        "answers": sums["answers"].to_numpy().astype("int64"),
+        "correct_rate": sums["correct"].to_numpy() / sums["answers"].to_numpy(),
+        "discrimination": discrimination,
+    })
+
+
+def run(path, output_dir=DEFAULT_OUTPUT_DIR, workers=None, chunk_rows=CHUNK_ROWS):
+    """Compute and write the item statistics; returns the output file"""
+    started = time.time()
+    users = user_totals(path)
+    ranges = chunk_ranges(path, chunk_rows)
+
+    if workers == 1:
+        # One worker gains nothing from a process pool; aggregate here
+        _init_worker(users)
+        parts = [aggregate_chunk(path, start, stop) for start, stop in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(users,)) as pool:
+            parts = list(pool.map(aggregate_chunk, [path] * len(ranges), *zip(*ranges))) if ranges else []
+
+    parts = [part for part in parts if len(part)]
+    if parts:
+        stats = item_stats(pd.concat(parts).groupby(level=["topic", "item"], sort=False).sum())
+    else:
+        stats = pd.DataFrame(columns=["topic", "item", "answers", "correct_rate", "discrimination"])
+    stats["updated_at"] = started
+
+    os.makedirs(output_dir, exist_ok=True)
+    target = os.path.join(output_dir, ITEM_STATS_FILE)
+    # Written aside and swapped in, so readers never see a half-written file
+    partial = target + ".tmp"
+    stats.to_parquet(partial, index=False)
+    os.replace(partial, target)
+    print(f"{len(stats)} items from {int(users['answers'].sum()) if len(users) else 0} answers "
+          f"({len(users)} learners, {len(ranges)} chunks) in {time.time() - started:.1f}s -> {target}")
+    return target
+
+
+# Reading the results (app side)
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def item_stats_path():
+    return os.path.join(os.getenv("COHORT_STATS_DIR", DEFAULT_OUTPUT_DIR), ITEM_STATS_FILE)
+
+
+def load_item_stats(path=None):
+    """The latest item statistics, or None if the job hasn't run yet.
+    Re-read only when the job has written a new file."""
+    path = path or item_stats_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, pd.read_parquet(path))
+            _loaded[path] = cached
+        return cached[1]
+
+
+def topic_item_stats(topic, items=None):
+    """Statistics for one topic's checklist items, hardest first (None without results)"""
+    stats = load_item_stats()
+    if stats is None:
+        return None
+    rows = stats[stats["topic"] == topic]
+    if items is not None:
+        rows = rows[rows["item"].isin(items)]
+    return rows.sort_values("correct_rate", kind="stable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate every user's quiz answers into cohort item statistics")
+    parser.add_argument("--store", help="Progress store URL (default: PROGRESS_STORE_URL)")
+    parser.add_argument("--output", default=os.getenv("COHORT_STATS_DIR", DEFAULT_OUTPUT_DIR))
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    run(store_database(args.store), args.output, args.workers, args.chunk_rows)
+
+
+if __name__ == "__main__":
+    main()
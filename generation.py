@@ -0,0 +1,389 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+from async_io import get_io_core
+from llm_cache import get_response_cache, make_cache_key, cache_bypassed
+from metrics import trace
+from prompts import (
+    MAX_CHECKLIST_ITEMS, build_checklist_messages, clean_checklist_line, parse_checklist,
+    build_quiz_prompt, parse_quiz_question, build_quiz_batch_prompt, parse_quiz_batch
+)
+from question_bank import get_question_bank
+from youtube_cache import get_youtube_cache, normalize_query
+
+# Checklist, quiz and video generation, free of any UI.
+# Shared by the Streamlit app (in-process mode) and the HTTP service in
+# backend/app. Everything here is a coroutine for the async I/O core's loop:
+# run it with core.run()/core.iterate() from plain threads, or core.arun()/
+# core.aiterate() from another event loop. Functions raise on failure and
+# leave reporting to the caller.
+#
+# The response cache, search cache and quota ledger, and question bank are
+# blocking SQLite stores behind a lock; calls to them go through
+# asyncio.to_thread so one session's cache lookup or commit never stalls
+# other sessions' requests in flight on the loop.
+
+MODEL = "llama-3.3-70b-versatile"
+
+# Max number of Groq requests in flight at once while building a quiz.
+# Keep this low enough to stay under the Groq rate limits for the account.
+# (The async I/O core applies the same limit process-wide, see async_io.py.)
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+
+# YouTube lookups: a token bucket (requests/second and burst size) shared by
+# everything in this process. Concurrency is capped by the I/O core.
+YOUTUBE_REQUESTS_PER_SECOND = float(os.getenv("YOUTUBE_REQUESTS_PER_SECOND", "5"))
+YOUTUBE_BURST = int(os.getenv("YOUTUBE_BURST", "5"))
+
+
+# LLM completions, served from the on-disk response cache when possible.
+# Identical requests already in flight are joined, not repeated.
+
+async def acached_chat_completion(messages, max_tokens, model=MODEL, parse=None, fresh=False, operation="chat", **params):
+    """Return the (optionally parsed) completion text. Only answers that parse cleanly are cached.
+    Traced as `operation`."""
+    with trace(operation) as span:
+        return await _cached_chat_completion(span, messages, max_tokens, model, parse, fresh, **params)
+
+
+async def _cached_chat_completion(span, messages, max_tokens, model, parse, fresh, **params):
+    cache = get_response_cache()
+    key = make_cache_key(model, messages, max_tokens=max_tokens, **params)
+
+    if fresh or cache_bypassed():
+        span.cache = "bypass"
+    else:
+        content = await asyncio.to_thread(cache.get, key)
+        if content is not None:
+            try:
+                result = parse(content) if parse else content
+                span.cache = "hit"
+                return result
+            except Exception:
+                pass
+
+    async def fetch():
+        response = await get_io_core().groq_chat(messages, model, max_tokens, **params)
+        content = response["choices"][0]["message"]["content"]
+        if parse:
+            parse(content)
+        await asyncio.to_thread(cache.set, key, content, model=model)
+        return content
+
+    inflight = get_io_core().inflight
+    if inflight.in_flight("groq.chat", key):
+        span.cache = "shared"
+    content = await inflight.do("groq.chat", key, fetch)
+    return parse(content) if parse else content
+
+
+# Checklists
+
+async def agenerate_checklist(topic, fresh=False):
+    return await acached_chat_completion(
+        build_checklist_messages(topic),
+        max_tokens=1000,
+        parse=parse_checklist,
+        fresh=fresh,
+        operation="checklist",
+    )
+
+
+async def astream_checklist_items(topic, fresh=False, model=MODEL):
+    """Yield checklist items one at a time as the model streams them"""
+    messages = build_checklist_messages(topic)
+    cache = get_response_cache()
+    key = make_cache_key(model, messages, max_tokens=1000)
+
+    with trace("checklist_stream") as span:
+        if fresh or cache_bypassed():
+            span.cache = "bypass"
+        else:
+            content = await asyncio.to_thread(cache.get, key)
+            if content is not None:
+                span.cache = "hit"
+                for item in parse_checklist(content):
+                    yield item
+                return
+
+        async def fetch():
+            content = ""
+            async for delta in get_io_core().groq_chat_stream(messages, model, 1000):
+                content += delta
+                yield delta
+            try:
+                parse_checklist(content)
+            except ValueError:
+                return
+            await asyncio.to_thread(cache.set, key, content, model=model)
+
+        inflight = get_io_core().inflight
+        if inflight.in_flight("groq.chat_stream", key):
+            span.cache = "shared"
+        pending = ""
+        count = 0
+        async for delta in inflight.stream("groq.chat_stream", key, fetch):
+            span.first_token()
+            pending += delta
+            # An item is complete once its line ends
+            while "\n" in pending:
+                line, pending = pending.split("\n", 1)
+                item = clean_checklist_line(line)
+                if item and count < MAX_CHECKLIST_ITEMS:
+                    count += 1
+                    yield item
+
+        item = clean_checklist_line(pending)
+        if item and count < MAX_CHECKLIST_ITEMS:
+            count += 1
+            yield item
+
+
+async def astream_checklist_with_videos(topic, fresh=False, limiter=None):
+    """Yield {"event": "item"} for each checklist item as it streams in and
+    {"event": "video"} as each item's video lookup lands (url is None when no
+    video was found, "alternatives" holds the runner-up videos and "error" is
+    set when the lookup failed)"""
+    limiter = limiter or get_youtube_rate_limiter()
+    events = asyncio.Queue()
+    lookups = []
+
+    async def lookup(item):
+        try:
+            video_ids = await asearch_youtube_videos(item, limiter)
+            event = {
+                "event": "video",
+                "item": item,
+                "url": youtube_video_url(video_ids[0]) if video_ids else None,
+                "alternatives": [youtube_video_url(video_id) for video_id in video_ids[1:]],
+            }
+        except Exception as e:
+            event = {"event": "video", "item": item, "url": None, "alternatives": [], "error": str(e)}
+        events.put_nowait(event)
+
+    videos_sent = 0
+    try:
+        async for item in astream_checklist_items(topic, fresh):
+            yield {"event": "item", "item": item}
+            lookups.append(asyncio.ensure_future(lookup(item)))
+            while not events.empty():
+                videos_sent += 1
+                yield events.get_nowait()
+
+        while videos_sent < len(lookups):
+            videos_sent += 1
+            yield await events.get()
+    finally:
+        for task in lookups:
+            task.cancel()
+
+
+# YouTube
+
+def youtube_video_url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+async def asearch_youtube_videos(query, limiter=None):
+    """Return the video IDs for a query, best first.
+
+    Repeat queries are served from the search cache; only misses spend API
+    quota (and a rate limiter token, when one is given), once per request
+    sent upstream."""
+    with trace("youtube_search") as span:
+        return await _search_youtube_videos(span, query, limiter)
+
+
+async def _search_youtube_videos(span, query, limiter):
+    cache = get_youtube_cache()
+    video_ids = await asyncio.to_thread(cache.get, query)
+    if video_ids is not None:
+        span.cache = "hit"
+        return video_ids
+
+    async def charge():
+        # Runs for every upstream attempt, so retries and hedges are rate limited and counted too
+        if limiter:
+            await limiter.wait()
+        await asyncio.to_thread(cache.charge_search)
+
+    async def fetch():
+        response = await get_io_core().youtube_search(query, max_results=3, on_attempt=charge)
+
+        # Keep every result so alternative videos don't need another search
+        video_ids = [item['id']['videoId'] for item in response['items']]
+        await asyncio.to_thread(cache.set, query, video_ids)
+        return video_ids
+
+    # Callers searching the same item at once share one search (and one quota charge)
+    inflight = get_io_core().inflight
+    if inflight.in_flight("youtube.search", normalize_query(query)):
+        span.cache = "shared"
+    return await inflight.do("youtube.search", normalize_query(query), fetch)
+
+
+async def asearch_youtube_video(query, limiter=None):
+    """Run one YouTube search and return the best video link"""
+    video_ids = await asearch_youtube_videos(query, limiter)
+    if video_ids:
+        return youtube_video_url(video_ids[0])
+    return None
+
+
+async def agenerate_youtube_links(checklist, limiter=None):
+    """Best video per checklist item, in checklist order. Returns (links, errors)."""
+    limiter = limiter or get_youtube_rate_limiter()
+    results = await asyncio.gather(
+        *(asearch_youtube_video(item, limiter) for item in checklist), return_exceptions=True
+    )
+    links = {}
+    errors = []
+    for item, result in zip(checklist, results):
+        if isinstance(result, Exception):
+            errors.append(str(result))
+        elif result:
+            links[item] = result
+    return links, errors
+
+
+# Token bucket so parallel lookups can't burst past the YouTube API rate limit
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _take(self):
+        """Take a token if one is available; otherwise return how long to wait for one"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def wait(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+_youtube_rate_limiter = None
+_youtube_rate_limiter_lock = threading.Lock()
+
+
+def get_youtube_rate_limiter():
+    """Process-wide bucket, so every session (or request) shares the one API rate limit"""
+    global _youtube_rate_limiter
+    with _youtube_rate_limiter_lock:
+        if _youtube_rate_limiter is None:
+            _youtube_rate_limiter = TokenBucket(YOUTUBE_REQUESTS_PER_SECOND, YOUTUBE_BURST)
+        return _youtube_rate_limiter
+
+
+# Quizzes
+
+async def arequest_quiz_question(topic, checklist_item, difficulty, fresh=False):
+    """Call Groq for a single question"""
+    question, options, correct = await acached_chat_completion(
+        [{"role": "user", "content": build_quiz_prompt(topic, checklist_item, difficulty)}],
+        max_tokens=500,
+        parse=parse_quiz_question,
+        fresh=fresh,
+        operation="quiz_question",
+    )
+    # Every live generation also tops up the question bank
+    await asyncio.to_thread(get_question_bank().add, topic, checklist_item, difficulty, question, options, correct)
+    return question, options, correct
+
+
+async def arequest_quiz_batch(topic, items, difficulty, fresh=False):
+    """Generate all questions in a single completion. Never raises; failed items come back as None."""
+    try:
+        results = await acached_chat_completion(
+            [{"role": "user", "content": build_quiz_batch_prompt(topic, items, difficulty)}],
+            max_tokens=min(8000, 300 * len(items) + 200),
+            parse=lambda content: parse_quiz_batch(content, len(items)),
+            fresh=fresh,
+            operation="quiz_batch",
+            response_format={"type": "json_object"},
+        )
+    except Exception:
+        return [None] * len(items)
+
+    def bank_results():
+        bank = get_question_bank()
+        for item, result in zip(items, results):
+            if result is not None:
+                bank.add(topic, item, difficulty, *result)
+
+    await asyncio.to_thread(bank_results)
+    return results
+
+
+async def agather_quiz_questions(topic, items, difficulty, max_workers=None, fresh=False):
+    """One question per item, at most max_workers at a time; failures come back as exceptions"""
+    limit = asyncio.Semaphore(max(1, min(max_workers or GROQ_MAX_CONCURRENCY, len(items) or 1)))
+
+    async def one(item):
+        async with limit:
+            return await arequest_quiz_question(topic, item, difficulty, fresh)
+
+    return await asyncio.gather(*(one(item) for item in items), return_exceptions=True)
+
+
+def sample_quiz_items(checklist, num_questions):
+    return random.sample(checklist, min(num_questions, len(checklist)))
+
+
+async def agenerate_quiz_questions(topic, items, difficulty, concurrent=True, max_workers=None, fresh=False, batch=True, use_bank=True, exclude=()):
+    """(question, options, correct) for each item, None where generation failed.
+
+    Questions come from the question bank where it has enough fresh ones
+    (skipping question texts in `exclude`); the model is only asked for the
+    rest, in one batch completion first and then per item for what's left."""
+    generated = [None] * len(items)
+    if use_bank and not fresh:
+        bank = get_question_bank()
+        generated = await asyncio.to_thread(
+            lambda: [bank.draw(topic, item, difficulty, exclude) for item in items]
+        )
+
+    pending = [i for i, result in enumerate(generated) if result is None]
+    if batch and len(pending) > 1:
+        batch_results = await arequest_quiz_batch(topic, [items[i] for i in pending], difficulty, fresh)
+        for i, result in zip(pending, batch_results):
+            generated[i] = result
+
+    # Only items the batch didn't cover get their own per-question call
+    missing = [i for i, result in enumerate(generated) if result is None]
+    retried = await agather_quiz_questions(
+        topic, [items[i] for i in missing], difficulty, max_workers if concurrent else 1, fresh
+    )
+    for i, result in zip(missing, retried):
+        generated[i] = None if isinstance(result, BaseException) else result
+    return generated
+
+
+def quiz_entries(items, generated):
+    """The quiz as the app stores it: one dict per question"""
+    return [
+        {"question": q, "options": opts, "correct": correct, "topic": item}
+        for item, (q, opts, correct) in zip(items, generated)
+    ]
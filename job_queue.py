@@ -0,0 +1,244 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# Durable job queue for work that shouldn't run inside a Streamlit script run.
+# The app submits jobs and polls them; worker processes (job_worker.py) claim
+# them in priority order, report progress while they run and store the result.
+#
+# - Identical active jobs (same dedup key) collapse into one
+# - submit() refuses new work once too many jobs are waiting (QueueFull)
+# - A job whose worker stops heart-beating is handed to another worker; the
+#   worker that lost it can no longer report on it
+
+DEFAULT_QUEUE_PATH = os.path.join(".cache", "jobs.sqlite3")
+
+# Priorities: higher runs first
+PRIORITY_INTERACTIVE = 10
+PRIORITY_BACKGROUND = 0
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue is too deep to take more work"""
+
+    def __init__(self, depth):
+        super().__init__(f"{depth} jobs are already waiting")
+        self.depth = depth
+
+
+class JobQueue:
+    def __init__(self, path=DEFAULT_QUEUE_PATH, max_depth=200, max_attempts=2, stale_after=120):
+        self.path = path
+        # Queued jobs allowed before submit() pushes back
+        self.max_depth = max_depth
+        self.max_attempts = max_attempts
+        # Seconds without a heartbeat before a running job counts as abandoned
+        self.stale_after = stale_after
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode, so claims can take the write lock up front (BEGIN IMMEDIATE)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                dedup_key TEXT,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_next ON jobs (status, priority DESC, created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs (dedup_key, status);
+        """)
+
+    def _row(self, row):
+        if row is None:
+            return None
+        keys = ("id", "kind", "dedup_key", "payload", "priority", "status", "progress", "result", "error",
+                "attempts", "worker", "created_at", "started_at", "heartbeat_at", "finished_at")
+        job = dict(zip(keys, row))
+        for field in ("payload", "progress", "result"):
+            job[field] = json.loads(job[field]) if job[field] is not None else None
+        return job
+
+    def submit(self, kind, payload, priority=PRIORITY_BACKGROUND, dedup_key=None):
+        """Queue a job and return its id, or the id of an identical job already queued or running"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if dedup_key is not None:
+                    row = self.conn.execute(
+                        f"SELECT id, priority FROM jobs WHERE dedup_key = ? "
+                        f"AND status IN ({', '.join('?' for _ in ACTIVE_STATUSES)}) LIMIT 1",
+                        (dedup_key, *ACTIVE_STATUSES),
+                    ).fetchone()
+                    if row is not None:
+                        # A more urgent duplicate moves the shared job up
+                        if priority > row[1]:
+                            self.conn.execute("UPDATE jobs SET priority = ? WHERE id = ?", (priority, row[0]))
+                        self.conn.execute("COMMIT")
+                        return row[0]
+
+                depth = self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if self.max_depth and depth >= self.max_depth:
+                    raise QueueFull(depth)
+
+                job_id = uuid.uuid4().hex
+                self.conn.execute("""
+                    INSERT INTO jobs (id, kind, dedup_key, payload, priority, status, created_at)
+                    VALUES (?, ?, ?, ?, ?, 'queued', ?)
+                """, (job_id, kind, dedup_key, json.dumps(payload), priority, now))
+                self.conn.execute("COMMIT")
+                return job_id
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, worker, kinds=None):
+        """Take the most urgent queued job for this worker, or None if there is nothing to do"""
+        now = time.time()
+        query = "SELECT * FROM jobs WHERE status = 'queued'"
+        params = []
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        query += " ORDER BY priority DESC, created_at LIMIT 1"
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(query, params).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                self.conn.execute("""
+                    UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1,
+                    started_at = ?, heartbeat_at = ? WHERE id = ?
+                """, (worker, now, now, row[0]))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0])
+
+    # Updates from a worker only apply while that worker still owns the job:
+    # once requeue_stale() has handed it on, they return False and change nothing
+
+    def heartbeat(self, job_id, worker):
+        """Tell the queue the job is still being worked on"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running' AND worker = ?",
+                (time.time(), job_id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def report_progress(self, job_id, worker, progress):
+        """Store partial output for pollers (also a heartbeat)"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ? AND status = 'running' AND worker = ?",
+                (json.dumps(progress), time.time(), job_id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, result):
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, finished_at = ? "
+                "WHERE id = ? AND status = 'running' AND worker = ?",
+                (json.dumps(result), time.time(), job_id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id, worker, error):
+        """Requeue the job if it has attempts left, otherwise mark it failed"""
+        with self.lock:
+            cursor = self.conn.execute("""
+                UPDATE jobs SET
+                    status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END,
+                    error = ?, worker = NULL,
+                    finished_at = CASE WHEN attempts < ? THEN NULL ELSE ? END
+                WHERE id = ? AND status = 'running' AND worker = ?
+            """, (self.max_attempts, error, self.max_attempts, time.time(), job_id, worker))
+            return cursor.rowcount == 1
+
+    def requeue_stale(self):
+        """Hand jobs whose worker went quiet back to the queue (or fail them, once out of attempts)"""
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute("""
+                UPDATE jobs SET
+                    status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END,
+                    error = 'Worker stopped responding', worker = NULL,
+                    finished_at = CASE WHEN attempts < ? THEN NULL ELSE ? END
+                WHERE status = 'running' AND heartbeat_at < ?
+            """, (self.max_attempts, self.max_attempts, now, now - self.stale_after))
+            return cursor.rowcount
+
+    def get(self, job_id):
+        with self.lock:
+            return self._row(self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def position(self, job_id):
+        """How many queued jobs will run before this one (0 = next)"""
+        with self.lock:
+            row = self.conn.execute("SELECT priority, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            return self.conn.execute("""
+                SELECT COUNT(*) FROM jobs WHERE status = 'queued'
+                AND (priority > ? OR (priority = ? AND created_at < ?))
+            """, (row[0], row[0], row[1])).fetchone()[0]
+
+    def depth(self):
+        """Job counts by status"""
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def prune(self, older_than=24 * 3600):
+        """Delete finished jobs older than `older_than` seconds"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - older_than,),
+            )
+            return cursor.rowcount
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide queue instance, configured from the environment"""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(
+                path=os.getenv("JOB_QUEUE_PATH", DEFAULT_QUEUE_PATH),
+                max_depth=int(os.getenv("JOB_QUEUE_MAX_DEPTH", "200")),
+                max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "2")),
+                stale_after=float(os.getenv("JOB_STALE_SECONDS", "120")),
+            )
+        return _default_queue
@@ -0,0 +1,153 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from dotenv import load_dotenv
+
+# Worker pool for the job queue (job_queue.py).
+# Each worker process claims one job at a time, runs it on its own async I/O
+# core and writes partial results back as progress, so the app can show items
+# and videos while the job is still running. The parent process restarts
+# workers that die and hands their abandoned jobs back to the queue.
+#
+# Run with: python job_worker.py --workers 4
+
+# Seconds between progress writes while a job streams
+PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "0.5"))
+# Seconds between heartbeats while a job runs, progress or not. A single
+# upstream call can stall for minutes (timeout x retries), so liveness can't
+# depend on the job producing output; keep this well under JOB_STALE_SECONDS.
+HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+
+
+def run_checklist_with_videos(queue, job):
+    from async_io import get_io_core
+    from generation import astream_checklist_with_videos
+
+    payload = job["payload"]
+    checklist = []
+    youtube_links = {}
+    alternatives = {}
+    errors = []
+    videos = 0
+    reported = 0.0
+
+    def progress():
+        return {"checklist": checklist, "youtube_links": youtube_links, "videos": videos}
+
+    for event in get_io_core().iterate(astream_checklist_with_videos(payload["topic"], payload.get("fresh", False))):
+        if event["event"] == "item":
+            checklist.append(event["item"])
+        elif event["event"] == "video":
+            videos += 1
+            if event.get("url"):
+                youtube_links[event["item"]] = event["url"]
+            if event.get("alternatives"):
+                alternatives[event["item"]] = event["alternatives"]
+            if event.get("error"):
+                errors.append(event["error"])
+        if time.monotonic() - reported >= PROGRESS_INTERVAL:
+            queue.report_progress(job["id"], job["worker"], progress())
+            reported = time.monotonic()
+
+    if not checklist:
+        raise RuntimeError("No checklist items were generated")
+    # Keep the checklist order for display
+    return {
+        "checklist": checklist,
+        "youtube_links": {item: youtube_links[item] for item in checklist if item in youtube_links},
+        "alternatives": alternatives,
+        "errors": errors,
+    }
+
+
+HANDLERS = {
+    "checklist_with_videos": run_checklist_with_videos,
+}
+
+
+def heartbeat(queue, job, stop):
+    """Heartbeat thread for one job, until `stop` is set"""
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        if not queue.heartbeat(job["id"], job["worker"]):
+            # Handed to another worker; this run's result will be discarded
+            return
+
+
+def work(worker_id, poll_interval):
+    """Worker process: claim, run, repeat"""
+    load_dotenv()
+    from job_queue import get_job_queue
+
+    queue = get_job_queue()
+    while True:
+        job = queue.claim(worker_id, kinds=list(HANDLERS))
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        stop = threading.Event()
+        beating = threading.Thread(target=heartbeat, args=(queue, job, stop), daemon=True)
+        beating.start()
+        try:
+            result = HANDLERS[job["kind"]](queue, job)
+        except Exception as e:
+            print(f"[{worker_id}] job {job['id']} failed: {e}")
+            owned = queue.fail(job["id"], worker_id, str(e) or type(e).__name__)
+        else:
+            owned = queue.complete(job["id"], worker_id, result)
+        finally:
+            stop.set()
+            beating.join()
+        if not owned:
+            print(f"[{worker_id}] job {job['id']} was handed to another worker; result discarded")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Questify job worker pool")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("JOB_WORKERS", "2")))
+    parser.add_argument("--poll-interval", type=float, default=0.5,
+                        help="Seconds an idle worker waits before checking the queue again")
+    parser.add_argument("--keep-hours", type=float, default=24,
+                        help="Finished jobs older than this are deleted")
+    args = parser.parse_args()
+    load_dotenv()
+
+    # Spawned, not forked: every worker opens its own database connection and I/O core
+    context = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+
+    def start(n):
+        process = context.Process(target=work, args=(f"{host}-{os.getpid()}-{n}", args.poll_interval), daemon=True)
+        process.start()
+        return process
+
+    workers = [start(n) for n in range(args.workers)]
+    print(f"Started {args.workers} workers")
+
+    from job_queue import get_job_queue
+    queue = get_job_queue()
+    try:
+        while True:
+            time.sleep(5)
+            for n, process in enumerate(workers):
+                if not process.is_alive():
+                    print(f"Worker {n} exited ({process.exitcode}), restarting")
+                    workers[n] = start(n)
+            requeued = queue.requeue_stale()
+            if requeued:
+                print(f"Requeued {requeued} abandoned jobs")
+            queue.prune(args.keep_hours * 3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Per-learner mastery of checklist items, for adaptive quizzes.
+# An Elo / IRT-style model: each learner has an ability rating per item and
+# each item a difficulty rating shared by all learners. Every answer nudges
+# both by how surprising it was, so an update is O(1) and nothing is
+# recomputed from history. The chance of a right answer follows a 3PL-style
+# curve with a guessing floor for four-option questions.
+#
+# Selection picks the items with the highest expected learning gain (the
+# chance the learner doesn't know the item yet). Each learner's items are kept
+# in a fixed number of gain buckets, so picking the next quiz looks at those
+# buckets and the handful of items in the top ones, never at past answers.
+# Quiz difficulty shifts every item equally, so it doesn't change the order;
+# an item's bucket is refreshed whenever the learner answers it.
+#
+# Only the most recently used learners and topics stay in memory; the rest are
+# reloaded from the database when they come back. Learners who aren't signed
+# in are never written there, so their ratings go when they are dropped.
+
+DEFAULT_MASTERY_PATH = os.path.join(".cache", "mastery.sqlite3")
+
+# Chance of guessing a four-option question
+GUESS_RATE = 0.25
+# Quiz difficulty shifts how hard every item plays
+LEVEL_OFFSETS = {"easy": -0.75, "medium": 0.0, "hard": 0.75}
+# Step sizes shrink as ratings settle, down to a floor that keeps them responsive
+LEARNER_STEP = 0.6
+ITEM_STEP = 0.3
+MIN_STEP = 0.1
+GAIN_BUCKETS = 20
+
+
+def _sigmoid(value):
+    return 1 / (1 + math.exp(-value))
+
+
+def _step(base, attempts):
+    return max(MIN_STEP, base / (1 + 0.2 * attempts))
+
+
+class _GainIndex:
+    """One learner's items in one topic, bucketed by expected gain"""
+
+    def __init__(self):
+        # Dicts as insertion-ordered sets
+        self.buckets = [{} for _ in range(GAIN_BUCKETS)]
+        self.bucket_of = {}
+
+    def place(self, item, gain):
+        bucket = min(GAIN_BUCKETS - 1, int(gain * GAIN_BUCKETS))
+        previous = self.bucket_of.get(item)
+        if previous == bucket:
+            return
+        if previous is not None:
+            del self.buckets[previous][item]
+        self.buckets[bucket][item] = None
+        self.bucket_of[item] = bucket
+
+    def top(self, count, allowed):
+        """Up to `count` allowed items, highest gain first. Ties (a new learner's
+        items all share one bucket) are broken at random, so not everyone starts
+        with the same items."""
+        picked = []
+        for bucket in reversed(self.buckets):
+            candidates = [item for item in bucket if item in allowed]
+            random.shuffle(candidates)
+            picked.extend(candidates[:count - len(picked)])
+            if len(picked) == count:
+                break
+        return picked
+
+
+class MasteryModel:
+    def __init__(self, path=DEFAULT_MASTERY_PATH, max_learners=2000, max_topics=500):
+        self.path = path
+        self.max_learners = max_learners
+        self.max_topics = max_topics
+        self.lock = threading.Lock()
+        # (user, topic) -> ({item: [rating, attempts]}, _GainIndex), least recently used first
+        self.learners = OrderedDict()
+        # topic -> {item: [rating, attempts]}, least recently used first
+        self.items = OrderedDict()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS learner_mastery (
+                user_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                item TEXT NOT NULL,
+                rating REAL NOT NULL,
+                attempts INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (user_id, topic, item)
+            );
+            CREATE TABLE IF NOT EXISTS item_difficulty (
+                topic TEXT NOT NULL,
+                item TEXT NOT NULL,
+                rating REAL NOT NULL,
+                attempts INTEGER NOT NULL,
+                PRIMARY KEY (topic, item)
+            );
+        """)
+        self.conn.commit()
+
+    # Ratings, loaded per learner and topic the first time they are needed
+
+    def _learner(self, user_id, topic):
+        """(ratings, gain index) for one learner in one topic"""
+        key = (user_id, topic)
+        if key in self.learners:
+            self.learners.move_to_end(key)
+            return self.learners[key]
+        rows = self.conn.execute(
+            "SELECT item, rating, attempts FROM learner_mastery WHERE user_id = ? AND topic = ?",
+            (user_id, topic),
+        ).fetchall()
+        learner = self.learners[key] = ({item: [rating, attempts] for item, rating, attempts in rows}, _GainIndex())
+        while len(self.learners) > self.max_learners:
+            self.learners.popitem(last=False)
+        return learner
+
+    def _items(self, topic):
+        if topic in self.items:
+            self.items.move_to_end(topic)
+            return self.items[topic]
+        rows = self.conn.execute(
+            "SELECT item, rating, attempts FROM item_difficulty WHERE topic = ?", (topic,)
+        ).fetchall()
+        items = self.items[topic] = {item: [rating, attempts] for item, rating, attempts in rows}
+        while len(self.items) > self.max_topics:
+            self.items.popitem(last=False)
+        return items
+
+    def _knows(self, user_id, topic, item, level):
+        """Chance the learner actually knows the item (before guessing)"""
+        ability = self._learner(user_id, topic)[0].get(item, (0.0, 0))[0]
+        difficulty = self._items(topic).get(item, (0.0, 0))[0]
+        return _sigmoid(ability - difficulty - LEVEL_OFFSETS.get(level.lower(), 0.0))
+
+    def _index(self, user_id, topic, items):
+        index = self._learner(user_id, topic)[1]
+        for item in items:
+            if item not in index.bucket_of:
+                index.place(item, 1 - self._knows(user_id, topic, item, "medium"))
+        return index
+
+    # Public API
+
+    def expected(self, user_id, topic, item, level="Medium"):
+        """Chance of a right answer, guessing included"""
+        with self.lock:
+            return GUESS_RATE + (1 - GUESS_RATE) * self._knows(user_id, topic, item, level)
+
+    def record(self, user_id, topic, level, answers, persist=True):
+        """Update ratings from one quiz: `answers` is (item, correct) per question.
+        Learners that aren't signed in can be tracked in memory only (persist=False)."""
+        now = time.time()
+        with self.lock:
+            learner = self._learner(user_id, topic)[0]
+            items = self._items(topic)
+            index = self._index(user_id, topic, [item for item, _ in answers])
+            for item, correct in answers:
+                knows = self._knows(user_id, topic, item, level)
+                surprise = float(correct) - (GUESS_RATE + (1 - GUESS_RATE) * knows)
+                ability = learner.setdefault(item, [0.0, 0])
+                difficulty = items.setdefault(item, [0.0, 0])
+                ability[0] += _step(LEARNER_STEP, ability[1]) * surprise
+                difficulty[0] -= _step(ITEM_STEP, difficulty[1]) * surprise
+                ability[1] += 1
+                difficulty[1] += 1
+                index.place(item, 1 - self._knows(user_id, topic, item, "medium"))
+
+            if persist:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO learner_mastery VALUES (?, ?, ?, ?, ?, ?)",
+                        [(user_id, topic, item, *learner[item], now) for item, _ in answers],
+                    )
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO item_difficulty VALUES (?, ?, ?, ?)",
+                        [(topic, item, *items[item]) for item, _ in answers],
+                    )
+
+    def select(self, user_id, topic, items, count):
+        """Up to `count` of `items`, highest expected learning gain first"""
+        with self.lock:
+            return self._index(user_id, topic, items).top(count, set(items))
+
+
+_default_model = None
+_default_model_lock = threading.Lock()
+
+
+def get_mastery_model():
+    """Process-wide model instance, configured from the environment"""
+    global _default_model
+    with _default_model_lock:
+        if _default_model is None:
+            _default_model = MasteryModel(
+                os.getenv("MASTERY_PATH", DEFAULT_MASTERY_PATH),
+                max_learners=int(os.getenv("MASTERY_MAX_LEARNERS", "2000")),
+                max_topics=int(os.getenv("MASTERY_MAX_TOPICS", "500")),
+            )
+        return _default_model
@@ -0,0 +1,385 @@
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Per-call tracing for LLM and API calls.
+# Each traced call records wall time, time to first token (streams only),
+# prompt/completion tokens, retries and how it was served (cache hit, miss,
+# joined an in-flight call). Records are aggregated for a Prometheus text
+# endpoint and the app's admin panel, and appended to a size-capped, rotated
+# JSON-lines file by a background writer thread, so finishing a span (often on
+# the async I/O loop) never waits on the disk.
+#
+# The current span and session live in context variables; the async I/O core
+# carries them onto its loop, so code deep in the call (retries, token usage)
+# can add to the span of whoever started it.
+
+DEFAULT_METRICS_FILE = os.path.join(".cache", "metrics.jsonl")
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+current_session = contextvars.ContextVar("metrics_session", default=None)
+current_span = contextvars.ContextVar("metrics_span", default=None)
+
+
+def bind_session(session_id):
+    """Attribute calls started from this thread (and the work it hands off) to a session"""
+    current_session.set(session_id)
+
+
+class Span:
+    def __init__(self, operation, session, cache):
+        self.operation = operation
+        self.session = session
+        self.cache = cache
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+        self.error = None
+
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def add_usage(self, usage):
+        """Add an OpenAI-style usage block ({"prompt_tokens", "completion_tokens"})"""
+        if usage:
+            self.prompt_tokens += usage.get("prompt_tokens") or 0
+            self.completion_tokens += usage.get("completion_tokens") or 0
+
+    def to_record(self):
+        ended = time.perf_counter()
+        return {
+            "ts": time.time(),
+            "operation": self.operation,
+            "session": self.session,
+            "wall": ended - self.started,
+            "ttft": self.first_token_at - self.started if self.first_token_at is not None else None,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retries": self.retries,
+            "cache": self.cache,
+            "error": self.error,
+        }
+
+
+def _new_totals():
+    return {
+        "count": 0,
+        "errors": 0,
+        "wall_sum": 0.0,
+        "buckets": [0] * len(LATENCY_BUCKETS),
+        "ttft_sum": 0.0,
+        "ttft_count": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "retries": 0,
+        "cache": defaultdict(int),
+    }
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RecordWriter:
+    """Appends JSON-lines records from a background thread. The file is rotated
+    once it passes `max_bytes` (path.1 ... path.<backups>); records that arrive
+    while the queue is full are dropped and counted rather than block callers."""
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=3, queue_size=10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.thread = None
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, record):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+                self.thread.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Wait until every queued record is on disk"""
+        if self.thread is not None:
+            self.queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            # Write whatever else is waiting in the same open/close
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._rotate()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(record) + "\n" for record in batch)
+            except OSError:
+                self.dropped += len(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _rotate(self):
+        if not self.max_bytes:
+            return
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except OSError:
+            return
+        if not self.backups:
+            os.remove(self.path)
+            return
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class Tracer:
+    def __init__(self, path=DEFAULT_METRICS_FILE, recent_limit=5000, max_bytes=10 * 1024 * 1024, backups=3):
+        self.path = path
+        self.recent = deque(maxlen=recent_limit)
+        self.totals = defaultdict(_new_totals)
+        self.lock = threading.Lock()
+        self.writer = RecordWriter(path, max_bytes, backups) if path else None
+
+    @contextmanager
+    def span(self, operation, cache="miss"):
+        """Trace the enclosed call; yields the Span so callers can set cache status"""
+        span = Span(operation, current_session.get(), cache)
+        token = current_span.set(span)
+        try:
+            yield span
+        except GeneratorExit:
+            # A streaming consumer stopped early; that is not a failure
+            raise
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            try:
+                current_span.reset(token)
+            except ValueError:
+                # Closed from another context (an abandoned async generator)
+                pass
+            self.finish(span)
+
+    def finish(self, span):
+        record = span.to_record()
+        with self.lock:
+            self.recent.append(record)
+            totals = self.totals[record["operation"]]
+            totals["count"] += 1
+            totals["errors"] += record["error"] is not None
+            totals["wall_sum"] += record["wall"]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if record["wall"] <= bound:
+                    totals["buckets"][i] += 1
+            if record["ttft"] is not None:
+                totals["ttft_sum"] += record["ttft"]
+                totals["ttft_count"] += 1
+            totals["prompt_tokens"] += record["prompt_tokens"]
+            totals["completion_tokens"] += record["completion_tokens"]
+            totals["retries"] += record["retries"]
+            totals["cache"][record["cache"]] += 1
+        if self.writer:
+            self.writer.write(record)
+
+    def session_breakdown(self):
+        """Latency per (session, operation) over the recent records"""
+        with self.lock:
+            records = list(self.recent)
+        groups = defaultdict(list)
+        for record in records:
+            groups[(record["session"] or "-", record["operation"])].append(record)
+
+        rows = []
+        for (session, operation), group in sorted(groups.items()):
+            walls = [record["wall"] for record in group]
+            ttfts = [record["ttft"] for record in group if record["ttft"] is not None]
+            rows.append({
+                "session": session,
+                "operation": operation,
+                "calls": len(group),
+                "p50_s": percentile(walls, 0.5),
+                "p95_s": percentile(walls, 0.95),
+                "ttft_p50_s": percentile(ttfts, 0.5),
+                "tokens": sum(record["prompt_tokens"] + record["completion_tokens"] for record in group),
+                "retries": sum(record["retries"] for record in group),
+                "cache_hits": sum(record["cache"] == "hit" for record in group),
+                "errors": sum(record["error"] is not None for record in group),
+            })
+        return rows
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP questify_call_seconds Wall time of traced calls",
+            "# TYPE questify_call_seconds histogram",
+        ]
+        with self.lock:
+            totals = {
+                operation: {**values, "buckets": list(values["buckets"]), "cache": dict(values["cache"])}
+                for operation, values in self.totals.items()
+            }
+        for operation, values in sorted(totals.items()):
+            label = f'operation="{operation}"'
+            for bound, count in zip(LATENCY_BUCKETS, values["buckets"]):
+                lines.append(f'questify_call_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'questify_call_seconds_bucket{{{label},le="+Inf"}} {values["count"]}')
+            lines.append(f"questify_call_seconds_sum{{{label}}} {values['wall_sum']}")
+            lines.append(f"questify_call_seconds_count{{{label}}} {values['count']}")
+
+        lines.append("# HELP questify_ttft_seconds Time to first token of streamed calls")
+        lines.append("# TYPE questify_ttft_seconds summary")
+        for operation, values in sorted(totals.items()):
+            if values["ttft_count"]:
+                lines.append(f'questify_ttft_seconds_sum{{operation="{operation}"}} {values["ttft_sum"]}')
+                lines.append(f'questify_ttft_seconds_count{{operation="{operation}"}} {values["ttft_count"]}')
+
+        series = [
+            ("questify_tokens_total", "counter", lambda v: [
+                (',kind="prompt"', v["prompt_tokens"]), (',kind="completion"', v["completion_tokens"]),
+            ]),
+            ("questify_retries_total", "counter", lambda v: [("", v["retries"])]),
+            ("questify_errors_total", "counter", lambda v: [("", v["errors"])]),
+            ("questify_calls_total", "counter", lambda v: [
+                (f',cache="{status}"', count) for status, count in sorted(v["cache"].items())
+            ]),
+        ]
+        for name, kind, values_for in series:
+            lines.append(f"# TYPE {name} {kind}")
+            for operation, values in sorted(totals.items()):
+                for extra, value in values_for(values):
+                    lines.append(f'{name}{{operation="{operation}"{extra}}} {value}')
+
+        pools = connection_stats.stats()
+        for name, field in (
+            ("questify_http_requests_total", "requests"),
+            ("questify_http_connections_opened_total", "opened"),
+        ):
+            lines.append(f"# TYPE {name} counter")
+            for pool, counts in pools.items():
+                lines.append(f'{name}{{pool="{pool}"}} {counts[field]}')
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port, host="127.0.0.1"):
+        """Expose /metrics on a background thread"""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+# Connection reuse
+# Pooled HTTP clients count every request they send and, through httpx's
+# "trace" request extension, every new connection a request had to open.
+# Requests that didn't open one went over a kept-alive connection.
+
+class ConnectionStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(Counter)
+        self.hooks = {}
+
+    def count(self, pool, name):
+        with self.lock:
+            self.counts[pool][name] += 1
+
+    def trace_hook(self, pool, is_async=False):
+        """The `trace` extension for requests on `pool` (async for httpx.AsyncClient)"""
+        key = (pool, is_async)
+        if key not in self.hooks:
+            def hook(event, info):
+                if event == "connection.connect_tcp.complete":
+                    self.count(pool, "opened")
+
+            async def async_hook(event, info):
+                hook(event, info)
+
+            self.hooks[key] = async_hook if is_async else hook
+        return self.hooks[key]
+
+    def stats(self):
+        with self.lock:
+            return {
+                pool: {
+                    "requests": counts["requests"],
+                    "opened": counts["opened"],
+                    "reuse_ratio": max(0, counts["requests"] - counts["opened"]) / counts["requests"]
+                    if counts["requests"] else 0.0,
+                }
+                for pool, counts in sorted(self.counts.items())
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+_default_tracer = None
+_default_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Process-wide tracer, configured from the environment.
+
+    METRICS_FILE sets the JSON-lines log (empty to disable), rotated at
+    METRICS_FILE_MAX_MB keeping METRICS_FILE_BACKUPS old files; METRICS_PORT,
+    when set, serves Prometheus text on http://127.0.0.1:<port>/metrics."""
+    global _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            _default_tracer = Tracer(
+                path=os.getenv("METRICS_FILE", DEFAULT_METRICS_FILE),
+                max_bytes=int(float(os.getenv("METRICS_FILE_MAX_MB", "10")) * 1024 * 1024),
+                backups=int(os.getenv("METRICS_FILE_BACKUPS", "3")),
+            )
+            port = os.getenv("METRICS_PORT")
+            if port:
+                _default_tracer.serve_prometheus(int(port), host=os.getenv("METRICS_HOST", "127.0.0.1"))
+        return _default_tracer
+
+
+def trace(operation, cache="miss"):
+    return get_tracer().span(operation, cache)
@@ -0,0 +1,391 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import trace
+
+# Persistent store for per-user study progress.
+# Session state only holds the topic a user is working on; everything else
+# stays here and is loaded on demand. Writes are queued and flushed in
+# batches (one transaction per flush) instead of one commit per click.
+# Each batch written is traced as "progress_flush", so slow or failing
+# flushes show up in the metrics log and /metrics like any other call.
+#
+# Backends are pluggable: pick one with PROGRESS_STORE_URL, e.g.
+#   sqlite:///.cache/progress.sqlite3   (default)
+#   memory://                           (nothing persisted, for local runs)
+
+DEFAULT_STORE_URL = "sqlite:///" + os.path.join(".cache", "progress.sqlite3")
+
+
+class ProgressBackend:
+    """Interface every storage backend implements"""
+
+    def apply(self, checklists, item_progress, quiz_results):
+        """Write one batch: upserts for checklists and item progress, appends for quiz
+        results (each result's "answers", if any, go to the per-question table)"""
+        raise NotImplementedError
+
+    def list_topics(self, user_id):
+        raise NotImplementedError
+
+    def load_topic(self, user_id, topic):
+        """Return {"checklist", "youtube_links", "progress"} for a topic, or None"""
+        raise NotImplementedError
+
+    def load_quiz_results(self, user_id, topic=None, limit=None):
+        """Most recent quiz results first"""
+        raise NotImplementedError
+
+    def load_activity(self, user_id):
+        """Timestamps of the user's checklist items marked completed"""
+        raise NotImplementedError
+
+
+class SQLiteProgressBackend(ProgressBackend):
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets readers in other sessions/processes work while a batch is written
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS checklists (
+                user_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                checklist TEXT NOT NULL,
+                youtube_links TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (user_id, topic)
+            );
+            CREATE INDEX IF NOT EXISTS idx_checklists_recent ON checklists (user_id, updated_at);
+
+            CREATE TABLE IF NOT EXISTS item_progress (
+                user_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                item TEXT NOT NULL,
+                completed INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (user_id, topic, item)
+            );
+
+            CREATE TABLE IF NOT EXISTS quiz_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                percentage REAL NOT NULL,
+                taken_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_quiz_results_user_topic ON quiz_results (user_id, topic, taken_at);
+        """)
+        # Stores created before results carried a quiz id
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(quiz_results)")]
+        if "quiz_id" not in columns:
+            self.conn.execute("ALTER TABLE quiz_results ADD COLUMN quiz_id TEXT")
+        # A quiz is recorded once, however often its submission is replayed
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_quiz_results_quiz_id ON quiz_results (quiz_id)")
+        # One row per answered question, for cohort statistics (cohort_stats.py)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS quiz_answers (
+                quiz_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                user_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                item TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                correct INTEGER NOT NULL,
+                answered_at REAL NOT NULL,
+                PRIMARY KEY (quiz_id, position)
+            )
+        """)
+        self.conn.commit()
+
+    def apply(self, checklists, item_progress, quiz_results):
+        with self.lock:
+            with self.conn:
+                self.conn.executemany("""
+                    INSERT OR REPLACE INTO checklists (user_id, topic, checklist, youtube_links, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (user_id, topic, json.dumps(row["checklist"]), json.dumps(row["youtube_links"]), row["updated_at"])
+                    for (user_id, topic), row in checklists.items()
+                ])
+                self.conn.executemany("""
+                    INSERT OR REPLACE INTO item_progress (user_id, topic, item, completed, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (user_id, topic, item, int(row["completed"]), row["updated_at"])
+                    for (user_id, topic, item), row in item_progress.items()
+                ])
+                self.conn.executemany("""
+                    INSERT OR IGNORE INTO quiz_results (user_id, topic, difficulty, score, total, percentage, taken_at, quiz_id)
+                    VALUES (:user_id, :topic, :difficulty, :score, :total, :percentage, :taken_at, :quiz_id)
+                """, quiz_results)
+                self.conn.executemany("""
+                    INSERT OR IGNORE INTO quiz_answers (quiz_id, position, user_id, topic, item, difficulty, correct, answered_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (row["quiz_id"], position, row["user_id"], row["topic"], answer["item"],
+                     row["difficulty"], int(answer["correct"]), row["taken_at"])
+                    for row in quiz_results if row["quiz_id"] is not None
+                    for position, answer in enumerate(row.get("answers") or ())
+                ])
+
+    def list_topics(self, user_id):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT topic FROM checklists WHERE user_id = ? ORDER BY updated_at DESC", (user_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def load_topic(self, user_id, topic):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT checklist, youtube_links FROM checklists WHERE user_id = ? AND topic = ?",
+                (user_id, topic),
+            ).fetchone()
+            if row is None:
+                return None
+            progress_rows = self.conn.execute(
+                "SELECT item, completed FROM item_progress WHERE user_id = ? AND topic = ?",
+                (user_id, topic),
+            ).fetchall()
+        checklist = json.loads(row[0])
+        completed = {item: bool(done) for item, done in progress_rows}
+        return {
+            "checklist": checklist,
+            "youtube_links": json.loads(row[1]),
+            "progress": {item: completed.get(item, False) for item in checklist},
+        }
+
+    def load_quiz_results(self, user_id, topic=None, limit=None):
+        query = "SELECT topic, difficulty, score, total, percentage, taken_at, quiz_id FROM quiz_results WHERE user_id = ?"
+        params = [user_id]
+        if topic is not None:
+            query += " AND topic = ?"
+            params.append(topic)
+        query += " ORDER BY taken_at DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        keys = ("topic", "difficulty", "score", "total", "percentage", "taken_at", "quiz_id")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def load_activity(self, user_id):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT updated_at FROM item_progress WHERE user_id = ? AND completed = 1", (user_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class MemoryProgressBackend(ProgressBackend):
+    """Keeps everything in process memory; useful when persistence isn't wanted"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checklists = {}
+        self.item_progress = {}
+        self.quiz_results = []
+        self.quiz_answers = []
+        self.quiz_ids = set()
+
+    def apply(self, checklists, item_progress, quiz_results):
+        with self.lock:
+            self.checklists.update(checklists)
+            self.item_progress.update(item_progress)
+            for row in quiz_results:
+                row = dict(row)
+                answers = row.pop("answers", None) or ()
+                if row["quiz_id"] is not None:
+                    if row["quiz_id"] in self.quiz_ids:
+                        continue
+                    self.quiz_ids.add(row["quiz_id"])
+                    self.quiz_answers.extend(
+                        {**answer, "quiz_id": row["quiz_id"], "user_id": row["user_id"], "topic": row["topic"]}
+                        for answer in answers
+                    )
+                self.quiz_results.append(row)
+
+    def list_topics(self, user_id):
+        with self.lock:
+            rows = [(row["updated_at"], topic) for (uid, topic), row in self.checklists.items() if uid == user_id]
+        return [topic for _, topic in sorted(rows, reverse=True)]
+
+    def load_topic(self, user_id, topic):
+        with self.lock:
+            row = self.checklists.get((user_id, topic))
+            if row is None:
+                return None
+            progress = {
+                item: self.item_progress.get((user_id, topic, item), {}).get("completed", False)
+                for item in row["checklist"]
+            }
+        return {"checklist": list(row["checklist"]), "youtube_links": dict(row["youtube_links"]), "progress": progress}
+
+    def load_quiz_results(self, user_id, topic=None, limit=None):
+        with self.lock:
+            rows = [
+                dict(row) for row in reversed(self.quiz_results)
+                if row["user_id"] == user_id and (topic is None or row["topic"] == topic)
+            ]
+        for row in rows:
+            del row["user_id"]
+        return rows[:limit] if limit else rows
+
+    def load_activity(self, user_id):
+        with self.lock:
+            return [
+                row["updated_at"] for (uid, _, _), row in self.item_progress.items()
+                if uid == user_id and row["completed"]
+            ]
+
+
+BACKENDS = {
+    "sqlite": lambda location: SQLiteProgressBackend(location),
+    "memory": lambda location: MemoryProgressBackend(),
+}
+
+
+def create_backend(url):
+    scheme, _, location = url.partition("://")
+    if scheme not in BACKENDS:
+        raise ValueError(f"Unknown progress store backend: {scheme}")
+    # sqlite:///relative/path -> relative/path
+    return BACKENDS[scheme](location[1:] if location.startswith("/") else location)
+
+
+class ProgressStore:
+    """Write-behind front for a backend: coalesces writes and flushes them in batches"""
+
+    def __init__(self, backend, flush_interval=2.0, max_pending=100):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self._reset_pending()
+
+        if flush_interval:
+            flusher = threading.Thread(target=self._flush_periodically, name="progress-flush", daemon=True)
+            flusher.start()
+
+    def _reset_pending(self):
+        # Upserts are keyed so repeated clicks on one item collapse to one row
+        self.pending_checklists = {}
+        self.pending_progress = {}
+        self.pending_results = []
+
+    def _pending_count(self):
+        return len(self.pending_checklists) + len(self.pending_progress) + len(self.pending_results)
+
+    def _queued(self):
+        if self._pending_count() >= self.max_pending:
+            self.flush()
+
+    def save_checklist(self, user_id, topic, checklist, youtube_links, progress=None):
+        now = time.time()
+        with self.lock:
+            self.pending_checklists[(user_id, topic)] = {
+                "checklist": list(checklist), "youtube_links": dict(youtube_links), "updated_at": now
+            }
+            for item in checklist:
+                completed = progress.get(item, False) if progress else False
+                self.pending_progress[(user_id, topic, item)] = {"completed": completed, "updated_at": now}
+        self._queued()
+
+    def set_item_progress(self, user_id, topic, item, completed):
+        with self.lock:
+            self.pending_progress[(user_id, topic, item)] = {"completed": completed, "updated_at": time.time()}
+        self._queued()
+
+    def record_quiz_result(self, user_id, topic, difficulty, score, total, quiz_id=None, answers=None):
+        """Append a quiz result; a result whose quiz_id is already stored is dropped.
+        `answers` ({"item", "correct"} per question) are kept for results with a quiz_id."""
+        with self.lock:
+            self.pending_results.append({
+                "quiz_id": quiz_id,
+                "answers": list(answers or ()),
+                "user_id": user_id,
+                "topic": topic,
+                "difficulty": difficulty,
+                "score": score,
+                "total": total,
+                "percentage": (score / total * 100) if total else 0.0,
+                "taken_at": time.time(),
+            })
+        self._queued()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                if not self._pending_count():
+                    return
+                batch = (self.pending_checklists, self.pending_progress, self.pending_results)
+                self._reset_pending()
+            try:
+                with trace("progress_flush"):
+                    self.backend.apply(*batch)
+            except Exception:
+                # Put the batch back so nothing is lost; newer queued writes win
+                checklists, progress, results = batch
+                with self.lock:
+                    checklists.update(self.pending_checklists)
+                    progress.update(self.pending_progress)
+                    self.pending_checklists = checklists
+                    self.pending_progress = progress
+                    self.pending_results = results + self.pending_results
+                raise
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                # Already recorded on the progress_flush span; the batch stays queued for the next try
+                pass
+
+    # Reads flush first so a session always sees its own writes
+    def list_topics(self, user_id):
+        self.flush()
+        return self.backend.list_topics(user_id)
+
+    def load_topic(self, user_id, topic):
+        self.flush()
+        return self.backend.load_topic(user_id, topic)
+
+    def load_quiz_results(self, user_id, topic=None, limit=None):
+        self.flush()
+        return self.backend.load_quiz_results(user_id, topic, limit)
+
+    def load_activity(self, user_id):
+        self.flush()
+        return self.backend.load_activity(user_id)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_progress_store():
+    """Process-wide store instance, configured from the environment"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ProgressStore(
+                create_backend(os.getenv("PROGRESS_STORE_URL", DEFAULT_STORE_URL)),
+                flush_interval=float(os.getenv("PROGRESS_FLUSH_INTERVAL", "2")),
+                max_pending=int(os.getenv("PROGRESS_MAX_PENDING", "100")),
+            )
+        return _default_store
@@ -0,0 +1,110 @@
+import json
+
+# Prompts sent to the model and the parsers for its answers.
+# Kept free of Streamlit so offline jobs can reuse exactly what the app asks.
+
+MAX_CHECKLIST_ITEMS = 10
+
+
+def build_checklist_messages(topic):
+    return [{"role": "user", "content": f"Generate a comprehensive checklist (8-12 items) of key topics for studying {topic}. Make each item specific and actionable."}]
+
+
+def clean_checklist_line(line):
+    """Return the checklist item on this line, or None if the line isn't one"""
+    if not line.strip() or line.lower().startswith("here's"):
+        return None
+    item = line.strip().lstrip("0123456789.-* ")
+    return item if len(item) > 10 else None
+
+
+def parse_checklist(content):
+    checklist = [clean_checklist_line(line) for line in content.split("\n")]
+    checklist = [item for item in checklist if item][:MAX_CHECKLIST_ITEMS]
+    if not checklist:
+        raise ValueError("No checklist items in response")
+    return checklist
+
+
+def build_quiz_prompt(topic, checklist_item, difficulty):
+    return f"""Create a {difficulty}-difficulty multiple choice question about '{checklist_item}' in the context of {topic}. 
+        Make it educational and relevant. Return in this exact format:
+        Question: [question text]
+        A) [option 1]
+        B) [option 2]
+        C) [option 3]
+        D) [option 4]
+        Correct: [correct option letter]"""
+
+
+def parse_quiz_question(content):
+    response = content.split("\n")
+    question = response[0].replace("Question: ", "")
+    options = [line[3:] for line in response[1:5] if line.strip()]
+    
+    # Find correct answer
+    correct_line = [line for line in response if line.startswith("Correct:")]
+    if correct_line:
+        correct_letter = correct_line[0].split(":")[1].strip()
+        correct_index = ord(correct_letter.upper()) - ord('A')
+        if 0 <= correct_index < len(options):
+            correct_answer = options[correct_index]
+        else:
+            correct_answer = options[0]
+    else:
+        correct_answer = options[0]
+    
+    return question, options, correct_answer
+
+
+# Batch mode: one completion returns every question as JSON
+def build_quiz_batch_prompt(topic, items, difficulty):
+    numbered_items = "\n".join(f"{n}. {item}" for n, item in enumerate(items, 1))
+    return f"""Create {len(items)} {difficulty}-difficulty multiple choice questions in the context of {topic}, one for each of these checklist items, in the same order:
+{numbered_items}
+
+Make them educational and relevant. Return only a JSON object of this exact shape:
+{{"questions": [{{"item": <item number>, "question": "<question text>", "options": ["<option 1>", "<option 2>", "<option 3>", "<option 4>"], "correct_index": <0-3>}}]}}"""
+
+
+def validate_quiz_entry(entry):
+    """Turn one JSON question into (question, options, correct_answer), or None if it is malformed"""
+    if not isinstance(entry, dict):
+        return None
+    question = entry.get("question")
+    options = entry.get("options")
+    correct_index = entry.get("correct_index")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) != 4:
+        return None
+    if not all(isinstance(option, str) and option.strip() for option in options):
+        return None
+    options = [option.strip() for option in options]
+    if len(set(options)) != 4:
+        return None
+    if isinstance(correct_index, bool) or not isinstance(correct_index, int) or not 0 <= correct_index < 4:
+        return None
+    return question.strip(), options, options[correct_index]
+
+
+def parse_quiz_batch(content, num_items):
+    """Parse a batch answer into a list aligned with the requested items (None for invalid entries)"""
+    content = content.strip()
+    if content.startswith("```"):
+        # Drop a markdown code fence around the JSON
+        content = content.split("\n", 1)[1] if "\n" in content else ""
+        content = content.rsplit("```", 1)[0]
+    data = json.loads(content)
+    entries = data.get("questions", []) if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("Batch answer has no question list")
+    
+    results = [None] * num_items
+    for position, entry in enumerate(entries):
+        index = position
+        if isinstance(entry, dict) and isinstance(entry.get("item"), int):
+            index = entry["item"] - 1
+        if 0 <= index < num_items and results[index] is None:
+            results[index] = validate_quiz_entry(entry)
+    return results
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+# Persistent bank of pre-generated quiz questions.
+# Questions are indexed by (topic, checklist item, difficulty). The app draws
+# from here first and only asks the model for more when an item runs thin.
+# build_question_bank.py fills it offline with the same prompt the app uses.
+
+DEFAULT_BANK_PATH = os.path.join(".cache", "question_bank.sqlite3")
+
+
+def normalize_text(text):
+    return " ".join(text.lower().split())
+
+
+def question_fingerprint(topic, item, difficulty, question):
+    """Identical questions for the same slot collapse to one row"""
+    payload = "\x1f".join(normalize_text(part) for part in (topic, item, difficulty, question))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QuestionBank:
+    """SQLite-backed question store with de-duplication and a freshness window"""
+
+    def __init__(self, path=DEFAULT_BANK_PATH, max_age_seconds=30 * 24 * 3600, min_available=3):
+        self.path = path
+        # Questions older than this are no longer served
+        self.max_age_seconds = max_age_seconds
+        # Fewer fresh questions than this for a slot means the bank is too thin to draw from
+        self.min_available = min_available
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fingerprint TEXT NOT NULL UNIQUE,
+                topic TEXT NOT NULL,
+                item TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                question TEXT NOT NULL,
+                options TEXT NOT NULL,
+                correct TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                served_count INTEGER NOT NULL DEFAULT 0,
+                last_served_at REAL NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_questions_slot
+            ON questions (topic, item, difficulty, created_at)
+        """)
+        self.conn.commit()
+
+    def _slot(self, topic, item, difficulty):
+        return normalize_text(topic), normalize_text(item), difficulty.lower()
+
+    def _fresh_after(self):
+        return time.time() - self.max_age_seconds if self.max_age_seconds else 0
+
+    def add(self, topic, item, difficulty, question, options, correct):
+        """Store a question; returns False if the same question is already banked"""
+        if correct not in options:
+            return False
+        topic_key, item_key, difficulty_key = self._slot(topic, item, difficulty)
+        with self.lock:
+            cursor = self.conn.execute("""
+                INSERT OR IGNORE INTO questions
+                (fingerprint, topic, item, difficulty, question, options, correct, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                question_fingerprint(topic, item, difficulty, question),
+                topic_key, item_key, difficulty_key,
+                question, json.dumps(options), correct, time.time(),
+            ))
+            self.conn.commit()
+            return cursor.rowcount == 1
+
+    def count(self, topic, item, difficulty):
+        """Number of fresh questions for a slot"""
+        with self.lock:
+            return self.conn.execute("""
+                SELECT COUNT(*) FROM questions
+                WHERE topic = ? AND item = ? AND difficulty = ? AND created_at >= ?
+            """, (*self._slot(topic, item, difficulty), self._fresh_after())).fetchone()[0]
+
+    def draw(self, topic, item, difficulty, exclude=()):
+        """Return (question, options, correct) for a slot, or None when it is too thin.
+
+        Picks among the least recently served fresh questions so repeat quizzes
+        rotate through the bank, skipping any question text in `exclude`."""
+        excluded = {normalize_text(question) for question in exclude}
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT id, question, options, correct FROM questions
+                WHERE topic = ? AND item = ? AND difficulty = ? AND created_at >= ?
+                ORDER BY last_served_at ASC
+            """, (*self._slot(topic, item, difficulty), self._fresh_after())).fetchall()
+            if len(rows) < self.min_available:
+                return None
+            candidates = [row for row in rows if normalize_text(row[1]) not in excluded]
+            if not candidates:
+                return None
+            row = random.choice(candidates[:self.min_available])
+            self.conn.execute("""
+                UPDATE questions SET served_count = served_count + 1, last_served_at = ?
+                WHERE id = ?
+            """, (time.time(), row[0]))
+            self.conn.commit()
+        options = json.loads(row[2])
+        random.shuffle(options)
+        return row[1], options, row[3]
+
+    def prune(self):
+        """Delete questions that fell out of the freshness window"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM questions WHERE created_at < ?", (self._fresh_after(),)
+            )
+            self.conn.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        with self.lock:
+            total, slots = self.conn.execute("""
+                SELECT COUNT(*), COUNT(DISTINCT topic || '|' || item || '|' || difficulty) FROM questions
+            """).fetchone()
+        return {"questions": total, "slots": slots}
+
+
+_default_bank = None
+_default_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    """Process-wide bank instance, configured from the environment"""
+    global _default_bank
+    with _default_bank_lock:
+        if _default_bank is None:
+            _default_bank = QuestionBank(
+                path=os.getenv("QUESTION_BANK_PATH", DEFAULT_BANK_PATH),
+                max_age_seconds=int(os.getenv("QUESTION_BANK_MAX_AGE_DAYS", "30")) * 24 * 3600,
+                min_available=int(os.getenv("QUESTION_BANK_MIN_AVAILABLE", "3")),
+            )
+        return _default_bank
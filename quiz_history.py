@@ -0,0 +1,86 @@
+import time
+from array import array
+
+# Compact per-session quiz history.
+# Session state used to keep a Python list of float percentages that grew on
+# every results render. A QuizHistory keeps the most recent results in a fixed
+# size ring of typed arrays (a few bytes per quiz, plus a reference to the
+# topic string the session already holds), and running totals over everything
+# it has seen, so averages stay exact after old entries fall out of the ring.
+# Older results are not lost: signed-in users' submissions are in the progress
+# store, which is where the ring is refilled from.
+
+
+class QuizHistory:
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        # Ring slots, filled lazily; `start` is the oldest once the ring is full
+        self.percentages = array("d")
+        self.topics = []
+        self.taken_at = array("d")
+        self.quiz_ids = []
+        self.start = 0
+        # Running totals over every result recorded, including ones evicted from the ring
+        self.count = 0
+        self.percentage_sum = 0.0
+        # Bumped on every change; cheap fingerprint for memoized charts
+        self.version = getattr(self, "version", 0) + 1
+
+    def __len__(self):
+        return len(self.percentages)
+
+    def _order(self):
+        size = len(self.percentages)
+        return [(self.start + i) % size for i in range(size)]
+
+    def record(self, quiz_id, topic, score, total, taken_at=None):
+        """Add a submitted quiz. Returns False (and changes nothing) if this quiz
+        id is already in the ring, so re-running a results page can't count it twice."""
+        if quiz_id is not None and quiz_id in self.quiz_ids:
+            return False
+        percentage = (score / total * 100) if total else 0.0
+        values = (percentage, topic, taken_at or time.time(), quiz_id)
+
+        if len(self.percentages) < self.capacity:
+            self.percentages.append(values[0])
+            self.topics.append(values[1])
+            self.taken_at.append(values[2])
+            self.quiz_ids.append(values[3])
+        else:
+            # Overwrite the oldest slot
+            slot = self.start
+            self.percentages[slot], self.topics[slot], self.taken_at[slot], self.quiz_ids[slot] = values
+            self.start = (self.start + 1) % self.capacity
+
+        self.count += 1
+        self.percentage_sum += percentage
+        self.version += 1
+        return True
+
+    def load(self, results):
+        """Replace the history with stored results (most recent first, as the progress store returns them)"""
+        self.clear()
+        for result in reversed(results):
+            self.record(result.get("quiz_id"), result["topic"], result["score"], result["total"], result["taken_at"])
+
+    def scores(self):
+        """Percentages in the ring, oldest first"""
+        return [self.percentages[slot] for slot in self._order()]
+
+    def entries(self):
+        """(topic, percentage, taken_at) in the ring, oldest first"""
+        return [
+            (self.topics[slot], self.percentages[slot], self.taken_at[slot])
+            for slot in self._order()
+        ]
+
+    def last(self):
+        if not self.percentages:
+            return None
+        return self.percentages[(self.start - 1) % len(self.percentages)]
+
+    def average(self):
+        return self.percentage_sum / self.count if self.count else None
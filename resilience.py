@@ -0,0 +1,219 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+
+from metrics import current_span
+
+# Retry, circuit breaking and request hedging for outbound API calls.
+# Used by the async I/O core: every call goes through ResilienceLayer.call(),
+# which keeps per-endpoint counters the app shows in its sidebar.
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose breaker is open"""
+
+    def __init__(self, endpoint, retry_in):
+        super().__init__(f"{endpoint} is temporarily unavailable (retrying in {retry_in:.1f}s)")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def is_retryable(error):
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def retry_after_seconds(error):
+    """Delay requested by the server through a Retry-After header, if any"""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, then lets a single
+    trial call through once `reset_timeout` has passed (half-open)"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """Return 0 if a call may proceed, otherwise the seconds until the next trial"""
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return 0
+            if state == "half-open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return 0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class ResilienceLayer:
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=20.0,
+                 failure_threshold=5, reset_timeout=30.0, hedge_delays=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # endpoint -> seconds to wait before sending a duplicate request
+        self.hedge_delays = hedge_delays or {}
+        self.breakers = {}
+        self.counters = defaultdict(lambda: defaultdict(int))
+        self.lock = threading.Lock()
+
+    def breaker(self, endpoint):
+        with self.lock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[endpoint]
+
+    def count(self, endpoint, name, amount=1):
+        with self.lock:
+            self.counters[endpoint][name] += amount
+
+    def backoff(self, attempt, error):
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        requested = retry_after_seconds(error)
+        if requested is not None:
+            delay = max(delay, min(requested, self.max_delay))
+        return delay
+
+    def record_failure(self, breaker, endpoint, error):
+        """Count a failed attempt. Only transient errors count against the breaker:
+        a 400 (bad prompt, JSON-mode validation, context too long) says nothing
+        about the endpoint's health and must not lock every session out."""
+        self.count(endpoint, "failures")
+        if is_retryable(error):
+            breaker.record_failure()
+        else:
+            # The endpoint answered, so it is up; a half-open trial has its answer
+            breaker.record_success()
+
+    def should_retry(self, breaker, error, attempt):
+        """Retry transient errors while attempts remain and the breaker is still closed"""
+        return is_retryable(error) and attempt < self.max_attempts - 1 and breaker.state == "closed"
+
+    async def call(self, endpoint, send, discard=None):
+        """Run `send()` (a coroutine factory) with the breaker, retries and hedging for `endpoint`.
+        `discard` (a coroutine function) releases the result of a hedged request
+        that finished but lost, e.g. to close an open stream."""
+        breaker = self.breaker(endpoint)
+        for attempt in range(self.max_attempts):
+            retry_in = breaker.allow()
+            if retry_in:
+                self.count(endpoint, "rejected")
+                raise CircuitOpenError(endpoint, retry_in)
+
+            self.count(endpoint, "attempts")
+            try:
+                result = await self._hedged(endpoint, send, discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                self.record_failure(breaker, endpoint, error)
+                if not self.should_retry(breaker, error, attempt):
+                    raise
+                self.count(endpoint, "retries")
+                span = current_span.get()
+                if span:
+                    span.retries += 1
+                await asyncio.sleep(self.backoff(attempt, error))
+                continue
+
+            breaker.record_success()
+            self.count(endpoint, "successes")
+            return result
+
+    async def _hedged(self, endpoint, send, discard=None):
+        """Send once; if no answer within the hedge delay, send a duplicate and take whichever lands first"""
+        hedge_delay = self.hedge_delays.get(endpoint)
+        tasks = [asyncio.ensure_future(send())]
+        winner = None
+        try:
+            if not hedge_delay:
+                return await tasks[0]
+
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done:
+                return tasks[0].result()
+
+            self.count(endpoint, "hedges")
+            tasks.append(asyncio.ensure_future(send()))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self.count(endpoint, "hedge_wins")
+                        winner = task
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The losing (or abandoned) request is cancelled, or released if it finished too
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif discard and len(tasks) > 1 and task is not winner and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+
+    def stats(self):
+        with self.lock:
+            endpoints = set(self.counters) | set(self.breakers)
+            return {
+                endpoint: {
+                    **self.counters[endpoint],
+                    "breaker": self.breakers[endpoint].state if endpoint in self.breakers else "closed",
+                }
+                for endpoint in sorted(endpoints)
+            }
@@ -0,0 +1,201 @@
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Spaced-repetition reviews (SM-2) over checklist items.
+# A card is one checklist item for one learner. It is created when the item
+# is marked completed or first quizzed, and every graded answer reschedules
+# it: right answers push the next review further out (by the card's ease
+# factor), wrong ones bring it back tomorrow. Each card remembers the last
+# question asked about it, so a review quiz is rebuilt from stored questions
+# (that one, or the question bank) instead of generating new ones.
+#
+# Due cards sit in a min-heap per learner and topic, keyed by due time, so
+# "what's due now" pops from the top instead of scanning every card.
+# Rescheduling pushes a fresh entry and leaves the old one to be skipped when
+# it surfaces. Only the most recently used learner-topics stay in memory (the
+# rest reload from the database); learners who aren't signed in are never
+# written there, so their schedule goes when they are dropped.
+
+DEFAULT_REVIEWS_PATH = os.path.join(".cache", "reviews.sqlite3")
+
+DAY = 24 * 3600
+MIN_EASE = 1.3
+START_EASE = 2.5
+# Quizzes reschedule cards whether or not they were due, so intervals would
+# otherwise compound without bound for an item answered right over and over
+MAX_INTERVAL_DAYS = 365
+# SM-2 grades (0-5) for what the app can observe
+GRADE_CORRECT = 4
+GRADE_WRONG = 1
+# A completed checklist item is treated as learned, with its first review tomorrow
+GRADE_COMPLETED = 4
+
+
+def sm2(ease, interval_days, repetitions, grade):
+    """One SM-2 step; returns (ease, interval_days, repetitions)"""
+    if grade < 3:
+        repetitions = 0
+        interval_days = 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval_days = 1
+        elif repetitions == 2:
+            interval_days = 6
+        else:
+            interval_days = min(MAX_INTERVAL_DAYS, round(interval_days * ease))
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return ease, interval_days, repetitions
+
+
+class ReviewScheduler:
+    def __init__(self, path=DEFAULT_REVIEWS_PATH, max_learners=2000):
+        self.path = path
+        self.max_learners = max_learners
+        self.lock = threading.Lock()
+        # (user, topic) -> ({item: card dict}, heap of (due_at, item)), least recently used first
+        self.learners = OrderedDict()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS review_cards (
+                user_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                item TEXT NOT NULL,
+                ease REAL NOT NULL,
+                interval_days INTEGER NOT NULL,
+                repetitions INTEGER NOT NULL,
+                due_at REAL NOT NULL,
+                reviewed_at REAL NOT NULL,
+                question TEXT,
+                PRIMARY KEY (user_id, topic, item)
+            )
+        """)
+        self.conn.commit()
+
+    def _learner(self, user_id, topic):
+        """(cards, heap) for one learner in one topic, loaded on first use"""
+        key = (user_id, topic)
+        if key in self.learners:
+            self.learners.move_to_end(key)
+            return self.learners[key]
+        rows = self.conn.execute("""
+            SELECT item, ease, interval_days, repetitions, due_at, reviewed_at, question
+            FROM review_cards WHERE user_id = ? AND topic = ?
+        """, (user_id, topic)).fetchall()
+        cards = {}
+        for item, ease, interval_days, repetitions, due_at, reviewed_at, question in rows:
+            cards[item] = {
+                "ease": ease, "interval_days": interval_days, "repetitions": repetitions,
+                "due_at": due_at, "reviewed_at": reviewed_at,
+                "question": json.loads(question) if question else None,
+            }
+        heap = [(card["due_at"], item) for item, card in cards.items()]
+        heapq.heapify(heap)
+        learner = self.learners[key] = (cards, heap)
+        while len(self.learners) > self.max_learners:
+            self.learners.popitem(last=False)
+        return learner
+
+    def _grade(self, user_id, topic, item, grade, question, now):
+        cards, heap = self._learner(user_id, topic)
+        card = cards.get(item)
+        if card is None:
+            card = cards[item] = {
+                "ease": START_EASE, "interval_days": 0, "repetitions": 0,
+                "due_at": now, "reviewed_at": now, "question": None,
+            }
+        card["ease"], card["interval_days"], card["repetitions"] = sm2(
+            card["ease"], card["interval_days"], card["repetitions"], grade
+        )
+        card["due_at"] = now + card["interval_days"] * DAY
+        card["reviewed_at"] = now
+        if question is not None:
+            card["question"] = question
+        heapq.heappush(heap, (card["due_at"], item))
+        if len(heap) > 2 * len(cards) + 16:
+            # Mostly superseded entries; rebuild rather than let them pile up
+            heap[:] = [(card["due_at"], item) for item, card in cards.items()]
+            heapq.heapify(heap)
+        return card
+
+    def _save(self, user_id, topic, items):
+        cards = self._learner(user_id, topic)[0]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO review_cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (user_id, topic, item, card["ease"], card["interval_days"], card["repetitions"],
+                     card["due_at"], card["reviewed_at"], json.dumps(card["question"]) if card["question"] else None)
+                    for item in items
+                    for card in (cards[item],)
+                ],
+            )
+
+    def record_answers(self, user_id, topic, graded, persist=True, now=None):
+        """Reschedule after a quiz: `graded` is (item, correct, question) per
+        question, where question is the quiz entry to reuse in later reviews"""
+        now = now or time.time()
+        with self.lock:
+            for item, correct, question in graded:
+                self._grade(user_id, topic, item, GRADE_CORRECT if correct else GRADE_WRONG, question, now)
+            if persist:
+                self._save(user_id, topic, [item for item, _, _ in graded])
+
+    def record_completed(self, user_id, topic, item, persist=True, now=None):
+        """Start reviewing a checklist item the learner just completed (no-op if already scheduled)"""
+        now = now or time.time()
+        with self.lock:
+            if item in self._learner(user_id, topic)[0]:
+                return
+            self._grade(user_id, topic, item, GRADE_COMPLETED, None, now)
+            if persist:
+                self._save(user_id, topic, [item])
+
+    def due(self, user_id, topic, limit=None, now=None):
+        """A topic's cards due by `now`, most overdue first, as (topic, item, card)"""
+        now = now or time.time()
+        with self.lock:
+            cards, heap = self._learner(user_id, topic)
+            found = []
+            while heap and heap[0][0] <= now and (limit is None or len(found) < limit):
+                due_at, item = heapq.heappop(heap)
+                card = cards.get(item)
+                # Superseded by a later reschedule
+                if card is None or card["due_at"] != due_at:
+                    continue
+                found.append((topic, item, dict(card)))
+            # Reading doesn't consume: due cards stay due until they are answered
+            for _, item, card in found:
+                heapq.heappush(heap, (card["due_at"], item))
+            return found
+
+    def next_due(self, user_id, topic):
+        """{item: due_at} for a topic's scheduled cards"""
+        with self.lock:
+            return {item: card["due_at"] for item, card in self._learner(user_id, topic)[0].items()}
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_review_scheduler():
+    """Process-wide scheduler instance, configured from the environment"""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = ReviewScheduler(
+                os.getenv("REVIEWS_PATH", DEFAULT_REVIEWS_PATH),
+                max_learners=int(os.getenv("REVIEWS_MAX_LEARNERS", "2000")),
+            )
+        return _default_scheduler
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+# Single-flight de-duplication for upstream calls.
+# When several sessions ask for the same thing at the same moment (a hot topic's
+# checklist, the same YouTube search), the first caller starts the upstream
+# call and everyone else waits on it instead of sending their own. Keys are
+# forgotten as soon as the call finishes, so this never serves stale results;
+# the on-disk caches take over from there.
+#
+# All methods run on the async I/O core's event loop, which is what makes the
+# check-then-start below race-free without a lock.
+#
+# A shared stream is pumped by a task its broadcast holds on to (the loop only
+# keeps weak references to tasks). Once every consumer has gone the task is
+# cancelled, so nobody keeps paying for tokens no one will read.
+
+
+class _Broadcast:
+    """Items of one shared stream, replayable from the start by late joiners"""
+
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Event()
+        self.task = None
+        self.consumers = 0
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}
+        self.streams = {}
+        # kind -> {"upstream": calls sent, "shared": callers that joined one}
+        self.counters = defaultdict(lambda: defaultdict(int))
+        self.lock = threading.Lock()
+
+    def _count(self, kind, name):
+        with self.lock:
+            self.counters[kind][name] += 1
+
+    def _forget(self, table, key, value):
+        if table.get(key) is value:
+            del table[key]
+
+    def in_flight(self, kind, key):
+        """True if a call or stream for this key is running and would be joined"""
+        return (kind, key) in self.calls or (kind, key) in self.streams
+
+    async def do(self, kind, key, factory):
+        """Await `factory()` (a coroutine factory), sharing it with identical concurrent calls.
+
+        The upstream call runs as its own task, so a caller that gives up
+        (rerun, timeout) doesn't cancel it for the others."""
+        key = (kind, key)
+        task = self.calls.get(key)
+        if task is None:
+            self._count(kind, "upstream")
+            task = asyncio.ensure_future(factory())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self._count(kind, "shared")
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        self._forget(self.calls, key, task)
+        # Retrieve the error so an upstream call nobody waited for doesn't warn
+        if not task.cancelled():
+            task.exception()
+
+    async def stream(self, kind, key, factory):
+        """Iterate `factory()` (an async generator factory), sharing it with identical concurrent streams"""
+        key = (kind, key)
+        broadcast = self.streams.get(key)
+        if broadcast is None:
+            self._count(kind, "upstream")
+            broadcast = _Broadcast()
+            self.streams[key] = broadcast
+            broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, factory()))
+        else:
+            self._count(kind, "shared")
+
+        broadcast.consumers += 1
+        try:
+            position = 0
+            while True:
+                while position < len(broadcast.items):
+                    yield broadcast.items[position]
+                    position += 1
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                await broadcast.changed.wait()
+        finally:
+            broadcast.consumers -= 1
+            if not broadcast.consumers and not broadcast.done:
+                # Last one out: stop the upstream, and don't let a newcomer join it while it winds down
+                self._forget(self.streams, key, broadcast)
+                broadcast.task.cancel()
+
+    async def _pump(self, key, broadcast, agen):
+        try:
+            async for item in agen:
+                broadcast.items.append(item)
+                broadcast.notify()
+        except (Exception, asyncio.CancelledError) as e:
+            broadcast.error = e
+        finally:
+            broadcast.done = True
+            self._forget(self.streams, key, broadcast)
+            broadcast.notify()
+
+    def stats(self):
+        with self.lock:
+            return {kind: dict(counts) for kind, counts in self.counters.items()}
@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from analytics import (  # noqa: E402
+    dashboard_summary, results_frame, rolling_scores, study_streaks, time_on_task, topic_accuracy,
+)
+
+DAY = 86400
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture(autouse=True)
+def utc_days(monkeypatch):
+    monkeypatch.setenv("STUDY_TIMEZONE", "UTC")
+
+
+def result(topic, score, total, taken_at):
+    return {"topic": topic, "score": score, "total": total, "percentage": score / total * 100, "taken_at": taken_at}
+
+
+def test_results_frame_sorts_and_fills_missing_totals():
+    assert results_frame([]).empty
+    frame = results_frame([
+        result("SQL", 3, 4, 200.0),
+        {"topic": "Go", "percentage": 40.0, "taken_at": 100.0},
+    ])
+    assert list(frame["topic"]) == ["Go", "SQL"]
+    assert list(frame["score"]) == [40.0, 3.0]
+    assert list(frame["total"]) == [100.0, 4.0]
+
+
+def test_topic_accuracy_weights_by_questions_asked():
+    frame = results_frame([
+        result("SQL", 3, 4, utc(2024, 5, 1, 9, 0, 30)),
+        result("Python", 5, 5, utc(2024, 5, 1, 10)),
+        result("SQL", 1, 4, utc(2024, 5, 2, 8, 15, 59)),
+    ])
+    table = topic_accuracy(frame)
+    assert list(table["Topic"]) == ["SQL", "Python"]
+    assert list(table["Quizzes"]) == [2, 1]
+    # 4 right of 8 asked, not the mean of 75% and 25% weighted by quiz
+    assert list(table["Accuracy"]) == [50.0, 100.0]
+    assert table["Last Taken"][0] == pd.Timestamp("2024-05-02 08:15")
+    assert list(topic_accuracy(results_frame([])).columns) == ["Topic", "Quizzes", "Accuracy", "Last Taken"]
+
+
+def test_rolling_scores():
+    frame = results_frame([result("SQL", score, 10, n) for n, score in enumerate([1, 2, 6])])
+    trend = rolling_scores(frame, window=2)
+    assert list(trend["Quiz"]) == [1, 2, 3]
+    assert list(trend["Score"]) == [10.0, 20.0, 60.0]
+    assert list(trend["Rolling Average"]) == [10.0, 15.0, 40.0]
+
+
+def test_study_streaks_with_gaps():
+    start = utc(2024, 5, 1, 12)
+    days = [0, 1, 1, 2, 5, 6]
+    stamps = [start + day * DAY for day in days]
+    assert study_streaks(stamps, now=start + 6 * DAY) == (2, 3)
+    # The current streak survives the next day, then ends
+    assert study_streaks(stamps, now=start + 7 * DAY) == (2, 3)
+    assert study_streaks(stamps, now=start + 8 * DAY) == (0, 3)
+    assert study_streaks([start], now=start) == (1, 1)
+    assert study_streaks([], now=start) == (0, 0)
+
+
+def test_time_on_task_credits_gaps_under_the_idle_cutoff():
+    start = utc(2024, 5, 1, 10)
+    stamps = [start + 4800, start, start + 600, start + 1200, start + DAY]
+    minutes = time_on_task(stamps, idle_cutoff=1800, event_credit=60)
+    # 600 + 600 seconds of gaps, then two sittings' last events at 60 seconds each
+    assert minutes.to_dict() == {pd.Timestamp("2024-05-01"): 22.0, pd.Timestamp("2024-05-02"): 1.0}
+    assert time_on_task([]).empty
+
+
+def test_days_follow_daylight_saving(monkeypatch):
+    monkeypatch.setenv("STUDY_TIMEZONE", "America/New_York")
+    # 23:30 EST and 00:30 EDT: no single UTC offset puts both on the right day
+    winter = utc(2024, 1, 16, 4, 30)
+    summer = utc(2024, 7, 16, 4, 30)
+    minutes = time_on_task([winter, summer])
+    assert list(minutes.index) == [pd.Timestamp("2024-01-15"), pd.Timestamp("2024-07-16")]
+
+    # Across the March change: 23:30 EST on the 9th, 23:30 EDT on the 10th
+    assert study_streaks([utc(2024, 3, 10, 4, 30), utc(2024, 3, 11, 3, 30)], now=utc(2024, 3, 11, 3, 30)) == (2, 2)
+
+
+def test_dashboard_summary_empty_and_single_result():
+    now = utc(2024, 5, 10, 12)
+    empty = dashboard_summary([], now=now)
+    assert empty["quizzes"] == 0
+    assert empty["average"] is None
+    assert (empty["current_streak"], empty["longest_streak"]) == (0, 0)
+    assert empty["minutes_last_7_days"] == 0.0
+    assert empty["topics"].empty and empty["trend"].empty
+
+    single = dashboard_summary([result("SQL", 3, 4, now - 3600)], activity=[now - 10 * DAY], now=now)
+    assert single["quizzes"] == 1
+    assert single["average"] == 75.0
+    assert (single["current_streak"], single["longest_streak"]) == (1, 1)
+    # The activity ten days ago is outside the last seven days
+    assert single["minutes_last_7_days"] == 1.0
+    assert single["minutes_per_day"].sum() == 2.0
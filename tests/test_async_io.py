@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from async_io import AsyncIOCore
+from resilience import ResilienceLayer
+
+
+def make_core(handler, **resilience):
+    core = AsyncIOCore(
+        limits={"youtube": 4, "groq": 2},
+        timeouts={"youtube": 5, "groq": 5},
+        resilience=ResilienceLayer(base_delay=0, **resilience),
+    )
+    core.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return core
+
+
+def test_every_upstream_attempt_is_charged():
+    statuses = [503, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), json={"items": []})
+
+    charged = []
+
+    async def charge():
+        charged.append(1)
+
+    core = make_core(handler, max_attempts=3)
+    assert core.run(core.youtube_search("binary search", on_attempt=charge), timeout=5) == {"items": []}
+    # The failed attempt was sent (and billed) too
+    assert len(charged) == 2
+
+
+def test_hedged_requests_are_charged():
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"items": []})
+
+    charged = []
+
+    async def charge():
+        charged.append(1)
+
+    core = make_core(handler, hedge_delays={"youtube.search": 0.05})
+    core.run(core.youtube_search("binary search", on_attempt=charge), timeout=5)
+    assert len(charged) == 2
+    assert core.resilience.stats()["youtube.search"]["hedges"] == 1
+
+
+def sse(*deltas):
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n" for delta in deltas]
+    return "".join(lines) + "data: [DONE]\n\n"
+
+
+def collect(core, agen):
+    async def run():
+        return [delta async for delta in agen]
+    return core.run(run(), timeout=5)
+
+
+def test_stream_setup_is_retried_through_the_resilience_layer():
+    statuses = [503, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), text=sse("Hello", " world"))
+
+    core = make_core(handler, max_attempts=3)
+    assert collect(core, core.groq_chat_stream([], "model", 10)) == ["Hello", " world"]
+    stats = core.resilience.stats()["groq.chat"]
+    assert (stats["attempts"], stats["retries"], stats["successes"]) == (2, 1, 1)
+    # Every attempt gave its provider slot back
+    assert core.semaphores["groq"]._value == 2
+
+
+def test_stream_client_error_is_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(400, json={"error": "bad request"})
+
+    core = make_core(handler, max_attempts=3)
+    with pytest.raises(httpx.HTTPStatusError):
+        collect(core, core.groq_chat_stream([], "model", 10))
+    assert len(calls) == 1
+    assert core.resilience.stats()["groq.chat"]["breaker"] == "closed"
+    assert core.semaphores["groq"]._value == 2
+
+
+def test_stream_error_after_first_delta_is_raised_not_retried():
+    calls = []
+
+    async def body():
+        yield sse("Hello").split("data: [DONE]")[0].encode()
+        raise httpx.ReadError("connection reset")
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(200, content=body())
+
+    core = make_core(handler, max_attempts=3)
+    received = []
+
+    async def run():
+        async for delta in core.groq_chat_stream([], "model", 10):
+            received.append(delta)
+
+    with pytest.raises(httpx.ReadError):
+        core.run(run(), timeout=5)
+    assert received == ["Hello"]
+    assert len(calls) == 1
+    assert core.semaphores["groq"]._value == 2
+
+
+def test_hedged_stream_releases_the_losing_request():
+    async def handler(request):
+        await asyncio.sleep(0.1)
+        return httpx.Response(200, text=sse("Hi"))
+
+    core = make_core(handler, hedge_delays={"groq.chat": 0.05})
+    assert collect(core, core.groq_chat_stream([], "model", 10)) == ["Hi"]
+    core.run(asyncio.sleep(0.2), timeout=5)
+    assert core.resilience.stats()["groq.chat"]["hedges"] == 1
+    assert core.semaphores["groq"]._value == 2
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+import cohort_stats  # noqa: E402
+from progress_store import SQLiteProgressBackend  # noqa: E402
+
+# (user, item, correct). Every SQL answer besides ann-f's has a rest score;
+# ann-f answered once, so her answer counts for the correct rate only.
+COHORT = [
+    ("u1", "A", 1), ("u1", "B", 1),
+    ("u2", "A", 1), ("u2", "B", 0),
+    ("u3", "A", 0), ("u3", "B", 0),
+    ("u4", "A", 0), ("u4", "B", 1),
+    ("u5", "A", 1), ("u5", "B", 1),
+    ("ann-f", "A", 0),
+]
+
+
+def make_store(path, rows, topic="SQL", start=0):
+    backend = SQLiteProgressBackend(path)
+    with backend.conn:
+        backend.conn.executemany(
+            "INSERT INTO quiz_answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(f"quiz-{start + n}", 0, user, topic, item, "Medium", correct, 0.0)
+             for n, (user, item, correct) in enumerate(rows)],
+        )
+    backend.conn.close()
+
+
+def stats_by_item(frame):
+    return frame.set_index("item")
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "progress.sqlite3")
+    make_store(path, COHORT)
+    # One learner whose two answers are both right: no spread to correlate
+    make_store(path, [("u7", "C", 1), ("u7", "D", 1)], topic="Go", start=100)
+    return path
+
+
+def test_point_biserial_against_hand_computed_cohort(store, tmp_path):
+    target = cohort_stats.run(store, str(tmp_path / "out"), workers=1)
+    stats = stats_by_item(pd.read_parquet(target))
+
+    assert stats.loc["A", "answers"] == 6
+    assert stats.loc["A", "correct_rate"] == pytest.approx(0.5)
+    assert stats.loc["B", "correct_rate"] == pytest.approx(0.6)
+    # A against the rest score (B) over u1..u5: x = 11001, y = 10011 -> r = 1/6
+    assert stats.loc["A", "discrimination"] == pytest.approx(1 / 6)
+    assert stats.loc["B", "discrimination"] == pytest.approx(np.corrcoef([1, 0, 0, 1, 1], [1, 1, 0, 0, 1])[0, 1])
+    assert np.isnan(stats.loc["C", "discrimination"])
+    assert stats.loc["C", "topic"] == "Go"
+
+
+def test_chunked_merge_matches_a_single_chunk(store, tmp_path):
+    whole = pd.read_parquet(cohort_stats.run(store, str(tmp_path / "whole"), workers=1))
+    chunked = pd.read_parquet(cohort_stats.run(store, str(tmp_path / "chunked"), workers=1, chunk_rows=3))
+    assert len(cohort_stats.chunk_ranges(store, 3)) == 5
+    columns = ["topic", "answers", "correct_rate", "discrimination"]
+    pd.testing.assert_frame_equal(
+        stats_by_item(whole)[columns].sort_index(), stats_by_item(chunked)[columns].sort_index()
+    )
+
+
+def test_aggregate_chunk_sums(store):
+    cohort_stats._init_worker(cohort_stats.user_totals(store))
+    sums = cohort_stats.aggregate_chunk(store, 1, 3)
+    # Rows 1-2 are u1's answers: both right, each with the other as rest score
+    assert list(sums.index) == [("SQL", "A"), ("SQL", "B")]
+    assert sums.loc[("SQL", "A")].to_dict() == {
+        "answers": 1, "correct": 1.0, "paired": 1.0, "x": 1.0, "y": 1.0, "xy": 1.0, "yy": 1.0,
+    }
+    assert cohort_stats.aggregate_chunk(store, 1000, 2000).empty
+
+
+def test_empty_store_writes_an_empty_file(tmp_path):
+    path = str(tmp_path / "progress.sqlite3")
+    make_store(path, [])
+    stats = pd.read_parquet(cohort_stats.run(path, str(tmp_path / "out"), workers=1))
+    assert len(stats) == 0
+    assert {"topic", "item", "answers", "correct_rate", "discrimination", "updated_at"} <= set(stats.columns)
+
+
+def test_loaded_stats_are_reread_only_when_the_file_changes(store, tmp_path):
+    target = cohort_stats.run(store, str(tmp_path / "out"), workers=1)
+    first = cohort_stats.load_item_stats(target)
+    assert cohort_stats.load_item_stats(target) is first
+
+    make_store(store, [("u8", "A", 1), ("u8", "B", 1)], start=200)
+    cohort_stats.run(store, str(tmp_path / "out"), workers=1)
+    mtime = os.path.getmtime(target) + 10
+    os.utime(target, (mtime, mtime))
+    reloaded = cohort_stats.load_item_stats(target)
+    assert reloaded is not first
+    assert stats_by_item(reloaded).loc["A", "answers"] == 7
+    assert cohort_stats.load_item_stats(str(tmp_path / "missing.parquet")) is None
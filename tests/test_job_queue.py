@@ -0,0 +1,101 @@
+import os
+import time
+
+import pytest
+
+from job_queue import JobQueue, QueueFull, PRIORITY_INTERACTIVE
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(os.path.join(tmp_path, "jobs.sqlite3"), max_depth=3, max_attempts=2, stale_after=60)
+
+
+def make_stale(queue, job_id):
+    queue.conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - 3600, job_id))
+
+
+def test_identical_jobs_share_one_and_urgent_duplicate_bumps_priority(queue):
+    first = queue.submit("checklist", {"topic": "SQL"}, dedup_key="sql")
+    again = queue.submit("checklist", {"topic": "SQL"}, priority=PRIORITY_INTERACTIVE, dedup_key="sql")
+    assert again == first
+    assert queue.get(first)["priority"] == PRIORITY_INTERACTIVE
+    assert queue.depth() == {"queued": 1}
+
+
+def test_finished_job_no_longer_dedups(queue):
+    first = queue.submit("checklist", {}, dedup_key="sql")
+    job = queue.claim("w1")
+    assert queue.complete(job["id"], "w1", {"ok": True})
+    assert queue.submit("checklist", {}, dedup_key="sql") != first
+
+
+def test_submit_pushes_back_when_full(queue):
+    for n in range(3):
+        queue.submit("checklist", {"n": n})
+    with pytest.raises(QueueFull) as raised:
+        queue.submit("checklist", {"n": 3})
+    assert raised.value.depth == 3
+
+
+def test_claim_takes_most_urgent_then_oldest(queue):
+    old = queue.submit("checklist", {"n": 1})
+    urgent = queue.submit("checklist", {"n": 2}, priority=PRIORITY_INTERACTIVE)
+    newer = queue.submit("checklist", {"n": 3})
+    assert queue.position(newer) == 2
+    assert [queue.claim("w")["id"] for _ in range(3)] == [urgent, old, newer]
+    assert queue.claim("w") is None
+
+
+def test_claim_filters_by_kind(queue):
+    queue.submit("video", {})
+    assert queue.claim("w", kinds=["checklist"]) is None
+    assert queue.claim("w", kinds=["video"])["kind"] == "video"
+
+
+def test_failed_job_is_retried_then_failed(queue):
+    job_id = queue.submit("checklist", {})
+    queue.claim("w1")
+    assert queue.fail(job_id, "w1", "boom")
+    assert queue.get(job_id)["status"] == "queued"
+    queue.claim("w2")
+    queue.fail(job_id, "w2", "boom again")
+    job = queue.get(job_id)
+    assert (job["status"], job["error"], job["attempts"]) == ("failed", "boom again", 2)
+
+
+def test_stale_job_is_requeued_and_old_worker_locked_out(queue):
+    job_id = queue.submit("checklist", {})
+    queue.claim("w1")
+    make_stale(queue, job_id)
+    assert queue.requeue_stale() == 1
+    assert queue.claim("w2")["worker"] == "w2"
+
+    # The first worker finishing late changes nothing
+    assert not queue.report_progress(job_id, "w1", {"checklist": ["stale"]})
+    assert not queue.heartbeat(job_id, "w1")
+    assert not queue.complete(job_id, "w1", {"checklist": ["stale"]})
+    assert not queue.fail(job_id, "w1", "late failure")
+    job = queue.get(job_id)
+    assert (job["status"], job["worker"], job["progress"]) == ("running", "w2", None)
+
+    assert queue.complete(job_id, "w2", {"checklist": ["fresh"]})
+    assert queue.get(job_id)["result"] == {"checklist": ["fresh"]}
+
+
+def test_heartbeat_keeps_job_from_going_stale(queue):
+    job_id = queue.submit("checklist", {})
+    queue.claim("w1")
+    make_stale(queue, job_id)
+    assert queue.heartbeat(job_id, "w1")
+    assert queue.requeue_stale() == 0
+
+
+def test_stale_job_out_of_attempts_fails(queue):
+    job_id = queue.submit("checklist", {})
+    for worker in ("w1", "w2"):
+        queue.claim(worker)
+        make_stale(queue, job_id)
+        queue.requeue_stale()
+    job = queue.get(job_id)
+    assert (job["status"], job["error"]) == ("failed", "Worker stopped responding")
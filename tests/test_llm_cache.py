@@ -0,0 +1,43 @@
+import itertools
+
+import pytest
+
+import llm_cache
+from llm_cache import TOUCH_BATCH, ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(ticks)))
+
+
+def accessed_at(cache, key):
+    return cache.conn.execute("SELECT accessed_at FROM responses WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_are_written_in_batches(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    keys = [f"key {n}" for n in range(TOUCH_BATCH)]
+    for key in keys:
+        cache.set(key, "answer")
+    stored = accessed_at(cache, keys[0])
+    # Repeat hits on one key wait for the batch too
+    for key in keys[:-1] + keys[:1]:
+        assert cache.get(key) == "answer"
+    assert accessed_at(cache, keys[0]) == stored
+    cache.get(keys[-1])
+    assert accessed_at(cache, keys[0]) > stored
+    assert cache.touched == {}
+    assert cache.stats()["hits"] == TOUCH_BATCH + 1
+
+
+def test_eviction_counts_unwritten_hits(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from mastery import GUESS_RATE, MasteryModel
+
+ITEMS = [f"Item {n}" for n in range(10)]
+
+
+@pytest.fixture
+def model(tmp_path):
+    return MasteryModel(str(tmp_path / "mastery.sqlite3"))
+
+
+def test_new_learner_starts_at_even_odds_shifted_by_level(model):
+    medium = model.expected("ann", "SQL", "Joins")
+    assert medium == pytest.approx(GUESS_RATE + (1 - GUESS_RATE) * 0.5)
+    assert model.expected("ann", "SQL", "Joins", "Easy") > medium > model.expected("ann", "SQL", "Joins", "Hard")
+
+
+def test_answers_move_learner_and_item_ratings(model):
+    before = model.expected("ann", "SQL", "Joins")
+    model.record("ann", "SQL", "Medium", [("Joins", True)])
+    after_right = model.expected("ann", "SQL", "Joins")
+    assert after_right > before
+    # A right answer makes the item look easier for everyone else too
+    assert model.expected("bob", "SQL", "Joins") > before
+
+    model.record("ann", "SQL", "Medium", [("Joins", False)])
+    assert model.expected("ann", "SQL", "Joins") < after_right
+
+
+def test_expected_answers_move_ratings_less_than_surprises(model):
+    model.record("ann", "SQL", "Easy", [("Joins", True)])
+    model.record("bob", "SQL", "Hard", [("Joins", True)])
+    ann_gain = model.learners[("ann", "SQL")][0]["Joins"][0]
+    bob_gain = model.learners[("bob", "SQL")][0]["Joins"][0]
+    assert 0 < ann_gain < bob_gain
+
+
+def test_select_puts_missed_items_first(model):
+    model.record("ann", "SQL", "Medium", [("Known", True)] * 3 + [("Missed", False)] * 3)
+    picked = model.select("ann", "SQL", ["Known", "Missed", "New"], 3)
+    assert picked == ["Missed", "New", "Known"]
+    assert model.select("ann", "SQL", ["Known", "Missed", "New"], 1) == ["Missed"]
+    # Only the offered items are considered
+    assert model.select("ann", "SQL", ["Known"], 3) == ["Known"]
+
+
+def test_new_learners_do_not_all_start_on_the_same_items(model):
+    random.seed(7)
+    first_picks = {model.select(f"learner {n}", "SQL", ITEMS, 3)[0] for n in range(20)}
+    assert len(first_picks) > 1
+
+
+def test_evicted_learners_reload_only_if_persisted(tmp_path):
+    model = MasteryModel(str(tmp_path / "mastery.sqlite3"), max_learners=1)
+    model.record("ann", "SQL", "Medium", [("Joins", True)])
+    model.record("guest", "SQL", "Medium", [("Joins", True)], persist=False)
+    ann = model.expected("ann", "SQL", "Joins")
+    assert ("guest", "SQL") not in model.learners
+
+    assert model.expected("ann", "SQL", "Joins") == ann
+    # The guest's ability was never written, so it comes back as a new learner
+    assert model.expected("guest", "SQL", "Joins") == model.expected("new", "SQL", "Joins")
+    rows = model.conn.execute("SELECT user_id FROM learner_mastery").fetchall()
+    assert rows == [("ann",)]
+    assert len(model.learners) == 1
+
+
+def test_item_difficulty_is_bounded_by_topic_lru(tmp_path):
+    path = str(tmp_path / "mastery.sqlite3")
+    model = MasteryModel(path, max_topics=1)
+    model.record("ann", "SQL", "Medium", [("Joins", False)])
+    sql = model.expected("new", "SQL", "Joins")
+    model.record("ann", "Python", "Medium", [("Loops", True)])
+    assert list(model.items) == ["Python"]
+    assert model.expected("new", "SQL", "Joins") == sql
+    assert model.expected("new", "SQL", "Joins") == MasteryModel(path).expected("new", "SQL", "Joins")
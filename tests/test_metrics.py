@@ -0,0 +1,45 @@
+import json
+import os
+
+from metrics import Tracer
+
+
+def traced(tracer, operation, streamed=False):
+    with tracer.span(operation) as span:
+        if streamed:
+            span.first_token()
+
+
+def test_records_are_written_in_the_background(tmp_path):
+    path = os.path.join(tmp_path, "metrics.jsonl")
+    tracer = Tracer(path)
+    for _ in range(5):
+        traced(tracer, "checklist")
+    tracer.writer.flush()
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["operation"] for record in records] == ["checklist"] * 5
+
+
+def test_log_is_rotated_at_size_cap(tmp_path):
+    path = os.path.join(tmp_path, "metrics.jsonl")
+    tracer = Tracer(path, max_bytes=600, backups=2)
+    for _ in range(40):
+        traced(tracer, "quiz_question")
+        tracer.writer.flush()
+    assert sorted(os.listdir(tmp_path)) == ["metrics.jsonl", "metrics.jsonl.1", "metrics.jsonl.2"]
+    for name in os.listdir(tmp_path):
+        # Rotation happens before a batch, so a file overshoots by at most one record
+        assert os.path.getsize(os.path.join(tmp_path, name)) < 1200
+
+
+def test_ttft_is_one_summary_family():
+    tracer = Tracer(path=None)
+    traced(tracer, "checklist_stream", streamed=True)
+    traced(tracer, "checklist")
+    text = tracer.prometheus_text()
+    assert "# TYPE questify_ttft_seconds summary" in text
+    assert "questify_ttft_seconds_count{operation=\"checklist_stream\"} 1" in text
+    # Non-streamed operations have no first token to report
+    assert "questify_ttft_seconds_count{operation=\"checklist\"}" not in text
+    assert "questify_ttft_seconds_sum counter" not in text
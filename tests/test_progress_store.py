@@ -0,0 +1,148 @@
+import itertools
+
+import pytest
+
+import metrics
+import progress_store
+from metrics import Tracer
+from progress_store import MemoryProgressBackend, ProgressStore, create_backend
+
+
+@pytest.fixture(autouse=True)
+def tracer(monkeypatch):
+    tracer = Tracer(path=None)
+    monkeypatch.setattr(metrics, "_default_tracer", tracer)
+    return tracer
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(progress_store.time, "time", lambda: float(next(ticks)))
+
+
+class RecordingBackend(MemoryProgressBackend):
+    """Memory backend that records every batch and can be told to fail"""
+
+    def __init__(self, failures=0):
+        super().__init__()
+        self.batches = []
+        self.failures = failures
+
+    def apply(self, checklists, item_progress, quiz_results):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("disk full")
+        self.batches.append((dict(checklists), dict(item_progress), list(quiz_results)))
+        super().apply(checklists, item_progress, quiz_results)
+
+
+def test_writes_are_coalesced_into_one_batch():
+    backend = RecordingBackend()
+    store = ProgressStore(backend, flush_interval=0)
+    store.save_checklist("ann", "SQL", ["Joins", "Indexes"], {})
+    for completed in (True, False, True):
+        store.set_item_progress("ann", "SQL", "Joins", completed)
+    assert backend.batches == []
+
+    # Reads flush first, so the session sees its own writes
+    assert store.load_topic("ann", "SQL")["progress"] == {"Joins": True, "Indexes": False}
+    assert len(backend.batches) == 1
+    assert len(backend.batches[0][1]) == 2
+    store.flush()
+    assert len(backend.batches) == 1
+
+
+def test_max_pending_forces_a_flush():
+    backend = RecordingBackend()
+    store = ProgressStore(backend, flush_interval=0, max_pending=3)
+    store.set_item_progress("ann", "SQL", "a", True)
+    store.set_item_progress("ann", "SQL", "b", True)
+    assert backend.batches == []
+    store.record_quiz_result("ann", "SQL", "Easy", 1, 2)
+    assert len(backend.batches) == 1
+
+
+def test_failed_flush_requeues_and_newer_writes_win(tracer):
+    backend = RecordingBackend(failures=1)
+    store = ProgressStore(backend, flush_interval=0)
+    store.save_checklist("ann", "SQL", ["Joins"], {})
+    store.set_item_progress("ann", "SQL", "Joins", True)
+    store.record_quiz_result("ann", "SQL", "Easy", 1, 2, quiz_id="q1")
+    with pytest.raises(RuntimeError):
+        store.flush()
+    assert tracer.totals["progress_flush"]["errors"] == 1
+
+    store.set_item_progress("ann", "SQL", "Joins", False)
+    store.record_quiz_result("ann", "SQL", "Easy", 2, 2, quiz_id="q2")
+    store.flush()
+    assert store.load_topic("ann", "SQL")["progress"] == {"Joins": False}
+    assert [row["quiz_id"] for row in store.load_quiz_results("ann")] == ["q2", "q1"]
+    assert tracer.totals["progress_flush"]["count"] == 2
+
+
+def test_background_flusher_keeps_failed_batches(monkeypatch):
+    backend = RecordingBackend(failures=1)
+    store = ProgressStore(backend, flush_interval=0)
+    store.set_item_progress("ann", "SQL", "Joins", True)
+    sleeps = []
+
+    def sleep(seconds):
+        # Two rounds: the first flush fails, the second writes the requeued batch
+        sleeps.append(seconds)
+        if len(sleeps) > 2:
+            raise SystemExit
+
+    monkeypatch.setattr(progress_store.time, "sleep", sleep)
+    with pytest.raises(SystemExit):
+        store._flush_periodically()
+    assert len(backend.batches) == 1
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def store(request, tmp_path):
+    url = f"sqlite:///{tmp_path / 'progress.sqlite3'}" if request.param == "sqlite" else "memory://"
+    return ProgressStore(create_backend(url), flush_interval=0)
+
+
+def answers_stored(store):
+    backend = store.backend
+    if isinstance(backend, MemoryProgressBackend):
+        return len(backend.quiz_answers)
+    return backend.conn.execute("SELECT COUNT(*) FROM quiz_answers").fetchone()[0]
+
+
+def test_quiz_results_are_recorded_once_per_quiz_id(store):
+    answers = [{"item": "Joins", "correct": True}, {"item": "Indexes", "correct": False}]
+    store.record_quiz_result("ann", "SQL", "Easy", 1, 2, quiz_id="q1", answers=answers)
+    store.flush()
+    store.record_quiz_result("ann", "SQL", "Easy", 1, 2, quiz_id="q1", answers=answers)
+    # Results without an id are never collapsed
+    store.record_quiz_result("ann", "SQL", "Easy", 2, 2)
+    store.record_quiz_result("ann", "SQL", "Easy", 2, 2)
+    results = store.load_quiz_results("ann")
+    assert [row["quiz_id"] for row in results] == [None, None, "q1"]
+    assert answers_stored(store) == 2
+
+
+def test_backends_answer_reads_alike(store):
+    store.save_checklist("ann", "SQL", ["Joins", "Indexes"], {"Joins": "https://video"}, {"Joins": True})
+    store.save_checklist("ann", "Python", ["Loops"], {})
+    store.save_checklist("bob", "Go", ["Channels"], {})
+    store.set_item_progress("ann", "Python", "Loops", True)
+    store.record_quiz_result("ann", "SQL", "Easy", 1, 4, quiz_id="q1")
+    store.record_quiz_result("ann", "Python", "Hard", 3, 4, quiz_id="q2")
+    store.record_quiz_result("ann", "SQL", "Medium", 0, 0, quiz_id="q3")
+
+    assert store.list_topics("ann") == ["Python", "SQL"]
+    assert store.load_topic("ann", "SQL") == {
+        "checklist": ["Joins", "Indexes"],
+        "youtube_links": {"Joins": "https://video"},
+        "progress": {"Joins": True, "Indexes": False},
+    }
+    assert store.load_topic("ann", "Go") is None
+    assert [row["quiz_id"] for row in store.load_quiz_results("ann")] == ["q3", "q2", "q1"]
+    assert [row["quiz_id"] for row in store.load_quiz_results("ann", topic="SQL", limit=1)] == ["q3"]
+    assert [row["percentage"] for row in store.load_quiz_results("ann", topic="SQL")] == [0.0, 25.0]
+    assert len(store.load_activity("ann")) == 2
+    assert len(store.load_activity("bob")) == 0
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from prompts import parse_quiz_batch, validate_quiz_entry
+
+
+def entry(item=None, question="What is a join?", options=("A", "B", "C", "D"), correct_index=1):
+    data = {"question": question, "options": list(options), "correct_index": correct_index}
+    if item is not None:
+        data["item"] = item
+    return data
+
+
+def test_valid_entry_is_stripped_and_resolves_answer():
+    question, options, answer = validate_quiz_entry(
+        entry(question="  What is a join? ", options=(" A", "B ", "C", "D"), correct_index=0)
+    )
+    assert question == "What is a join?"
+    assert options == ["A", "B", "C", "D"]
+    assert answer == "A"
+
+
+@pytest.mark.parametrize("bad", [
+    "not a dict",
+    entry(question="   "),
+    entry(options=("A", "B", "C")),
+    entry(options=("A", "B", "C", "")),
+    entry(options=("A", "B", "A ", "D")),
+    entry(correct_index=4),
+    entry(correct_index=-1),
+    entry(correct_index="1"),
+    entry(correct_index=True),
+])
+def test_malformed_entries_are_rejected(bad):
+    assert validate_quiz_entry(bad) is None
+
+
+def test_batch_is_aligned_by_item_number():
+    content = json.dumps({"questions": [entry(item=2, question="Second?"), entry(item=1, question="First?")]})
+    results = parse_quiz_batch(content, 3)
+    assert [result[0] if result else None for result in results] == ["First?", "Second?", None]
+
+
+def test_batch_falls_back_to_position_and_keeps_first_answer_per_item():
+    content = json.dumps([entry(question="First?"), entry(item=1, question="Duplicate?"), entry(item=9)])
+    results = parse_quiz_batch(content, 2)
+    assert results[0][0] == "First?"
+    # Second entry claims item 1, which is taken; item 9 is out of range
+    assert results[1] is None
+
+
+def test_invalid_entry_leaves_only_its_slot_empty():
+    content = json.dumps({"questions": [entry(item=1, correct_index=7), entry(item=2)]})
+    results = parse_quiz_batch(content, 2)
+    assert results[0] is None
+    assert results[1] == ("What is a join?", ["A", "B", "C", "D"], "B")
+
+
+def test_code_fence_is_dropped():
+    content = "```json\n" + json.dumps({"questions": [entry(item=1)]}) + "\n```"
+    assert parse_quiz_batch(content, 1)[0][2] == "B"
+
+
+def test_answer_without_question_list_raises():
+    with pytest.raises(ValueError):
+        parse_quiz_batch(json.dumps({"questions": "none"}), 1)
+    with pytest.raises(json.JSONDecodeError):
+        parse_quiz_batch("Sorry, I can't help with that.", 1)
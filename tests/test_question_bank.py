@@ -0,0 +1,66 @@
+import itertools
+
+import pytest
+
+import question_bank
+from question_bank import QuestionBank
+
+OPTIONS = ["INNER", "LEFT", "RIGHT", "CROSS"]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing time, so served order is unambiguous"""
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(question_bank.time, "time", lambda: float(next(ticks)))
+
+
+def fill(bank, count, start=0, topic="SQL", item="Joins", difficulty="Medium"):
+    for n in range(start, start + count):
+        assert bank.add(topic, item, difficulty, f"Question {n}?", OPTIONS, "LEFT")
+
+
+def test_thin_slot_is_not_drawn(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite3"), min_available=3)
+    fill(bank, 2)
+    assert bank.draw("SQL", "Joins", "Medium") is None
+    fill(bank, 1, start=2)
+    question, options, correct = bank.draw("sql", "  joins ", "medium")
+    assert question.startswith("Question")
+    assert sorted(options) == sorted(OPTIONS)
+    assert correct == "LEFT"
+
+
+def test_duplicates_and_unanswerable_questions_are_not_banked(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite3"))
+    assert bank.add("SQL", "Joins", "Medium", "What is a join?", OPTIONS, "LEFT")
+    assert not bank.add("sql", "joins", "medium", "  what is a JOIN? ", OPTIONS, "LEFT")
+    assert not bank.add("SQL", "Joins", "Medium", "Another?", OPTIONS, "FULL")
+    assert bank.count("SQL", "Joins", "Medium") == 1
+
+
+def test_draws_rotate_through_least_recently_served(tmp_path, clock):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite3"), min_available=1)
+    fill(bank, 3)
+    drawn = [bank.draw("SQL", "Joins", "Medium")[0] for _ in range(6)]
+    assert len(set(drawn[:3])) == 3
+    assert drawn[3:] == drawn[:3]
+
+
+def test_excluded_questions_are_skipped(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite3"), min_available=3)
+    fill(bank, 3)
+    for _ in range(5):
+        assert bank.draw("SQL", "Joins", "Medium", exclude=["question 0?", "QUESTION 1?"])[0] == "Question 2?"
+    assert bank.draw("SQL", "Joins", "Medium", exclude=[f"Question {n}?" for n in range(3)]) is None
+
+
+def test_stale_questions_are_not_served_and_pruned(tmp_path, monkeypatch):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite3"), max_age_seconds=60, min_available=1)
+    monkeypatch.setattr(question_bank.time, "time", lambda: 1000.0)
+    fill(bank, 2)
+    monkeypatch.setattr(question_bank.time, "time", lambda: 1100.0)
+    assert bank.count("SQL", "Joins", "Medium") == 0
+    assert bank.draw("SQL", "Joins", "Medium") is None
+    assert bank.prune() == 2
+    assert bank.stats() == {"questions": 0, "slots": 0}
@@ -0,0 +1,51 @@
+import pytest
+
+from quiz_history import QuizHistory
+
+
+def test_same_quiz_is_recorded_once():
+    history = QuizHistory(capacity=5)
+    assert history.record("q1", "SQL", 3, 5)
+    version = history.version
+    assert not history.record("q1", "SQL", 3, 5)
+    assert len(history) == 1
+    assert history.version == version
+
+
+def test_ring_keeps_newest_and_exact_running_average():
+    history = QuizHistory(capacity=3)
+    for n, score in enumerate([1, 2, 3, 4, 5]):
+        history.record(f"q{n}", f"topic {n}", score, 5, taken_at=100 + n)
+    assert history.scores() == [60.0, 80.0, 100.0]
+    assert [topic for topic, _, _ in history.entries()] == ["topic 2", "topic 3", "topic 4"]
+    assert history.last() == 100.0
+    # Evicted results still count towards the average
+    assert history.average() == 60.0
+
+
+def test_quiz_id_is_forgotten_once_evicted():
+    history = QuizHistory(capacity=2)
+    history.record("q1", "SQL", 1, 1)
+    history.record("q2", "SQL", 1, 1)
+    history.record("q3", "SQL", 1, 1)
+    assert history.record("q1", "SQL", 1, 1)
+
+
+def test_load_replaces_history_oldest_first():
+    history = QuizHistory(capacity=5)
+    history.record("old", "SQL", 0, 5)
+    history.load([
+        {"quiz_id": "b", "topic": "Go", "score": 4, "total": 5, "taken_at": 20.0},
+        {"quiz_id": "a", "topic": "SQL", "score": 2, "total": 5, "taken_at": 10.0},
+    ])
+    assert history.entries() == [("SQL", 40.0, 10.0), ("Go", 80.0, 20.0)]
+    assert history.average() == 60.0
+    assert not history.record("b", "Go", 4, 5)
+
+
+def test_scores_keep_double_precision():
+    history = QuizHistory(capacity=3)
+    history.record("q1", "SQL", 1, 3)
+    history.record("q2", "SQL", 2, 3)
+    assert history.scores() == [1 / 3 * 100, 2 / 3 * 100]
+    assert history.average() == pytest.approx(50.0, abs=1e-12)
@@ -0,0 +1,87 @@
+import asyncio
+
+import httpx
+import pytest
+
+from resilience import ResilienceLayer, CircuitOpenError
+
+
+def status_error(status):
+    request = httpx.Request("POST", "https://api.example.test/chat")
+    response = httpx.Response(status, request=request)
+    return httpx.HTTPStatusError(f"{status}", request=request, response=response)
+
+
+def failing(status):
+    calls = []
+
+    async def send():
+        calls.append(1)
+        raise status_error(status)
+
+    return send, calls
+
+
+def test_repeated_client_errors_leave_breaker_closed():
+    layer = ResilienceLayer(max_attempts=4, base_delay=0, failure_threshold=5)
+    send, calls = failing(400)
+    for _ in range(10):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(layer.call("groq.chat", send))
+    assert layer.breaker("groq.chat").state == "closed"
+    # Not retried either: the same prompt would fail the same way
+    assert len(calls) == 10
+    assert layer.stats()["groq.chat"]["failures"] == 10
+
+
+def test_server_errors_open_breaker():
+    layer = ResilienceLayer(max_attempts=1, base_delay=0, failure_threshold=3, reset_timeout=60)
+    send, calls = failing(503)
+    for _ in range(3):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(layer.call("groq.chat", send))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(layer.call("groq.chat", send))
+    assert len(calls) == 3
+
+
+def test_client_error_closes_half_open_breaker():
+    layer = ResilienceLayer(max_attempts=1, base_delay=0, failure_threshold=1, reset_timeout=0)
+    send, _ = failing(503)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(layer.call("groq.chat", send))
+    assert layer.breaker("groq.chat").state == "half-open"
+    # The trial call got an answer from the endpoint, so it is up again
+    send, _ = failing(400)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(layer.call("groq.chat", send))
+    assert layer.breaker("groq.chat").state == "closed"
+
+
+def test_hedge_loser_that_finished_is_discarded():
+    async def scenario():
+        layer = ResilienceLayer(hedge_delays={"groq.chat": 0.01})
+        release = asyncio.Event()
+        sent = []
+        discarded = []
+
+        async def send():
+            number = len(sent)
+            sent.append(number)
+            await release.wait()
+            return number
+
+        async def discard(result):
+            discarded.append(result)
+
+        call = asyncio.ensure_future(layer.call("groq.chat", send, discard=discard))
+        await asyncio.sleep(0.05)
+        release.set()
+        result = await call
+        return result, discarded, len(sent)
+
+    result, discarded, sent = asyncio.run(scenario())
+    assert sent == 2
+    # Both answered in the same tick: the one not returned is released
+    assert len(discarded) == 1
+    assert discarded[0] != result
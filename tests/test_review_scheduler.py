@@ -0,0 +1,86 @@
+import pytest
+
+from review_scheduler import DAY, MAX_INTERVAL_DAYS, MIN_EASE, START_EASE, ReviewScheduler, sm2
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return ReviewScheduler(str(tmp_path / "reviews.sqlite3"))
+
+
+def test_sm2_intervals_grow_by_ease():
+    ease, interval, reps = sm2(START_EASE, 0, 0, 4)
+    assert (interval, reps) == (1, 1)
+    ease, interval, reps = sm2(ease, interval, reps, 4)
+    assert (interval, reps) == (6, 2)
+    next_ease, interval, reps = sm2(ease, interval, reps, 4)
+    assert (interval, reps) == (round(6 * ease), 3)
+    # Grade 4 leaves the ease where it was, grade 5 raises it
+    assert next_ease == pytest.approx(START_EASE)
+    assert sm2(START_EASE, 6, 2, 5)[0] == pytest.approx(START_EASE + 0.1)
+
+
+def test_sm2_wrong_answer_resets_and_ease_has_a_floor():
+    ease, interval, reps = sm2(START_EASE, 40, 5, 1)
+    assert (interval, reps) == (1, 0)
+    assert ease < START_EASE
+    for _ in range(10):
+        ease, _, _ = sm2(ease, 1, 0, 1)
+    assert ease == MIN_EASE
+
+
+def test_sm2_interval_is_capped():
+    assert sm2(START_EASE, 300, 8, 5)[1] == MAX_INTERVAL_DAYS
+
+
+def test_completed_item_is_due_tomorrow_and_not_rescheduled(scheduler):
+    scheduler.record_completed("ann", "SQL", "Joins", now=NOW)
+    scheduler.record_completed("ann", "SQL", "Joins", now=NOW + 5 * DAY)
+    assert scheduler.next_due("ann", "SQL") == {"Joins": NOW + DAY}
+
+
+def test_due_is_per_topic_most_overdue_first_and_does_not_consume(scheduler):
+    scheduler.record_answers("ann", "SQL", [("Joins", False, None)], now=NOW)
+    scheduler.record_answers("ann", "SQL", [("Indexes", False, None)], now=NOW - DAY)
+    scheduler.record_answers("ann", "Python", [("Loops", False, None)], now=NOW)
+
+    assert scheduler.due("ann", "SQL", now=NOW - 1) == []
+    later = NOW + DAY
+    due = scheduler.due("ann", "SQL", now=later)
+    assert [(topic, item) for topic, item, _ in due] == [("SQL", "Indexes"), ("SQL", "Joins")]
+    assert [item for _, item, _ in scheduler.due("ann", "SQL", limit=1, now=later)] == ["Indexes"]
+    assert len(scheduler.due("ann", "SQL", now=later)) == 2
+    assert [item for _, item, _ in scheduler.due("ann", "Python", now=later)] == ["Loops"]
+
+
+def test_answering_a_due_card_pushes_it_out(scheduler):
+    question = {"question": "What is a join?"}
+    scheduler.record_answers("ann", "SQL", [("Joins", True, question)], now=NOW)
+    scheduler.record_answers("ann", "SQL", [("Joins", True, None)], now=NOW + DAY)
+    assert scheduler.due("ann", "SQL", now=NOW + 2 * DAY) == []
+    (_, _, card), = scheduler.due("ann", "SQL", now=NOW + 7 * DAY)
+    assert card["interval_days"] == 6
+    # The last question asked is kept for later reviews
+    assert card["question"] == question
+
+
+def test_heap_stays_bounded_under_repeated_reschedules(scheduler):
+    for n in range(200):
+        scheduler.record_answers("ann", "SQL", [("Joins", n % 2 == 0, None)], now=NOW + n)
+    cards, heap = scheduler.learners[("ann", "SQL")]
+    assert len(heap) <= 2 * len(cards) + 16
+
+
+def test_schedule_reloads_only_for_persisted_learners(tmp_path):
+    path = str(tmp_path / "reviews.sqlite3")
+    scheduler = ReviewScheduler(path, max_learners=1)
+    scheduler.record_answers("ann", "SQL", [("Joins", True, {"question": "Q?"})], now=NOW)
+    scheduler.record_answers("guest", "SQL", [("Joins", True, None)], persist=False, now=NOW)
+    assert list(scheduler.learners) == [("guest", "SQL")]
+
+    assert scheduler.next_due("ann", "SQL") == {"Joins": NOW + DAY}
+    assert scheduler.next_due("guest", "SQL") == {}
+    (_, _, card), = ReviewScheduler(path).due("ann", "SQL", now=NOW + DAY)
+    assert card["question"] == {"question": "Q?"}
@@ -0,0 +1,91 @@
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Upstream:
+    """Async generator factory that yields on demand and records how it ended"""
+
+    def __init__(self):
+        self.started = 0
+        self.closed = False
+        self.release = None
+
+    def __call__(self):
+        self.started += 1
+        return self.generate()
+
+    async def generate(self):
+        try:
+            n = 0
+            while True:
+                await self.release.wait()
+                self.release.clear()
+                n += 1
+                yield n
+                if n == 3:
+                    return
+        finally:
+            self.closed = True
+
+
+def test_identical_streams_share_one_upstream():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+        upstream.release = asyncio.Event()
+
+        async def consume():
+            return [item async for item in flight.stream("chat", "key", upstream)]
+
+        first = asyncio.ensure_future(consume())
+        second = asyncio.ensure_future(consume())
+        for _ in range(3):
+            await asyncio.sleep(0)
+            upstream.release.set()
+            await asyncio.sleep(0.01)
+        return await first, await second, upstream, flight
+
+    first, second, upstream, flight = run(scenario())
+    assert first == second == [1, 2, 3]
+    assert upstream.started == 1
+    assert flight.stats()["chat"] == {"upstream": 1, "shared": 1}
+    assert not flight.streams
+
+
+def test_upstream_is_cancelled_when_last_consumer_leaves():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+        upstream.release = asyncio.Event()
+        upstream.release.set()
+        first = flight.stream("chat", "key", upstream)
+        second = flight.stream("chat", "key", upstream)
+        assert await first.__anext__() == 1
+        assert await second.__anext__() == 1
+        broadcast = flight.streams[("chat", "key")]
+
+        # One consumer leaving keeps the stream going for the other
+        await first.aclose()
+        await asyncio.sleep(0)
+        assert not broadcast.task.done()
+
+        await second.aclose()
+        await asyncio.sleep(0)
+        assert broadcast.task.done()
+        assert ("chat", "key") not in flight.streams
+
+        # A later caller starts a new upstream instead of joining the cancelled one
+        third = flight.stream("chat", "key", upstream)
+        upstream.release.set()
+        assert await third.__anext__() == 1
+        await third.aclose()
+        return upstream
+
+    upstream = run(scenario())
+    assert upstream.closed
+    assert upstream.started == 2
@@ -1,6 +1,8 @@
 import streamlit as st
-import requests
+import httpx
 from pytube import Search
+from async_io import get_io_core
+from metrics import trace
 
 # Load API Key securely
 GROQ_API_KEY = "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"  # Replace with your actual API key
@@ -18,7 +20,16 @@ def generate_question_and_answer(topic, difficulty):
         "max_tokens": 300  # Increased max tokens for full output
     }
 
-    response = requests.post(url, headers=headers, json=data)
+    # Goes through the shared I/O core: pooled connection, Groq concurrency limit and timeout
+    core = get_io_core()
+    with trace("works.question_and_answer") as span:
+        try:
+            response = core.run(core.request("groq", "POST", url, endpoint="groq.chat", headers=headers, json=data))
+        except httpx.HTTPStatusError as e:
+            response = e.response
+            span.error = f"HTTP {response.status_code}"
+        if response.status_code == 200:
+            span.add_usage(response.json().get("usage"))
     
     if response.status_code == 200:
         content = response.json()["choices"][0]["message"]["content"]
@@ -0,0 +1,152 @@
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Persistent cache for YouTube Data API searches plus a quota ledger.
+# Every search.list call costs 100 quota units, so repeated queries are served
+# from here and the units they would have cost are recorded as saved. Spent
+# units are charged per request sent upstream (retries and hedges included),
+# not per search the app asked for.
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "youtube_cache.sqlite3")
+SEARCH_QUOTA_COST = 100
+
+
+def quota_day():
+    """The UTC date the ledger books usage under"""
+    return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class YouTubeSearchCache:
+    """Query -> video IDs store with TTL expiry, LRU size bound and daily quota accounting"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=3 * 24 * 3600, max_entries=20000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                query TEXT PRIMARY KEY,
+                video_ids TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_searches_accessed ON searches (accessed_at)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS quota_ledger (
+                day TEXT PRIMARY KEY,
+                spent INTEGER NOT NULL DEFAULT 0,
+                saved INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, query):
+        """Return the cached video IDs (best first) or None"""
+        key = normalize_query(query)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT video_ids, created_at FROM searches WHERE query = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE searches SET accessed_at = ? WHERE query = ?", (now, key))
+            self._add_to_ledger(saved=SEARCH_QUOTA_COST)
+            self.conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, query, video_ids):
+        """Store every result of a fresh search"""
+        key = normalize_query(query)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO searches (query, video_ids, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(video_ids), now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def charge_search(self):
+        """Charge one search.list request to today's quota"""
+        with self.lock:
+            self._add_to_ledger(spent=SEARCH_QUOTA_COST)
+            self.conn.commit()
+
+    def peek(self, query):
+        """Cached video IDs without touching LRU order, counters or the ledger"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT video_ids FROM searches WHERE query = ?", (normalize_query(query),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _add_to_ledger(self, spent=0, saved=0):
+        day = quota_day()
+        self.conn.execute("""
+            INSERT INTO quota_ledger (day, spent, saved) VALUES (?, ?, ?)
+            ON CONFLICT(day) DO UPDATE SET spent = spent + excluded.spent, saved = saved + excluded.saved
+        """, (day, spent, saved))
+
+    def _evict(self, now):
+        if self.ttl_seconds:
+            self.conn.execute("DELETE FROM searches WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries:
+            self.conn.execute("""
+                DELETE FROM searches WHERE query IN (
+                    SELECT query FROM searches ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def quota_usage(self, day=None):
+        day = day or quota_day()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT spent, saved FROM quota_ledger WHERE day = ?", (day,)
+            ).fetchone()
+        spent, saved = row if row else (0, 0)
+        return {"day": day, "spent": spent, "saved": saved}
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+        stats = {"hits": self.hits, "misses": self.misses, "entries": entries}
+        stats.update(self.quota_usage())
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_youtube_cache():
+    """Process-wide cache instance, configured from the environment"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = YouTubeSearchCache(
+                path=os.getenv("YOUTUBE_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_seconds=int(os.getenv("YOUTUBE_CACHE_TTL", str(3 * 24 * 3600))),
+                max_entries=int(os.getenv("YOUTUBE_CACHE_MAX_ENTRIES", "20000")),
+            )
+        return _default_cache